@@ -0,0 +1,102 @@
+"""
+قياس سرعة مطابقة التخصصات: الحلقة المتداخلة القديمة والمرور على كل الـ targets مقابل ProgramMatcher
+
+python bench_matcher.py [عدد الخيارات] [عدد الـ targets] [عدد التكرارات]
+"""
+
+import random
+import sys
+import time
+
+from monitor import ProgramMatcher, normalize_arabic, program_tokens, text_trigrams
+
+FACULTIES = ['كلية الطب', 'كلية الهندسة', 'كلية الصيدلة', 'كلية الحاسبات والمعلومات', 'كلية التجارة',
+             'كلية الآداب', 'كلية العلوم', 'كلية طب الأسنان', 'كلية الطب البيطري', 'كلية الزراعة',
+             'كلية الحقوق']
+UNIVERSITIES = ['جامعة القاهرة', 'جامعة عين شمس', 'جامعة الإسكندرية', 'جامعة المنصورة', 'جامعة أسيوط',
+                'جامعة حلوان', 'جامعة الزقازيق', 'جامعة طنطا', 'جامعة بنها', 'جامعة المنيا']
+
+def make_programs(count):
+    rnd = random.Random(1)
+    return {
+        f"{rnd.choice(FACULTIES)} - {rnd.choice(UNIVERSITIES)} - برنامج {i}"
+        for i in range(count)
+    }
+
+def make_targets(count):
+    """نصهم "تخصص + جامعة" (يطابق كتير) ونصهم برنامج محدد أو جزء من اسم"""
+    rnd = random.Random(2)
+    targets = []
+    for i in range(count):
+        faculty = rnd.choice(FACULTIES).replace('كلية ', '')
+        university = rnd.choice(UNIVERSITIES).replace('جامعة ', '')
+        if i % 3 == 0:
+            targets.append(f"{faculty} - {university}")
+        elif i % 3 == 1:
+            targets.append(f"{faculty} - {university} - برنامج {rnd.randrange(count * 10)}")
+        else:
+            # جزء من اسم (آخر حرف ناقص): الهندس، الصيدل
+            targets.append(faculty[:-1] if len(faculty) > 4 else faculty)
+    return targets
+
+def nested_loop(programs, targets):
+    """المطابقة القديمة في match_targets"""
+    return [
+        program for program in programs
+        if any(target.lower() in program.lower() for target in targets)
+    ]
+
+def naive_scores(programs, targets):
+    """نفس قاعدة ProgramMatcher بالمرور على كل target مع كل تخصص (بدون indexes)"""
+    result = {}
+    for program in programs:
+        scores = {}
+        for rank, target in enumerate(targets):
+            score = ProgramMatcher.closeness(program, target)
+            if score is not None:
+                scores[rank] = score
+        result[program] = scores
+    return result
+
+def clear_caches():
+    for cached in (normalize_arabic, program_tokens, text_trigrams):
+        cached.cache_clear()
+
+def bench(name, func, rounds):
+    started = time.perf_counter()
+    for _ in range(rounds):
+        result = func()
+    elapsed = (time.perf_counter() - started) / rounds
+    print(f"{name:<28} {elapsed * 1000:9.2f} ms/poll  ({len(result)} تطابق)")
+    return elapsed
+
+def main():
+    # البوابة فيها مئات البرامج في القائمة، والطالب عنده كام target
+    options = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    targets_count = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    rounds = int(sys.argv[3]) if len(sys.argv) > 3 else 20
+    
+    programs = make_programs(options)
+    targets = make_targets(targets_count)
+    print(f"{len(programs)} خيار × {len(targets)} target، {rounds} تكرار")
+    
+    old = bench("nested loop", lambda: nested_loop(programs, targets), rounds)
+    
+    # التوحيد متخزن (lru_cache) في الحالتين - الفرق هنا هو عدد المقارنات بس
+    clear_caches()
+    naive = bench("كل target مع كل تخصص", lambda: [p for p, s in naive_scores(programs, targets).items() if s], rounds)
+    
+    matcher = ProgramMatcher(targets)
+    
+    def fresh_poll():
+        matcher.scores_cache.clear()
+        return matcher.match(programs)
+    
+    indexed = bench("ProgramMatcher (قائمة جديدة)", fresh_poll, rounds)
+    warm = bench("ProgramMatcher (نفس القائمة)", lambda: matcher.match(programs), rounds)
+    
+    print(f"الـ indexes: {naive / indexed:.1f}x أسرع من المرور على كل الـ targets")
+    print(f"نفس القائمة: {naive / warm:.1f}x ({old / warm:.1f}x مقابل الحلقة القديمة)")
+
+if __name__ == "__main__":
+    main()
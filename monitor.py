@@ -4,191 +4,1740 @@
 """
 
 from playwright.sync_api import sync_playwright, TimeoutError as PlaywrightTimeout
+from playwright.async_api import async_playwright
+import asyncio
 import time
 import os
 import threading
 from datetime import datetime
+from zoneinfo import ZoneInfo
 import requests
-from flask import Flask, jsonify
+from flask import Flask, jsonify, Response, request
 import random
+import queue
+import json
+import hashlib
+import re
+import base64
+import contextvars
+import mimetypes
+import gzip
+import shutil
+import sys
+import atexit
+import logging
+import logging.handlers
+from collections import deque
+from urllib.parse import unquote
+from contextlib import contextmanager
+from functools import lru_cache
 
 # إنشاء Flask app
 app = Flask(__name__)
 
-class StudyInEgyptMonitor:
-    def __init__(self, username, password, target_programs, telegram_token=None, telegram_chat_id=None):
-        """
-        username: اسم المستخدم للمنصة
-        password: كلمة المرور
-        target_programs: قائمة بأسماء التخصصات المطلوبة
-        telegram_token: توكن بوت التليجرام
-        telegram_chat_id: معرف المحادثة في التليجرام
-        """
-        self.username = username
-        self.password = password
-        self.target_programs = [p.strip() for p in target_programs]
-        self.telegram_token = telegram_token
-        self.telegram_chat_id = telegram_chat_id
-        self.found_programs = set()
-        self.last_programs = set()
-        self.is_running = False
-        self.playwright = None
-        self.browser = None
-        self.page = None
-        self.status = {"state": "initialized", "last_check": None, "checks_count": 0}
-        self.base_url = "https://admission.study-in-egypt.gov.eg"
+# إعدادات المتصفح المشتركة بين المحرك المتزامن وغير المتزامن
+BROWSER_ARGS = [
+    '--no-sandbox',
+    '--disable-setuid-sandbox',
+    '--disable-dev-shm-usage',
+    '--disable-gpu',
+    '--disable-blink-features=AutomationControlled',  # إخفاء automation
+    '--disable-features=IsolateOrigins,site-per-process',
+]
+
+BROWSER_CONTEXT_OPTIONS = dict(
+    viewport={'width': 1920, 'height': 1080},
+    user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/131.0.0.0 Safari/537.36',
+    locale='ar-EG',
+    timezone_id='Africa/Cairo',
+    # إضافة permissions
+    permissions=['geolocation'],
+    geolocation={'latitude': 30.0444, 'longitude': 31.2357},  # Cairo
+    # إضافة extra headers
+    extra_http_headers={
+        'Accept-Language': 'ar-EG,ar;q=0.9,en-US;q=0.8,en;q=0.7',
+        'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+        'Accept-Encoding': 'gzip, deflate, br',
+        'DNT': '1',
+        'Connection': 'keep-alive',
+        'Upgrade-Insecure-Requests': '1',
+    }
+)
+
+# عناصر صفحة التقديم
+ADD_WISHES_SELECTORS = [
+    'button:has-text("إضافة الرغبات")',
+    'button:has(text="إضافة الرغبات")',
+    'button[class*="button_custom-button"]',
+]
+
+# قوائم antd في الصفحة (اللغة + التخصصات) - الضغط على الـ selector بيفتح القائمة
+ANT_SELECT_CONTROLS = '.ant-select:not(.ant-select-disabled) .ant-select-selector'
+
+# react-select (احتياطي لو الصفحة مش antd)
+SELECT_CONTROL_SELECTORS = [
+    'div[class*="react-select__control"]',
+    'div[class*="select__control"]',
+]
+
+SELECT_OPTION_SELECTORS = [
+    'div[class*="react-select__option"]',
+    'div[class*="select__option"]',
+    '[role="option"]',
+]
+
+CONTINUE_BUTTON_SELECTORS = [
+    'button:has-text("إستمرار")',
+    'button:has-text("استمرار")',
+    'button:has-text("Continue")',
+    'button:has(span:text("إستمرار"))',
+    'button:has(span:text("استمرار"))',
+    'button.btn-primary',
+    'button[type="submit"]',
+]
+
+# selectors عامة ممكن تطابق أزرار تانية في الصفحة: بتفضل آخر المرشحين مهما نجحت قبل كده
+FALLBACK_SELECTORS = {'button.btn-primary', 'button[type="submit"]'}
+
+# خيارات القائمة المنسدلة المفتوحة حالياً (antd يترك القوائم المغلقة في الـ DOM)
+OPEN_DROPDOWN_OPTIONS = '.ant-select-dropdown:not(.ant-select-dropdown-hidden) .ant-select-item-option'
+
+# أي خيار ظاهر: react-select أو antd
+ANY_OPTION_SELECTOR = ", ".join(SELECT_OPTION_SELECTORS + [OPEN_DROPDOWN_OPTIONS])
+
+# التخصص ظهر كقيمة مختارة في القائمة
+SELECTED_VALUE_SCRIPT = """
+(name) => Array.from(document.querySelectorAll(
+    '[class*="single-value"], .ant-select-selection-item'
+)).some(e => e.textContent.includes(name))
+"""
+
+# قراءة كل الخيارات في round trip واحد: النص والقيمة والحالة والترتيب
+READ_OPTIONS_SCRIPT = """
+(selector) => Array.from(document.querySelectorAll(selector)).map((el, index) => ({
+    index,
+    text: (el.innerText || el.textContent || '').trim(),
+    value: el.getAttribute('title') || el.getAttribute('value') || el.getAttribute('data-value'),
+    disabled: el.getAttribute('aria-disabled') === 'true'
+        || el.classList.contains('ant-select-item-option-disabled')
+        || el.classList.contains('react-select__option--is-disabled')
+        || el.disabled === true,
+}))
+"""
+
+# حاوية التمرير في القائمة الافتراضية (antd يرسم 8-10 خيارات فقط في المرة)
+OPEN_DROPDOWN_HOLDER = '.ant-select-dropdown:not(.ant-select-dropdown-hidden) .rc-virtual-list-holder'
+
+# جمع خيارات القائمة الافتراضية بالتمرير صفحة صفحة داخل المتصفح (round trip واحد)
+# يتوقف عند نهاية القائمة أو عند ظهور target لو اتحدد
+HARVEST_OPTIONS_SCRIPT = """
+async ({selector, holder, target, maxSteps}) => {
+    const started = performance.now();
+    const list = document.querySelector(holder);
+    const seen = new Map();
+    let found = false;
+    let steps = 0;
+    const collect = () => {
+        for (const el of document.querySelectorAll(selector)) {
+            const text = (el.innerText || el.textContent || '').trim();
+            const value = el.getAttribute('title') || el.getAttribute('value') || el.getAttribute('data-value');
+            const key = value || text;
+            if (!key || seen.has(key)) continue;
+            seen.set(key, {
+                index: seen.size,
+                text,
+                value,
+                disabled: el.getAttribute('aria-disabled') === 'true'
+                    || el.classList.contains('ant-select-item-option-disabled'),
+            });
+            if (target && text.includes(target)) found = true;
+        }
+    };
+    const nextFrame = () => new Promise(r => requestAnimationFrame(() => requestAnimationFrame(r)));
+    const atEnd = () => !list || list.scrollTop + list.clientHeight >= list.scrollHeight - 1;
+    if (list && list.scrollTop > 0) {
+        list.scrollTop = 0;
+        steps++;
+        await nextFrame();
+    }
+    collect();
+    while (!found && !atEnd() && steps < maxSteps) {
+        list.scrollTop += list.clientHeight;
+        steps++;
+        await nextFrame();
+        collect();
+    }
+    return {
+        options: Array.from(seen.values()),
+        steps,
+        elapsed_ms: Math.round(performance.now() - started),
+        complete: found || atEnd(),
+    };
+}
+"""
+
+# عدد العناصر لكل selector في round trip واحد
+# :has-text() بيتنفذ هنا، وباقي صيغ Playwright الخاصة ترجع null (تتفحص بـ locator().count())
+PROBE_SELECTORS_SCRIPT = """
+(selectors) => selectors.map((selector) => {
+    const hasText = selector.match(/^(.*):has-text\\("(.*)"\\)$/);
+    try {
+        if (hasText) {
+            return Array.from(document.querySelectorAll(hasText[1] || '*'))
+                .filter(el => el.textContent.includes(hasText[2])).length;
+        }
+        return document.querySelectorAll(selector).length;
+    } catch (e) {
+        return null;
+    }
+})
+"""
+
+# نصوص كل رسائل الخطأ الظاهرة في round trip واحد
+ERROR_TEXTS_SCRIPT = """
+(selectors) => Array.from(new Set(selectors.flatMap((selector) => {
+    try {
+        return Array.from(document.querySelectorAll(selector)).map(el => (el.innerText || '').trim());
+    } catch (e) {
+        return [];
+    }
+})))
+"""
+
+# إعادة طلب الصور اللي اتحظرت وانتظار تحميلها (أو فشلها) قبل لقطة الشاشة
+RELOAD_IMAGES_SCRIPT = """
+(timeout) => {
+    const images = Array.from(document.images).filter(img => img.src);
+    const loads = images.map(img => new Promise(resolve => {
+        img.addEventListener('load', resolve, { once: true });
+        img.addEventListener('error', resolve, { once: true });
+        img.src = img.src;
+    }));
+    return Promise.race([
+        Promise.all(loads).then(() => images.length),
+        new Promise(resolve => setTimeout(() => resolve(-1), timeout)),
+    ]);
+}
+"""
+
+# الحجم التقريبي للمورد المحظور لو لسه ما شفناش مورد من نوعه (bytes)
+BLOCKED_SIZE_ESTIMATES = {"image": 30000, "font": 40000, "media": 250000, "script": 30000}
+
+# قائمة اللغات في أعلى الصفحة (ليست قائمة التخصصات)
+LANGUAGE_OPTIONS = ['العربية', 'English', 'Français', 'عربي', 'إنجليزي']
+
+# إخفاء webdriver و automation flags
+STEALTH_INIT_SCRIPT = """
+// إخفاء webdriver
+Object.defineProperty(navigator, 'webdriver', {
+    get: () => false
+});
+
+// إخفاء automation
+delete navigator.__proto__.webdriver;
+
+// تعديل permissions
+const originalQuery = window.navigator.permissions.query;
+window.navigator.permissions.query = (parameters) => (
+    parameters.name === 'notifications' ?
+        Promise.resolve({ state: Notification.permission }) :
+        originalQuery(parameters)
+);
+
+// إضافة plugins
+Object.defineProperty(navigator, 'plugins', {
+    get: () => [1, 2, 3, 4, 5]
+});
+
+// إضافة languages
+Object.defineProperty(navigator, 'languages', {
+    get: () => ['ar-EG', 'ar', 'en-US', 'en']
+});
+
+// Chrome runtime
+window.chrome = {
+    runtime: {}
+};
+"""
+
+class Metrics:
+    """مقاييس زمن المراحل والعدادات بصيغة Prometheus (بدون مكتبات خارجية)"""
     
-    def log_message(self, message):
-        """تسجيل رسالة مع الوقت"""
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        log = f"[{timestamp}] {message}"
-        print(log, flush=True)
-        
+    BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120)
+    
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.histograms = {}  # phase -> [counts per bucket, sum, count]
+        self.counters = {}    # (name, labels) -> value
+    
+    def observe(self, phase, seconds):
+        """تسجيل مدة مرحلة في الـ histogram"""
+        with self.lock:
+            hist = self.histograms.get(phase)
+            if hist is None:
+                hist = self.histograms[phase] = [[0] * len(self.BUCKETS), 0.0, 0]
+            for i, bound in enumerate(self.BUCKETS):
+                if seconds <= bound:
+                    hist[0][i] += 1
+            hist[1] += seconds
+            hist[2] += 1
+    
+    def inc(self, name, amount=1, **labels):
+        """زيادة عداد (مع labels اختيارية)"""
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+    
+    def error(self, phase):
+        """تسجيل خطأ في مرحلة"""
+        self.inc("monitor_phase_errors_total", phase=phase)
+    
+    @contextmanager
+    def span(self, phase):
+        """قياس زمن مرحلة - الاستثناء يُسجَّل كخطأ ثم يُعاد رفعه"""
+        started_at = time.time()
         try:
-            with open("monitor_log.txt", "a", encoding="utf-8") as f:
-                f.write(log + "\n")
-        except:
-            pass
+            yield
+        except Exception:
+            self.error(phase)
+            raise
+        finally:
+            self.observe(phase, time.time() - started_at)
     
-    def send_telegram_alert(self, message):
-        """إرسال تنبيه عبر التليجرام"""
-        if not self.telegram_token or not self.telegram_chat_id:
-            return
+    def render(self, extra_labels=None):
+        """النص بصيغة Prometheus لـ /metrics - extra_labels تُضاف لكل سطر (زي tenant)"""
+        extra = "".join(f'{k}="{v}",' for k, v in sorted((extra_labels or {}).items()))
+        lines = []
+        with self.lock:
+            if self.histograms:
+                lines.append("# TYPE monitor_phase_duration_seconds histogram")
+            for phase, (counts, total, count) in sorted(self.histograms.items()):
+                for bound, bucket_count in zip(self.BUCKETS, counts):
+                    lines.append(f'monitor_phase_duration_seconds_bucket{{{extra}phase="{phase}",le="{bound}"}} {bucket_count}')
+                lines.append(f'monitor_phase_duration_seconds_bucket{{{extra}phase="{phase}",le="+Inf"}} {count}')
+                lines.append(f'monitor_phase_duration_seconds_sum{{{extra}phase="{phase}"}} {total:.6f}')
+                lines.append(f'monitor_phase_duration_seconds_count{{{extra}phase="{phase}"}} {count}')
+            
+            typed = set()
+            for (name, labels), value in sorted(self.counters.items()):
+                if name not in typed:
+                    lines.append(f"# TYPE {name} counter")
+                    typed.add(name)
+                label_text = (extra + ",".join(f'{k}="{v}"' for k, v in labels)).rstrip(",")
+                lines.append(f"{name}{{{label_text}}} {value}" if label_text else f"{name} {value}")
         
-        try:
-            url = f"https://api.telegram.org/bot{self.telegram_token}/sendMessage"
-            data = {
-                "chat_id": self.telegram_chat_id,
-                "text": message,
-                "parse_mode": "HTML"
-            }
-            response = requests.post(url, data=data, timeout=10)
-            return response.json()
-        except Exception as e:
-            self.log_message(f"خطأ في إرسال التنبيه: {e}")
+        return "\n".join(lines) + "\n"
     
-    def send_telegram_photo(self, photo_path, caption=""):
-        """إرسال صورة عبر التليجرام"""
-        if not self.telegram_token or not self.telegram_chat_id:
-            return
+    @staticmethod
+    def merge(rendered):
+        """دمج نصوص render من أكتر من مصدر: Prometheus عايز كل metric في مجموعة واحدة بـ TYPE واحد"""
+        types = {}
+        families = {}
+        for text in rendered:
+            for line in text.splitlines():
+                if line.startswith("# TYPE "):
+                    _, _, name, kind = line.split(" ", 3)
+                    types.setdefault(name, kind)
+                    families.setdefault(name, [])
+                elif line:
+                    name = line.split("{")[0].split(" ")[0]
+                    family = next((f for f in (name, name.rsplit("_", 1)[0]) if f in types), name)
+                    families.setdefault(family, []).append(line)
         
-        try:
-            url = f"https://api.telegram.org/bot{self.telegram_token}/sendPhoto"
-            with open(photo_path, 'rb') as photo:
-                files = {'photo': photo}
-                data = {
-                    'chat_id': self.telegram_chat_id,
-                    'caption': caption
-                }
-                response = requests.post(url, data=data, files=files, timeout=30)
-                return response.json()
-        except Exception as e:
-            self.log_message(f"خطأ في إرسال الصورة: {e}")
+        lines = []
+        for name, family_lines in families.items():
+            if name in types:
+                lines.append(f"# TYPE {name} {types[name]}")
+            lines.extend(family_lines)
+        return "\n".join(lines) + "\n"
+
+class TelegramNotifier:
+    """إرسال رسائل التليجرام من خيط خلفي حتى لا ينتظر المراقب الشبكة
     
-    def save_cookies(self, filepath="cookies.json"):
-        """حفظ cookies في ملف"""
+    - طابور محدود الحجم: لو امتلأ تُهمل الرسالة الجديدة بدل ما يقف الفحص
+    - خيط واحد بـ requests.Session واحدة (keep-alive) ويحافظ على ترتيب الرسائل
+    - إعادة المحاولة مع backoff واحترام retry_after عند 429
+    """
+    
+    def __init__(self, token, chat_id, log=None, metrics=None, max_queue=100, max_retries=5):
+        self.token = token
+        self.chat_id = chat_id
+        self.log = log or logging.getLogger("monitor").info
+        self.metrics = metrics or Metrics()
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.max_retries = max_retries
+        self.session = None
+        self.thread = None
+        self.lock = threading.Lock()
+    
+    @property
+    def enabled(self):
+        return bool(self.token and self.chat_id)
+    
+    def start(self):
+        """تشغيل الخيط عند أول رسالة"""
+        with self.lock:
+            if self.thread is None or not self.thread.is_alive():
+                self.session = requests.Session()
+                self.thread = threading.Thread(target=self.run, name="telegram-notifier", daemon=True)
+                self.thread.start()
+    
+    def enqueue(self, method, data, files=None):
+        """إضافة طلب للطابور بدون انتظار"""
+        if not self.enabled:
+            return False
+        
+        self.start()
         try:
-            import json
-            cookies = self.page.context.cookies()
-            with open(filepath, 'w') as f:
-                json.dump(cookies, f)
-            self.log_message(f"✅ تم حفظ الـ cookies في {filepath}")
+            self.queue.put_nowait((method, data, files))
             return True
-        except Exception as e:
-            self.log_message(f"❌ خطأ في حفظ الـ cookies: {e}")
+        except queue.Full:
+            self.metrics.inc("monitor_notifications_total", result="dropped")
+            self.log(f"⚠️ طابور التليجرام ممتلئ - تم إهمال {method}")
             return False
     
-    def load_cookies(self, filepath="cookies.json"):
-        """تحميل cookies من ملف"""
-        try:
-            import json
-            import os
-            
-            # أولاً: محاولة قراءة من BASE64 environment variable
-            cookies_base64 = os.environ.get("COOKIES_BASE64")
-            if cookies_base64:
-                try:
-                    import base64
-                    cookies_json = base64.b64decode(cookies_base64).decode('utf-8')
-                    cookies = json.loads(cookies_json)
-                    
-                    # تحويل format Chrome extension لـ Playwright
-                    cookies = self.convert_chrome_cookies_to_playwright(cookies)
-                    
-                    self.page.context.add_cookies(cookies)
-                    self.log_message(f"✅ تم تحميل {len(cookies)} cookie من COOKIES_BASE64")
-                    return True
-                except Exception as e:
-                    self.log_message(f"⚠️ فشل تحميل من COOKIES_BASE64: {e}")
+    def send_message(self, text, parse_mode="HTML"):
+        return self.enqueue("sendMessage", {"chat_id": self.chat_id, "text": text, "parse_mode": parse_mode})
+    
+    def send_photo(self, photo, caption="", filename="photo.png"):
+        """photo: مسار ملف أو bytes (الملف يُقرأ الآن لأنه قد يُستبدل في الفحص التالي)"""
+        return self.enqueue("sendPhoto", {"chat_id": self.chat_id, "caption": caption},
+                            {"photo": (filename, self.read_bytes(photo))})
+    
+    def send_document(self, document, caption="", filename="document.html"):
+        return self.enqueue("sendDocument", {"chat_id": self.chat_id, "caption": caption},
+                            {"document": (filename, self.read_bytes(document))})
+    
+    def read_bytes(self, source):
+        if isinstance(source, (bytes, bytearray)):
+            return bytes(source)
+        with open(source, "rb") as f:
+            return f.read()
+    
+    def run(self):
+        """حلقة الخيط: رسالة واحدة في كل مرة بالترتيب"""
+        while True:
+            item = self.queue.get()
+            try:
+                if item is None:
+                    return
+                self.deliver(*item)
+            finally:
+                self.queue.task_done()
+    
+    def deliver(self, method, data, files):
+        """إرسال طلب مع إعادة المحاولة"""
+        url = f"https://api.telegram.org/bot{self.token}/{method}"
+        delay = 1
+        
+        for attempt in range(1, self.max_retries + 1):
+            try:
+                with self.metrics.span("telegram"):
+                    response = self.session.post(url, data=data, files=files, timeout=30)
+                
+                if response.status_code == 429:
+                    retry_after = response.json().get("parameters", {}).get("retry_after", delay)
+                    self.log(f"⚠️ التليجرام طلب الانتظار {retry_after} ثانية")
+                    time.sleep(retry_after)
+                    continue
+                
+                if response.status_code < 500:
+                    result = "sent" if response.ok else "rejected"
+                    if not response.ok:
+                        self.log(f"⚠️ التليجرام رفض {method}: {response.text[:200]}")
+                    self.metrics.inc("monitor_notifications_total", result=result)
+                    return
+                
+                self.log(f"⚠️ خطأ من التليجرام ({response.status_code}) - محاولة {attempt}")
+            except Exception as e:
+                self.log(f"خطأ في إرسال التنبيه: {e} - محاولة {attempt}")
             
-            # ثانياً: محاولة قراءة من ملف
-            if not os.path.exists(filepath):
-                self.log_message(f"⚠️ ملف الـ cookies غير موجود: {filepath}")
+            if attempt < self.max_retries:
+                time.sleep(delay)
+                delay = min(delay * 2, 60)
+        
+        self.metrics.inc("monitor_notifications_total", result="failed")
+    
+    def close(self, timeout=30):
+        """انتظار إرسال الرسائل المعلقة ثم إيقاف الخيط"""
+        if self.thread is None or not self.thread.is_alive():
+            return
+        
+        try:
+            self.queue.put(None, timeout=timeout)
+        except queue.Full:
+            pass
+        self.thread.join(timeout)
+        if self.session:
+            self.session.close()
+    
+    def pending(self):
+        return self.queue.qsize()
+
+class ArtifactManager:
+    """لقطات الشاشة وملفات HTML للتشخيص
+    
+    - اللقطات الروتينية (صفحة التقديم) فقط عند تغير الحالة، وبحد أقصى لقطة كل N فحص
+    - لقطات الأخطاء والنجاح دائماً
+    - المجلد ring buffer: أقدم الملفات تُحذف عند تجاوز الحجم المسموح
+    """
+    
+    def __init__(self, directory="artifacts", max_mb=50, every_n_checks=1, image_type="jpeg",
+                 quality=60, clip_selector=None, log=None):
+        self.directory = directory
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.every_n_checks = max(1, every_n_checks)
+        self.image_type = image_type
+        self.quality = quality
+        self.clip_selector = clip_selector
+        self.log = log or logging.getLogger("monitor").info
+        self.routine_state = None
+        self.routine_check = None
+        self.lock = threading.Lock()
+    
+    @property
+    def extension(self):
+        return "jpg" if self.image_type == "jpeg" else "png"
+    
+    def screenshot_options(self):
+        """خيارات page.screenshot()"""
+        if self.image_type == "jpeg":
+            return {"type": "jpeg", "quality": self.quality}
+        return {"type": "png"}
+    
+    def should_capture(self, kind, state=None, check_number=0):
+        """هل نلتقط الآن؟ kind: routine أو failure أو success"""
+        if kind != "routine":
+            return True
+        
+        with self.lock:
+            if state is not None and state == self.routine_state:
                 return False
-            
-            with open(filepath, 'r') as f:
-                cookies = json.load(f)
-            
-            # تحويل format Chrome extension لـ Playwright
-            cookies = self.convert_chrome_cookies_to_playwright(cookies)
-            
-            self.page.context.add_cookies(cookies)
-            self.log_message(f"✅ تم تحميل {len(cookies)} cookie من {filepath}")
+            if self.routine_check is not None and check_number - self.routine_check < self.every_n_checks:
+                return False
+            self.routine_state = state
+            self.routine_check = check_number
             return True
+    
+    def save(self, name, data, extension=None):
+        """حفظ bytes في المجلد ثم تطبيق حد الحجم"""
+        os.makedirs(self.directory, exist_ok=True)
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        path = os.path.join(self.directory, f"{timestamp}_{name}.{extension or self.extension}")
+        with open(path, "wb") as f:
+            f.write(data)
+        self.enforce_limit()
+        return path
+    
+    def save_text(self, name, text, extension="html"):
+        return self.save(name, text.encode("utf-8"), extension)
+    
+    def enforce_limit(self):
+        """حذف أقدم الملفات حتى يرجع المجلد تحت الحد"""
+        with self.lock:
+            try:
+                entries = sorted(
+                    (e for e in os.scandir(self.directory) if e.is_file()),
+                    key=lambda e: e.stat().st_mtime
+                )
+            except OSError:
+                return
             
+            total = sum(e.stat().st_size for e in entries)
+            for entry in entries:
+                if total <= self.max_bytes:
+                    break
+                try:
+                    total -= entry.stat().st_size
+                    os.remove(entry.path)
+                except OSError:
+                    pass
+    
+    def usage(self):
+        """حجم المجلد الحالي بالبايت"""
+        try:
+            return sum(e.stat().st_size for e in os.scandir(self.directory) if e.is_file())
+        except OSError:
+            return 0
+
+# توحيد الكتابة العربية: التشكيل والتطويل والهمزات والتاء المربوطة والألف المقصورة
+ARABIC_DIACRITICS = re.compile('[\u064B-\u0652\u0670\u0640]')
+ARABIC_LETTER_MAP = str.maketrans({'أ': 'ا', 'إ': 'ا', 'آ': 'ا', 'ٱ': 'ا', 'ى': 'ي', 'ة': 'ه'})
+NON_WORD = re.compile(r'[\W_]+')
+ARTICLE_PREFIXES = ('وال', 'بال', 'فال', 'كال', 'لل', 'ال')
+
+@lru_cache(maxsize=65536)
+def normalize_arabic(text):
+    """نص موحد للمقارنة: بدون تشكيل، حروف موحدة، lowercase، مسافة واحدة بين الكلمات"""
+    text = ARABIC_DIACRITICS.sub('', text).translate(ARABIC_LETTER_MAP).lower()
+    return NON_WORD.sub(' ', text).strip()
+
+@lru_cache(maxsize=65536)
+def program_tokens(text):
+    """كلمات النص الموحد بدون "ال" التعريف وما يسبقها (الطب = طب، والتكنولوجيا = تكنولوجيا)"""
+    tokens = set()
+    for token in normalize_arabic(text).split():
+        for prefix in ARTICLE_PREFIXES:
+            if token.startswith(prefix) and len(token) - len(prefix) >= 2:
+                token = token[len(prefix):]
+                break
+        tokens.add(token)
+    return frozenset(tokens)
+
+@lru_cache(maxsize=65536)
+def text_trigrams(text):
+    """كل 3 حروف متتالية في النص الموحد (أي جزء من النص لازم تكون حروفه الثلاثية فيه)"""
+    normalized = normalize_arabic(text)
+    return frozenset(normalized[i:i + 3] for i in range(len(normalized) - 2))
+
+class ProgramMatcher:
+    """مطابقة التخصصات المستهدفة مع خيارات القائمة
+    
+    درجة التطابق (closeness) من الأقوى للأضعف:
+    0. النص كله هو الـ target بعد التوحيد
+    1. الـ target جزء متصل من النص: "علوم الحاسب" في "كلية علوم الحاسبات والمعلومات"
+    2. كل كلمات الـ target موجودة بس مش متتالية: "طب القاهرة" في "كلية الطب - جامعة القاهرة"
+    وفي نفس الدرجة الأقل في الكلمات الزيادة أقرب. تطابق الكلمات بس (درجة 2) بيتشال لو فيه
+    تخصص أقرب لنفس الـ target: "كلية الطب البيطري - جامعة القاهرة" مش هتتختار لـ "طب القاهرة"
+    طول ما "كلية الطب - جامعة القاهرة" موجودة.
+    
+    الـ indexes مجرد prefilter: كل target بيتسجل مرة تحت أندر كلماته ومرة تحت أندر 3 حروف
+    متتالية فيه، فكل تخصص بيتفحص مع الـ targets اللي ممكن تطابقه بس بدل المرور عليهم كلهم.
+    الترتيب حسب ترتيب TARGET_PROGRAMS ثم درجة التطابق.
+    """
+    
+    def __init__(self, targets):
+        self.targets = list(targets)
+        self.target_tokens = [program_tokens(t) for t in self.targets]
+        self.target_texts = [normalize_arabic(t) for t in self.targets]
+        self.index = self.build_index(self.target_tokens)
+        self.gram_index = self.build_index([text_trigrams(t) for t in self.targets])
+        # targets أقصر من 3 حروف مالهاش حروف ثلاثية - بتتفحص مع كل تخصص
+        self.short_targets = [
+            rank for rank, text in enumerate(self.target_texts) if 0 < len(text) < 3
+        ]
+        # القائمة شبه ثابتة بين الفحوصات: نتيجة كل تخصص بتتحسب مرة واحدة للـ targets دي
+        self.scores_cache = {}
+    
+    @staticmethod
+    def build_index(keys_per_target):
+        """كل target تحت أقل مفتاح تكراراً بين الـ targets: {مفتاح: [ترتيب الـ target]}"""
+        frequency = {}
+        for keys in keys_per_target:
+            for key in keys:
+                frequency[key] = frequency.get(key, 0) + 1
+        
+        index = {}
+        for rank, keys in enumerate(keys_per_target):
+            if keys:
+                key = min(keys, key=lambda k: (frequency[k], -len(k), k))
+                index.setdefault(key, []).append(rank)
+        return index
+    
+    @staticmethod
+    def compare(text, tokens, needle_text, needle_tokens):
+        """closeness على نصوص وكلمات متوحدة بالفعل"""
+        if text == needle_text:
+            level = 0
+        elif needle_text and needle_text in text:
+            level = 1
+        elif needle_tokens and needle_tokens <= tokens:
+            level = 2
+        else:
+            return None
+        return level, len(tokens - needle_tokens)
+    
+    @staticmethod
+    def closeness(text, needle):
+        """(الدرجة، عدد الكلمات الزيادة) لتطابق needle مع النص - الأقل أقرب، None لو مفيش تطابق"""
+        return ProgramMatcher.compare(
+            normalize_arabic(text), program_tokens(text), normalize_arabic(needle), program_tokens(needle)
+        )
+    
+    def scores(self, program):
+        """{ترتيب الـ target: closeness} لكل target بيطابق التخصص"""
+        scores = self.scores_cache.get(program)
+        if scores is not None:
+            return scores
+        
+        tokens = program_tokens(program)
+        text = normalize_arabic(program)
+        candidates = set(self.short_targets)
+        for token in tokens:
+            candidates.update(self.index.get(token, ()))
+        # مفاتيح الـ gram_index أقل من حروف التخصص الثلاثية: نبحث عنها هي في النص
+        for gram, ranks in self.gram_index.items():
+            if gram in text:
+                candidates.update(ranks)
+        
+        scores = {}
+        for rank in candidates:
+            score = self.compare(text, tokens, self.target_texts[rank], self.target_tokens[rank])
+            if score is not None:
+                scores[rank] = score
+        
+        if len(self.scores_cache) >= 65536:
+            self.scores_cache.clear()
+        self.scores_cache[program] = scores
+        return scores
+    
+    def rank(self, program):
+        """ترتيب أول target يطابق التخصص، أو None"""
+        return min(self.scores(program), default=None)
+    
+    def match(self, programs):
+        """التخصصات المطابقة مرتبة حسب ترتيب الـ targets ثم الأقرب"""
+        scored = [(program, self.scores(program)) for program in programs]
+        
+        best = {}
+        for _, scores in scored:
+            for rank, score in scores.items():
+                best[rank] = min(best.get(rank, score), score)
+        
+        ranked = []
+        for program, scores in scored:
+            kept = [
+                (rank, score) for rank, score in scores.items()
+                # تطابق كلمات بس وفيه تخصص أقرب لنفس الـ target = تخصص تاني (بيطري، أسنان...)
+                if score[0] < 2 or score == best[rank]
+            ]
+            if kept:
+                rank, score = min(kept)
+                ranked.append((rank, score, normalize_arabic(program), program))
+        ranked.sort()
+        return [program for _, _, _, program in ranked]
+    
+    @staticmethod
+    def contains(text, needle):
+        """هل النص يحتوي needle بعد التوحيد؟ (للبحث عن خيار في القائمة)"""
+        return ProgramMatcher.closeness(text, needle) is not None
+    
+    @staticmethod
+    def best_option(options, needle):
+        """أقرب خيار متاح (مش disabled) لـ needle، أو None"""
+        best = None
+        for option in options:
+            if option["disabled"]:
+                continue
+            score = ProgramMatcher.closeness(option["text"], needle)
+            if score is not None and (best is None or score < best[0]):
+                best = (score, option)
+        return best and best[1]
+
+class ProgramSnapshotStore:
+    """آخر قائمة تخصصات لكل رابط مع hash ثابت، محفوظة في ملف JSON
+    
+    - لو الـ hash ما اتغيرش نتخطى المطابقة
+    - لو اتغير نرجّع المضاف والمحذوف فقط (تغيير الترتيب لوحده بيتسجل من غير مضاف)
+    - الملف بيخلي إعادة التشغيل تكمل من آخر حالة بدل اعتبار كل التخصصات جديدة
+    """
+    
+    def __init__(self, path="programs_snapshot.json", log=None):
+        self.path = path
+        self.log = log or logging.getLogger("monitor").info
+        self.snapshots = {}
+        self.found = {}
+        self.seen_keys = set()
+        self.lock = threading.Lock()
+        self.load()
+    
+    @staticmethod
+    def digest(programs):
+        """hash للقائمة بترتيب عرضها في الصفحة (إعادة الترتيب تغيير في حد ذاته)"""
+        return hashlib.sha256("\n".join(programs).encode("utf-8")).hexdigest()
+    
+    def load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+            self.snapshots = data.get("snapshots", {})
+            found = data.get("found", {})
+            # الصيغة القديمة (قائمة واحدة لكل الروابط) تتطبق على أي رابط
+            self.found = {"*": found} if isinstance(found, list) else found
+            self.log(f"✅ تم تحميل {len(self.snapshots)} snapshot من {self.path}")
         except Exception as e:
-            self.log_message(f"❌ خطأ في تحميل الـ cookies: {e}")
-            return False
+            self.log(f"⚠️ خطأ في قراءة {self.path}: {e}")
     
-    def convert_chrome_cookies_to_playwright(self, cookies):
-        """تحويل cookies من format Chrome extension لـ Playwright"""
-        playwright_cookies = []
+    def save(self):
+        """كتابة ذرية (ملف مؤقت ثم os.replace)"""
+        if not self.path:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"snapshots": self.snapshots, "found": self.found}, f, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            self.log(f"⚠️ خطأ في حفظ {self.path}: {e}")
+    
+    def previous(self, key):
+        """آخر قائمة محفوظة للرابط"""
+        return set(self.snapshots.get(key, {}).get("programs", []))
+    
+    def update(self, key, programs):
+        """تسجيل قائمة جديدة وإرجاع الفرق عن السابقة
         
-        for cookie in cookies:
-            pw_cookie = {
-                'name': cookie.get('name'),
-                'value': cookie.get('value'),
-                'domain': cookie.get('domain'),
-                'path': cookie.get('path', '/'),
+        first: أول فحص للرابط في العملية الحالية (لازم مطابقة كاملة مرة واحدة)
+        """
+        # نفس ترتيب الصفحة أو رد الـ API بدون تكرار
+        ordered = list(dict.fromkeys(programs))
+        digest = self.digest(ordered)
+        
+        with self.lock:
+            first = key not in self.seen_keys
+            self.seen_keys.add(key)
+            
+            previous = self.snapshots.get(key)
+            if previous and previous["hash"] == digest:
+                return {"changed": False, "first": first, "added": [], "removed": [], "reordered": False}
+            
+            old_order = previous["programs"] if previous else []
+            old = set(old_order)
+            self.snapshots[key] = {
+                "hash": digest,
+                "programs": ordered,
+                "updated_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
             }
-            
-            # إضافة expires إذا كان موجود
-            if 'expirationDate' in cookie:
-                pw_cookie['expires'] = int(cookie['expirationDate'])
-            
-            # إضافة httpOnly إذا كان موجود
-            if 'httpOnly' in cookie:
-                pw_cookie['httpOnly'] = cookie['httpOnly']
-            
-            # إضافة secure إذا كان موجود
-            if 'secure' in cookie:
-                pw_cookie['secure'] = cookie['secure']
-            
-            # إضافة sameSite إذا كان موجود
-            if 'sameSite' in cookie:
-                sameSite = cookie['sameSite']
-                if sameSite == 'unspecified':
-                    pw_cookie['sameSite'] = 'None'
-                elif sameSite == 'no_restriction':
-                    pw_cookie['sameSite'] = 'None'
-                else:
-                    pw_cookie['sameSite'] = sameSite.capitalize()
-            
-            playwright_cookies.append(pw_cookie)
+            self.save()
         
-        return playwright_cookies
+        added = [p for p in ordered if p not in old]
+        removed = sorted(old - set(ordered))
+        return {
+            "changed": True,
+            "first": first,
+            "added": added,
+            "removed": removed,
+            "reordered": bool(previous) and not added and not removed and ordered != old_order,
+        }
     
-    def login_with_cookies(self):
-        """تسجيل دخول باستخدام cookies محفوظة"""
+    def found_for(self, key):
+        """التخصصات اللي اتعاملنا معها قبل كده في الرابط ده"""
+        with self.lock:
+            return set(self.found.get(key, [])) | set(self.found.get("*", []))
+    
+    def mark_found(self, key, program):
+        with self.lock:
+            programs = self.found.setdefault(key, [])
+            if program not in programs:
+                programs.append(program)
+            self.save()
+
+class PollScheduler:
+    """حساب الانتظار بين الفحوصات بدل sleep ثابت
+    
+    - معدل ثابت: الانتظار = الفترة - مدة الفحص
+    - exponential backoff مع jitter عند تكرار check_error
+    - hot windows بفترة أسرع و quiet hours بفترة أبطأ (بتوقيت SCHEDULE_TZ، الافتراضي القاهرة)
+    - حد أدنى صارم بين بداية كل فحص والتاني
+    
+    أي object فيه next_delay(check_seconds, failed) ينفع يتحط مكانه في monitor.scheduler.
+    """
+    
+    def __init__(self, interval=30, min_interval=10, hot_windows="", hot_interval=None,
+                 quiet_hours="", quiet_interval=None, max_backoff=600, jitter=0.2,
+                 timezone="Africa/Cairo"):
+        self.interval = interval
+        # المواعيد بتوقيت البوابة مش توقيت السيرفر (الحاوية غالباً UTC)
+        self.tz = ZoneInfo(timezone)
+        self.min_interval = min_interval
+        self.hot_windows = self.parse_windows(hot_windows)
+        self.hot_interval = hot_interval or interval
+        self.quiet_hours = self.parse_windows(quiet_hours)
+        self.quiet_interval = quiet_interval or interval
+        self.max_backoff = max_backoff
+        self.jitter = jitter
+        self.failures = 0
+        self.last_decision = None
+    
+    @classmethod
+    def from_env(cls):
+        def optional_int(name):
+            value = os.environ.get(name)
+            return int(value) if value else None
+        
+        return cls(
+            interval=int(os.environ.get("CHECK_INTERVAL", "30")),
+            min_interval=int(os.environ.get("MIN_CHECK_INTERVAL", "10")),
+            hot_windows=os.environ.get("HOT_WINDOWS", ""),
+            hot_interval=optional_int("HOT_INTERVAL"),
+            quiet_hours=os.environ.get("QUIET_HOURS", ""),
+            quiet_interval=optional_int("QUIET_INTERVAL"),
+            max_backoff=int(os.environ.get("MAX_BACKOFF", "600")),
+            jitter=float(os.environ.get("BACKOFF_JITTER", "0.2")),
+            timezone=os.environ.get("SCHEDULE_TZ", "Africa/Cairo"),
+        )
+    
+    @staticmethod
+    def parse_windows(spec):
+        """"08:00-10:30,20:00-02:00" -> [(480, 630), (1200, 120)] بالدقائق من منتصف الليل"""
+        windows = []
+        for part in spec.split(","):
+            part = part.strip()
+            if not part:
+                continue
+            start, end = (
+                int(h) * 60 + int(m)
+                for h, m in (t.strip().split(":") for t in part.split("-"))
+            )
+            windows.append((start, end))
+        return windows
+    
+    @staticmethod
+    def in_windows(windows, now):
+        minute = now.hour * 60 + now.minute
+        for start, end in windows:
+            if (start <= minute < end) if start < end else (minute >= start or minute < end):
+                return True
+        return False
+    
+    def next_delay(self, check_seconds=0, failed=False, now=None):
+        """الانتظار بالثواني قبل الفحص الجاي، والقرار يتسجل في last_decision
+        
+        now: datetime فيه timezone (للاختبار) - بيتحول لـ SCHEDULE_TZ
+        """
+        now = now.astimezone(self.tz) if now else datetime.now(self.tz)
+        
+        if self.in_windows(self.hot_windows, now):
+            mode, interval = "hot", self.hot_interval
+        elif self.in_windows(self.quiet_hours, now):
+            mode, interval = "quiet", self.quiet_interval
+        else:
+            mode, interval = "normal", self.interval
+        
+        self.failures = self.failures + 1 if failed else 0
+        if self.failures:
+            mode = f"backoff_{mode}"
+            interval *= 2 ** self.failures * random.uniform(1 - self.jitter, 1 + self.jitter)
+            interval = min(self.max_backoff, interval)
+        
+        delay = max(interval, self.min_interval) - check_seconds
+        delay = max(delay, 0)
+        
+        self.last_decision = {
+            "mode": mode,
+            "interval": round(interval, 1),
+            "check_seconds": round(check_seconds, 1),
+            "delay": round(delay, 1),
+            "consecutive_failures": self.failures,
+            "next_check_at": datetime.fromtimestamp(time.time() + delay, self.tz).strftime("%Y-%m-%d %H:%M:%S %Z"),
+        }
+        return delay
+
+class JsonLinesFormatter(logging.Formatter):
+    """سطر JSON لكل رسالة: الوقت والمستوى والرسالة وأي حقول إضافية"""
+    
+    def format(self, record):
+        entry = {
+            "ts": datetime.fromtimestamp(record.created).strftime("%Y-%m-%d %H:%M:%S.%f")[:-3],
+            "level": record.levelname,
+            "msg": record.getMessage(),
+        }
+        entry.update(getattr(record, "fields", None) or {})
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+class BatchFlushMixin:
+    """الـ flush مرة واحدة في آخر كل دفعة بدل بعد كل سطر"""
+    
+    def flush(self):
+        pass
+    
+    def flush_batch(self):
+        self.acquire()
         try:
-            self.log_message("=" * 50)
+            if self.stream and not self.stream.closed:
+                self.stream.flush()
+        finally:
+            self.release()
+
+class BatchedRotatingFileHandler(BatchFlushMixin, logging.handlers.RotatingFileHandler):
+    pass
+
+class BatchedTimedRotatingFileHandler(BatchFlushMixin, logging.handlers.TimedRotatingFileHandler):
+    pass
+
+def gzip_rotator(source, dest):
+    """ضغط الملف القديم عند الـ rotation"""
+    with open(source, "rb") as src, gzip.open(dest, "wb") as dst:
+        shutil.copyfileobj(src, dst)
+    os.remove(source)
+
+class LogWriter:
+    """كتابة اللوج في thread خلفي على دفعات
+    
+    log_message بيحط السجل في queue وبس، والكتابة على الشاشة والملف والـ flush بتحصل هنا:
+    كل دفعة بتتجمع لحد batch_size سجل أو flush_interval ثانية ثم flush واحد.
+    """
+    
+    def __init__(self, handlers, batch_size=200, flush_interval=1.0):
+        self.handlers = handlers
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.queue = queue.Queue()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+    
+    def run(self):
+        running = True
+        while running:
+            batch = [self.queue.get()]
+            deadline = time.time() + self.flush_interval
+            while len(batch) < self.batch_size and batch[-1] is not None:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self.queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            
+            for record in batch:
+                if record is None:
+                    running = False
+                    continue
+                for handler in self.handlers:
+                    if record.levelno >= handler.level:
+                        try:
+                            handler.handle(record)
+                        except Exception:
+                            handler.handleError(record)
+            
+            for handler in self.handlers:
+                if hasattr(handler, "flush_batch"):
+                    handler.flush_batch()
+                else:
+                    handler.flush()
+    
+    def close(self, timeout=5):
+        """كتابة الباقي في الـ queue ثم إغلاق الملفات"""
+        self.queue.put(None)
+        self.thread.join(timeout)
+        for handler in self.handlers:
+            handler.close()
+
+log_writer = None
+
+def setup_logging():
+    """تجهيز logger "monitor" مرة واحدة لكل العملية
+    
+    LOG_LEVEL: مستوى الشاشة والملف (DEBUG لرؤية كل selector وكل خيار)
+    LOG_FILE: ملف JSON lines - بيتقسم عند LOG_MAX_MB أو كل LOG_ROTATE_WHEN (مثلاً midnight)
+    والملفات القديمة بتتضغط gzip ويتحفظ منها LOG_BACKUPS
+    """
+    global log_writer
+    logger = logging.getLogger("monitor")
+    if log_writer is not None:
+        return logger
+    
+    level = getattr(logging, os.environ.get("LOG_LEVEL", "INFO").upper(), logging.INFO)
+    
+    console = logging.StreamHandler(sys.stdout)
+    console.setFormatter(logging.Formatter("[%(asctime)s] %(message)s", "%Y-%m-%d %H:%M:%S"))
+    console.setLevel(level)
+    handlers = [console]
+    
+    log_file = os.environ.get("LOG_FILE", "monitor_log.jsonl")
+    if log_file:
+        backups = int(os.environ.get("LOG_BACKUPS", "5"))
+        rotate_when = os.environ.get("LOG_ROTATE_WHEN")
+        if rotate_when:
+            file_handler = BatchedTimedRotatingFileHandler(
+                log_file, when=rotate_when, backupCount=backups, encoding="utf-8", delay=True
+            )
+        else:
+            file_handler = BatchedRotatingFileHandler(
+                log_file, maxBytes=int(float(os.environ.get("LOG_MAX_MB", "10")) * 1024 * 1024),
+                backupCount=backups, encoding="utf-8", delay=True
+            )
+        file_handler.namer = lambda name: name + ".gz"
+        file_handler.rotator = gzip_rotator
+        file_handler.setFormatter(JsonLinesFormatter())
+        file_handler.setLevel(level)
+        handlers.append(file_handler)
+    
+    log_writer = LogWriter(
+        handlers,
+        batch_size=int(os.environ.get("LOG_BATCH_SIZE", "200")),
+        flush_interval=float(os.environ.get("LOG_FLUSH_INTERVAL", "1.0"))
+    )
+    atexit.register(log_writer.close)
+    
+    logger.setLevel(level)
+    logger.propagate = False
+    logger.addHandler(logging.handlers.QueueHandler(log_writer.queue))
+    return logger
+
+def jwt_expiry(token):
+    """وقت انتهاء JWT (exp) بدون التحقق من التوقيع، أو None لو مش JWT"""
+    try:
+        payload = token.split()[-1].split(".")[1]
+        payload += "=" * (-len(payload) % 4)
+        return float(json.loads(base64.urlsafe_b64decode(payload))["exp"])
+    except Exception:
+        return None
+
+def process_tree(root_pid=None):
+    """العملية وكل العمليات المتفرعة منها (driver و Chromium) من /proc - Linux فقط، None لو مش متاح
+    
+    كل عنصر: {pid, name, rss (بايت), cpu_ticks (utime + stime)}
+    """
+    root_pid = root_pid or os.getpid()
+    try:
+        entries = os.listdir("/proc")
+    except OSError:
+        return None
+    
+    page_size = os.sysconf("SC_PAGE_SIZE")
+    children = {}
+    stats = {}
+    for entry in entries:
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                stat = f.read()
+            name = stat[stat.index("(") + 1:stat.rindex(")")]
+            fields = stat.rsplit(")", 1)[1].split()
+            pid = int(entry)
+            stats[pid] = {
+                "pid": pid,
+                "name": name,
+                "rss": int(fields[21]) * page_size,
+                "cpu_ticks": int(fields[11]) + int(fields[12]),
+            }
+            children.setdefault(int(fields[1]), []).append(pid)
+        except (OSError, IndexError, ValueError):
+            continue
+    
+    processes = []
+    stack = [root_pid]
+    while stack:
+        pid = stack.pop()
+        stack.extend(children.get(pid, []))
+        if pid in stats:
+            processes.append(stats[pid])
+    return processes
+
+def process_tree_rss(root_pid=None):
+    """RSS العملية وكل المتفرع منها بالبايت، None لو مش متاح
+    
+    الصفحات المشتركة بين عمليات Chromium بتتحسب أكتر من مرة، فالرقم حد أعلى.
+    """
+    processes = process_tree(root_pid)
+    return None if processes is None else sum(p["rss"] for p in processes)
+
+def process_group(process, root_pid):
+    """تصنيف العملية: python (المراقب نفسه) / driver (node) / chromium / other"""
+    if process["pid"] == root_pid:
+        return "python"
+    name = process["name"].lower()
+    if "chrom" in name or "headless" in name:
+        return "chromium"
+    if name == "node":
+        return "driver"
+    return "other"
+
+class ResourceSampler:
+    """عينات دورية لاستهلاك المتصفح في ring buffer (لـ /debug/resources وملخص في /status)
+    
+    من /proc: RSS و CPU% لكل مجموعة عمليات (chromium / driver / python).
+    من CDP (لو اتبعتت): JS heap وعدد عناصر DOM والـ layouts للصفحات.
+    """
+    
+    def __init__(self, interval=30, size=240):
+        self.interval = interval
+        self.samples = deque(maxlen=size)
+        self.lock = threading.Lock()
+        self.next_at = 0
+        self.last_ticks = {}  # pid -> cpu_ticks في العينة السابقة
+        self.last_at = None
+        self.clock_ticks = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+    
+    @classmethod
+    def from_env(cls):
+        return cls(
+            interval=float(os.environ.get("RESOURCE_SAMPLE_INTERVAL", "30")),
+            size=int(os.environ.get("RESOURCE_SAMPLES", "240")),
+        )
+    
+    def due(self):
+        return self.interval > 0 and time.time() >= self.next_at
+    
+    def seconds_until_due(self):
+        return max(0.0, self.next_at - time.time()) if self.interval > 0 else float("inf")
+    
+    def sample(self, page_metrics=None):
+        """أخد عينة وإضافتها للـ buffer - page_metrics من resource_usage()"""
+        now = time.time()
+        self.next_at = now + self.interval
+        root_pid = os.getpid()
+        processes = process_tree(root_pid) or []
+        
+        groups = {}
+        ticks = {}
+        for process in processes:
+            group = groups.setdefault(process_group(process, root_pid), {"processes": 0, "rss": 0, "ticks": 0})
+            group["processes"] += 1
+            group["rss"] += process["rss"]
+            # العمليات الجديدة (بعد إعادة تشغيل المتصفح) بتتحسب من أول ما بدأت
+            group["ticks"] += max(0, process["cpu_ticks"] - self.last_ticks.get(process["pid"], 0))
+            ticks[process["pid"]] = process["cpu_ticks"]
+        
+        elapsed = now - self.last_at if self.last_at else None
+        self.last_ticks = ticks
+        self.last_at = now
+        
+        sample = {"time": datetime.fromtimestamp(now).strftime("%Y-%m-%d %H:%M:%S")}
+        for name, group in sorted(groups.items()):
+            sample[name] = {
+                "processes": group["processes"],
+                "rss_mb": round(group["rss"] / 1048576, 1),
+                # أول عينة مفيهاش فترة سابقة نقيس عليها
+                "cpu_percent": round(group["ticks"] / self.clock_ticks / elapsed * 100, 1) if elapsed else None,
+            }
+        sample["total_rss_mb"] = round(sum(g["rss"] for g in groups.values()) / 1048576, 1)
+        if page_metrics:
+            sample["pages"] = page_metrics
+        
+        with self.lock:
+            self.samples.append(sample)
+        return sample
+    
+    def snapshot(self):
+        with self.lock:
+            return list(self.samples)
+    
+    def summary(self):
+        """آخر عينة + أقل/متوسط/أقصى RSS و CPU لـ Chromium على طول الـ buffer"""
+        samples = self.snapshot()
+        if not samples:
+            return None
+        
+        def stats(values):
+            values = [v for v in values if v is not None]
+            if not values:
+                return None
+            return {"min": min(values), "avg": round(sum(values) / len(values), 1), "max": max(values)}
+        
+        chromium = [s.get("chromium", {}) for s in samples]
+        return {
+            "samples": len(samples),
+            "since": samples[0]["time"],
+            "latest": samples[-1],
+            "chromium_rss_mb": stats([c.get("rss_mb") for c in chromium]),
+            "chromium_cpu_percent": stats([c.get("cpu_percent") for c in chromium]),
+            "total_rss_mb": stats([s["total_rss_mb"] for s in samples]),
+            "js_heap_mb": stats([s.get("pages", {}).get("js_heap_mb") for s in samples]),
+        }
+
+def exact_text(text):
+    """regex لـ has_text يطابق نص الخيار كله (مش خيار أطول بيحتويه)"""
+    return re.compile(r"^\s*" + re.escape(text) + r"\s*$")
+
+class SelectorCache:
+    """ترتيب الـ selectors المرشحة حسب اللي نجح قبل كده، محفوظ في ملف JSON
+    
+    لكل مجموعة (حقل اسم المستخدم، زر الدخول، زر الاستمرار...): آخر selector نجح أولاً
+    ثم الباقي حسب نسبة النجاح، والترتيب الأصلي عند التساوي. الـ selectors العامة
+    (FALLBACK_SELECTORS) دايماً بعد الخاصة.
+    
+    الملف بيتكتب لما آخر selector ناجح يتغير، والعدادات لوحدها كل SELECTOR_CACHE_SAVE_INTERVAL
+    ثانية على الأكثر (ومع flush عند الإغلاق).
+    """
+    
+    def __init__(self, path="selector_cache.json", log=None, fallbacks=FALLBACK_SELECTORS):
+        self.path = path
+        self.log = log or logging.getLogger("monitor").info
+        self.fallbacks = set(fallbacks)
+        self.save_interval = int(os.environ.get("SELECTOR_CACHE_SAVE_INTERVAL", "300"))
+        self.groups = {}
+        self.lock = threading.Lock()
+        self.dirty = False
+        self.saved_at = time.monotonic()
+        self.load()
+    
+    def load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                self.groups = json.load(f)
+            self.log(f"✅ تم تحميل selectors متعلَّمة لـ {len(self.groups)} مجموعة من {self.path}")
+        except Exception as e:
+            self.log(f"⚠️ خطأ في قراءة {self.path}: {e}")
+    
+    def save(self):
+        """كتابة ذرية (ملف مؤقت ثم os.replace)"""
+        self.dirty = False
+        self.saved_at = time.monotonic()
+        if not self.path:
+            return
+        try:
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self.groups, f, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            self.log(f"⚠️ خطأ في حفظ {self.path}: {e}")
+    
+    def order(self, group, candidates):
+        """المرشحين بالترتيب المتعلَّم"""
+        with self.lock:
+            stats = self.groups.get(group, {})
+            last = stats.get("last")
+            counts = dict(stats.get("selectors", {}))
+        
+        def score(item):
+            index, selector = item
+            hits, misses = counts.get(selector, (0, 0))
+            return (selector in self.fallbacks, selector != last, -(hits + 1) / (hits + misses + 2), index)
+        
+        return [selector for _, selector in sorted(enumerate(candidates), key=score)]
+    
+    def miss(self, group, selectors):
+        """selectors مالهاش عناصر في الصفحة (تتحفظ مع الكتابة الجاية)"""
+        with self.lock:
+            self.dirty = True
+            counts = self.groups.setdefault(group, {}).setdefault("selectors", {})
+            for selector in selectors:
+                hits, misses = counts.get(selector, (0, 0))
+                counts[selector] = [hits, misses + 1]
+    
+    def hit(self, group, selector):
+        with self.lock:
+            stats = self.groups.setdefault(group, {})
+            counts = stats.setdefault("selectors", {})
+            hits, misses = counts.get(selector, (0, 0))
+            counts[selector] = [hits + 1, misses]
+            changed = stats.get("last") != selector
+            stats["last"] = selector
+            self.dirty = True
+            if changed or time.monotonic() - self.saved_at >= self.save_interval:
+                self.save()
+    
+    def flush(self):
+        """حفظ العدادات اللي لسه ماتكتبتش"""
+        with self.lock:
+            if self.dirty:
+                self.save()
+
+class RateLimitExceeded(Exception):
+    """الطلب مش هيلحق ياخد دور قبل الـ deadline"""
+
+class TokenBucket:
+    """token bucket بيسمح بالحجز مقدماً: الرصيد ممكن يبقى سالب = طابور بالترتيب"""
+    
+    def __init__(self, per_minute, burst):
+        self.rate = per_minute / 60.0
+        self.burst = max(1, burst)
+        self.tokens = float(self.burst)
+        self.updated = time.monotonic()
+    
+    def refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+    
+    def delay(self):
+        """الانتظار المطلوب لو اتحجز token دلوقتي (بعد refill)"""
+        return max(0.0, (1 - self.tokens) / self.rate) if self.rate > 0 else 0.0
+
+class RateLimiter:
+    """حد مشترك لكل العملية على الطلبات لبوابة التقديم
+    
+    كل طلب بياخد token من bucket الفئة بتاعته (login / poll / session) ومن bucket إجمالي.
+    في login الـ token لمحاولة دخول كاملة (timed_login) مش لكل صفحة جواها.
+    مفيش رفض فوري: الطلب بيستنى دوره (FIFO)، وبيترفض بـ RateLimitExceeded بس لو
+    دوره هييجي بعد الـ deadline.
+    
+    RATE_LIMIT_TOTAL و RATE_LIMITS بصيغة "طلبات في الدقيقة:burst"، مثلاً
+    RATE_LIMITS="login=4:2,poll=30:5". rate صفر = بدون حد.
+    """
+    
+    DEFAULT_CLASSES = {"login": (4, 2), "poll": (30, 5), "session": (20, 3)}
+    
+    def __init__(self, total=(60, 10), classes=None, deadline=120):
+        self.lock = threading.Lock()
+        self.total = TokenBucket(*total)
+        self.classes = {name: TokenBucket(*limits) for name, limits in (classes or self.DEFAULT_CLASSES).items()}
+        self.deadline = deadline
+        self.metrics = Metrics()
+    
+    @classmethod
+    def from_env(cls):
+        def parse(spec):
+            per_minute, _, burst = spec.partition(":")
+            return float(per_minute), int(burst or 1)
+        
+        classes = dict(cls.DEFAULT_CLASSES)
+        for item in os.environ.get("RATE_LIMITS", "").split(","):
+            name, _, spec = item.partition("=")
+            if name.strip() and spec:
+                classes[name.strip()] = parse(spec)
+        
+        return cls(
+            total=parse(os.environ.get("RATE_LIMIT_TOTAL", "60:10")),
+            classes=classes,
+            deadline=float(os.environ.get("RATE_LIMIT_DEADLINE", "120")),
+        )
+    
+    def reserve(self, endpoint, deadline=None):
+        """حجز دور وإرجاع الانتظار بالثواني - RateLimitExceeded لو أطول من الـ deadline"""
+        deadline = self.deadline if deadline is None else deadline
+        buckets = [self.total]
+        if endpoint in self.classes:
+            buckets.append(self.classes[endpoint])
+        
+        with self.lock:
+            now = time.monotonic()
+            for bucket in buckets:
+                bucket.refill(now)
+            wait = max(bucket.delay() for bucket in buckets)
+            if wait > deadline:
+                self.metrics.inc("portal_rate_limit_rejected_total", endpoint=endpoint)
+                raise RateLimitExceeded(f"{endpoint}: الدور بعد {wait:.0f} ثانية (الحد {deadline:.0f})")
+            for bucket in buckets:
+                bucket.tokens -= 1
+        
+        self.metrics.inc("portal_requests_total", endpoint=endpoint)
+        if wait > 0:
+            self.metrics.inc("portal_throttled_waits_total", endpoint=endpoint)
+            self.metrics.inc("portal_throttle_wait_seconds_total", round(wait, 3), endpoint=endpoint)
+        return wait
+    
+    def acquire(self, endpoint, deadline=None):
+        """انتظار الدور (blocking)"""
+        wait = self.reserve(endpoint, deadline)
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+    
+    async def acquire_async(self, endpoint, deadline=None):
+        """انتظار الدور بدون ما يوقف الـ event loop"""
+        wait = self.reserve(endpoint, deadline)
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return wait
+
+# مشترك بين كل المراقبين والحسابات في العملية
+portal_limiter = RateLimiter.from_env()
+
+class StudyInEgyptMonitor:
+    def __init__(self, username, password, target_programs, telegram_token=None, telegram_chat_id=None,
+                 tenant_id=None, data_dir=None, selectors=None):
+        """
+        username: اسم المستخدم للمنصة
+        password: كلمة المرور
+        target_programs: قائمة بأسماء التخصصات المطلوبة
+        telegram_token: توكن بوت التليجرام
+        telegram_chat_id: معرف المحادثة في التليجرام
+        tenant_id: اسم الحساب في وضع multi-tenant (None = حساب واحد)
+        data_dir: مجلد ملفات الحساب (snapshot و cookies و artifacts) - None = المسارات العامة
+        selectors: SelectorCache مشترك بين الحسابات - None = ملف SELECTOR_CACHE_FILE
+        """
+        self.tenant_id = tenant_id
+        self.logger = setup_logging()
+        self.username = username
+        self.password = password
+        self.target_programs = [p.strip() for p in target_programs]
+        self.matcher = ProgramMatcher(self.target_programs)
+        self.telegram_token = telegram_token
+        self.telegram_chat_id = telegram_chat_id
+        self.data_dir = data_dir
+        self.snapshots = ProgramSnapshotStore(
+            os.path.join(data_dir, "programs_snapshot.json") if data_dir
+            else os.environ.get("PROGRAMS_SNAPSHOT_FILE", "programs_snapshot.json"),
+            log=self.log_message
+        )
+        self.found_programs = {}
+        self.retry_targets = {}  # تخصصات فشل اختيارها: تتجرب تاني طول ما هي ظاهرة
+        self.selectors = selectors or SelectorCache(
+            os.environ.get("SELECTOR_CACHE_FILE", "selector_cache.json"), log=self.log_message
+        )
+        self.cookies_base64 = os.environ.get("COOKIES_BASE64")
+        self.cookies_file = os.path.join(data_dir, "cookies.json") if data_dir else "cookies.json"
+        self.last_programs = set()
+        self.is_running = False
+        self.dropdown_open = False
+        self.programs_select_index = None  # ترتيب قائمة التخصصات بين قوائم antd في الصفحة
+        
+        # عدة روابط تقديم: صفحة (تاب) لكل رابط في نفس الـ context بعد تسجيل الدخول
+        self.request_urls = []
+        self.completed_urls = set()
+        self.pages = {}
+        self.max_concurrent_checks = int(os.environ.get("MAX_CONCURRENT_CHECKS", "2"))
+        self.check_spacing = float(os.environ.get("CHECK_SPACING", "2"))
+        self.last_check_started_at = 0
+        self.scheduler = PollScheduler.from_env()
+        self.playwright = None
+        self.browser = None
+        self.page = None
+        self.status = {"state": "initialized", "last_check": None, "checks_count": 0}
+        self.base_url = "https://admission.study-in-egypt.gov.eg"
+        self.metrics = Metrics()
+        self.notifier = TelegramNotifier(telegram_token, telegram_chat_id, log=self.log_message, metrics=self.metrics)
+        self.artifacts = ArtifactManager(
+            directory=os.path.join(data_dir, "artifacts") if data_dir else os.environ.get("ARTIFACTS_DIR", "artifacts"),
+            max_mb=float(os.environ.get("ARTIFACTS_MAX_MB", "50")),
+            every_n_checks=int(os.environ.get("ARTIFACT_EVERY_N_CHECKS", "1")),
+            image_type=os.environ.get("ARTIFACT_FORMAT", "jpeg").lower(),
+            quality=int(os.environ.get("ARTIFACT_QUALITY", "60")),
+            clip_selector=os.environ.get("ARTIFACT_CLIP_SELECTOR"),
+            log=self.log_message
+        )
+        
+        # قراءة التخصصات من ردود الـ API بدل الـ DOM
+        # PROGRAMS_SOURCE: auto (الرد أولاً ثم الـ DOM) أو dom (الـ DOM فقط)
+        self.programs_source = os.environ.get("PROGRAMS_SOURCE", "auto").lower()
+        self.programs_api_pattern = os.environ.get("PROGRAMS_API_PATTERN", "program").lower()
+        self.programs_name_keys = [
+            k.strip() for k in os.environ.get(
+                "PROGRAMS_NAME_KEYS",
+                "nameAr,name_ar,arName,name,title,label,programName,facultyName"
+            ).split(",") if k.strip()
+        ]
+        self.programs_response_timeout = int(os.environ.get("PROGRAMS_RESPONSE_TIMEOUT", "5000"))
+        self.programs_response = None
+        # بعد أول مرة الرد مايوصلش مانستناهوش تاني: بناخده لو اتلقط أثناء تحميل الصفحة وإلا الـ DOM على طول
+        self.programs_response_missed = False
+        
+        # محرك الفحص: browser (إعادة تحميل الصفحة) أو http (طلب مباشر للـ API بالـ cookies)
+        self.poll_engine = os.environ.get("POLL_ENGINE", "browser").lower()
+        self.programs_api_url = os.environ.get("PROGRAMS_API_URL")
+        self.programs_api_method = "GET"
+        self.programs_api_post_data = None
+        self.programs_api_headers = {}
+        self.http_session = None
+        
+        # فحص الجلسة بين الفحوصات وتجديدها قبل انتهاء الـ cookies
+        # SESSION_PROBE_URL: endpoint محمي خفيف (الافتراضي: endpoint التخصصات لو اتعرفنا عليه)
+        self.session_probe_url = os.environ.get("SESSION_PROBE_URL")
+        self.session_probe_interval = int(os.environ.get("SESSION_PROBE_INTERVAL", "120"))
+        self.session_refresh_margin = int(os.environ.get("SESSION_REFRESH_MARGIN", "300"))
+        self.session_cookie_patterns = [
+            p.strip().lower() for p in os.environ.get(
+                "SESSION_COOKIE_PATTERNS", "token,session,auth,jwt,sid"
+            ).split(",") if p.strip()
+        ]
+        self.session_probed_at = 0
+        # بعد تجديد فشل (أو ما مدّش الجلسة) المحاولة الجاية بعد SESSION_PROBE_INTERVAL
+        self.session_refresh_retry_at = 0
+        self.status["session"] = {"expires_at": None, "valid": None, "last_probe": None, "refreshes": 0}
+        
+        # بروفايل دائم للمتصفح (cache على القرص + cookies بعد إعادة التشغيل)
+        self.profile_dir = os.environ.get("BROWSER_PROFILE_DIR")
+        self.cache_size_mb = int(os.environ.get("BROWSER_CACHE_MB", "100"))
+        self.profile_lock = None
+        self.context = None
+        self.cdp_session = None
+        
+        # watchdog: إعادة تشغيل المتصفح لو وقع، وتدويره كل فترة أو لو الذاكرة كبرت
+        self.browser_crashed = None  # سبب الوقوع أو None
+        self.closing_browser = False
+        self.session_cookies = None  # آخر cookies بعد فحص ناجح - لاسترجاع الجلسة بدون login
+        self.cycles_since_launch = 0
+        self.recycle_every_checks = int(os.environ.get("RECYCLE_EVERY_CHECKS", "1000"))
+        self.recycle_rss_mb = float(os.environ.get("RECYCLE_RSS_MB", "1500"))
+        self.recycle_heap_mb = float(os.environ.get("RECYCLE_JS_HEAP_MB", "400"))
+        self.memory_check_every = int(os.environ.get("MEMORY_CHECK_EVERY", "10"))
+        self.status["browser"] = {"relaunches": 0, "recycles": 0, "last_reason": None, "last_at": None}
+        # في وضع multi-tenant الـ registry هو اللي بيقيس العملية كلها
+        self.sampler = None if tenant_id else ResourceSampler.from_env()
+        
+        # الـ routes بتقرا snapshot منشور بدل self.status (start_monitor_thread بيربط الـ board)
+        self.status_board = None
+        self.publish_interval = float(os.environ.get("STATUS_PUBLISH_INTERVAL", "5"))
+        self.network_bytes = 0
+        self.network_cache_hits = 0
+        
+        # حظر الصور والخطوط والـ trackers اللي المراقب مش محتاجها
+        self.block_resources = os.environ.get("BLOCK_RESOURCES", "1") == "1"
+        self.block_resource_types = {
+            t.strip() for t in os.environ.get("BLOCK_RESOURCE_TYPES", "image,font,media").split(",") if t.strip()
+        }
+        self.block_url_patterns = [
+            p.strip().lower() for p in os.environ.get(
+                "BLOCK_URL_PATTERNS",
+                "google-analytics.com,googletagmanager.com,doubleclick.net,facebook.net,hotjar.com,clarity.ms"
+            ).split(",") if p.strip()
+        ]
+        self.allow_url_patterns = [
+            p.strip().lower() for p in os.environ.get("ALLOW_URL_PATTERNS", "").split(",") if p.strip()
+        ]
+        self.route_bypass = False
+        self.resource_sizes = {}
+        # متوسط حجم كل نوع (total, count) لتقدير التوفير في الروابط اللي ما اتحملتش قبل كده
+        self.resource_type_sizes = {}
+        
+        # أقصى عدد خطوات تمرير عند جمع خيارات القائمة الافتراضية
+        self.harvest_max_steps = int(os.environ.get("OPTIONS_MAX_SCROLL_STEPS", "50"))
+        self.status["blocked_requests"] = 0
+        self.status["blocked_by_type"] = {}
+        self.status["blocked_bytes_saved"] = 0
+    
+    def log_message(self, message, level=logging.INFO, **fields):
+        """تسجيل رسالة (الكتابة الفعلية في LogWriter في الخلفية)
+        
+        fields: حقول إضافية تظهر في سطر الـ JSON (مثلاً selector=...)
+        """
+        if self.tenant_id:
+            message = f"[{self.tenant_id}] {message}"
+            fields["tenant"] = self.tenant_id
+        self.logger.log(level, message, extra={"fields": fields} if fields else None)
+    
+    def emit(self, event_type, **data):
+        """event لحظي لـ /events (SSE) - مع اسم الحساب في وضع multi-tenant"""
+        if self.tenant_id:
+            data["tenant"] = self.tenant_id
+        event_bus.publish(event_type, **data)
+    
+    def throttle(self, endpoint):
+        """انتظار دور الطلب في portal_limiter قبل أي طلب لـ base_url (login / poll / session)"""
+        wait = portal_limiter.acquire(endpoint)
+        if wait >= 1:
+            self.log_message(f"⏳ انتظار {wait:.1f} ثانية (حد الطلبات: {endpoint})", level=logging.DEBUG)
+    
+    def send_telegram_alert(self, message):
+        """إرسال تنبيه عبر التليجرام (في الخلفية)"""
+        return self.notifier.send_message(message)
+    
+    def send_telegram_photo(self, photo_path, caption="", filename="photo.png"):
+        """إرسال صورة عبر التليجرام (في الخلفية) - مسار ملف أو bytes"""
+        try:
+            return self.notifier.send_photo(photo_path, caption, filename)
+        except Exception as e:
+            self.log_message(f"خطأ في إرسال الصورة: {e}")
+    
+    def save_cookies(self, filepath=None):
+        """حفظ cookies في ملف"""
+        filepath = filepath or self.cookies_file
+        try:
+            import json
+            cookies = self.page.context.cookies()
+            with open(filepath, 'w') as f:
+                json.dump(cookies, f)
+            self.log_message(f"✅ تم حفظ الـ cookies في {filepath}")
+            return True
+        except Exception as e:
+            self.log_message(f"❌ خطأ في حفظ الـ cookies: {e}")
+            return False
+    
+    def read_cookies(self, filepath=None):
+        """قراءة cookies (COOKIES_BASE64 أولاً ثم الملف) بصيغة Playwright - None لو مافيش"""
+        filepath = filepath or self.cookies_file
+        try:
+            import json
+            import os
+            
+            # أولاً: محاولة قراءة من BASE64 (environment variable أو إعدادات الحساب)
+            cookies_base64 = self.cookies_base64
+            if cookies_base64:
+                try:
+                    import base64
+                    cookies_json = base64.b64decode(cookies_base64).decode('utf-8')
+                    cookies = json.loads(cookies_json)
+                    
+                    # تحويل format Chrome extension لـ Playwright
+                    cookies = self.convert_chrome_cookies_to_playwright(cookies)
+                    
+                    self.log_message(f"✅ تم قراءة {len(cookies)} cookie من COOKIES_BASE64")
+                    return cookies
+                except Exception as e:
+                    self.log_message(f"⚠️ فشل تحميل من COOKIES_BASE64: {e}")
+            
+            # ثانياً: محاولة قراءة من ملف
+            if not os.path.exists(filepath):
+                self.log_message(f"⚠️ ملف الـ cookies غير موجود: {filepath}")
+                return None
+            
+            with open(filepath, 'r') as f:
+                cookies = json.load(f)
+            
+            # تحويل format Chrome extension لـ Playwright
+            cookies = self.convert_chrome_cookies_to_playwright(cookies)
+            
+            self.log_message(f"✅ تم قراءة {len(cookies)} cookie من {filepath}")
+            return cookies
+        
+        except Exception as e:
+            self.log_message(f"❌ خطأ في قراءة الـ cookies: {e}")
+            return None
+    
+    def load_cookies(self, filepath=None):
+        """تحميل cookies من ملف"""
+        cookies = self.read_cookies(filepath)
+        if cookies is None:
+            return False
+        
+        try:
+            self.page.context.add_cookies(cookies)
+            self.log_message(f"✅ تم تحميل {len(cookies)} cookie في المتصفح")
+            return True
+        except Exception as e:
+            self.log_message(f"❌ خطأ في تحميل الـ cookies: {e}")
+            return False
+    
+    def convert_chrome_cookies_to_playwright(self, cookies):
+        """تحويل cookies من format Chrome extension لـ Playwright"""
+        playwright_cookies = []
+        
+        for cookie in cookies:
+            pw_cookie = {
+                'name': cookie.get('name'),
+                'value': cookie.get('value'),
+                'domain': cookie.get('domain'),
+                'path': cookie.get('path', '/'),
+            }
+            
+            # إضافة expires إذا كان موجود
+            if 'expirationDate' in cookie:
+                pw_cookie['expires'] = int(cookie['expirationDate'])
+            
+            # إضافة httpOnly إذا كان موجود
+            if 'httpOnly' in cookie:
+                pw_cookie['httpOnly'] = cookie['httpOnly']
+            
+            # إضافة secure إذا كان موجود
+            if 'secure' in cookie:
+                pw_cookie['secure'] = cookie['secure']
+            
+            # إضافة sameSite إذا كان موجود
+            if 'sameSite' in cookie:
+                sameSite = cookie['sameSite']
+                if sameSite == 'unspecified':
+                    pw_cookie['sameSite'] = 'None'
+                elif sameSite == 'no_restriction':
+                    pw_cookie['sameSite'] = 'None'
+                else:
+                    pw_cookie['sameSite'] = sameSite.capitalize()
+            
+            playwright_cookies.append(pw_cookie)
+        
+        return playwright_cookies
+    
+    def login_with_cookies(self):
+        """تسجيل دخول باستخدام cookies محفوظة"""
+        try:
+            self.log_message("=" * 50)
             self.log_message("محاولة تسجيل الدخول بالـ Cookies...")
             self.log_message("=" * 50)
             
             # فتح الصفحة الرئيسية أولاً
             self.log_message("⏳ فتح الصفحة الرئيسية...")
             self.page.goto(self.base_url, wait_until="networkidle", timeout=60000)
-            time.sleep(2)
+            
+            # البروفايل الدائم قد يحتوي على جلسة سارية من التشغيل السابق
+            if self.profile_dir and self.page.context.cookies(self.base_url):
+                self.log_message("⏳ فحص الجلسة المحفوظة في البروفايل...")
+                self.page.goto(f"{self.base_url}/dashboard", wait_until="domcontentloaded", timeout=30000)
+                if "login" not in self.page.url.lower():
+                    self.log_message("✅ الجلسة المحفوظة في البروفايل ما زالت سارية")
+                    self.status["state"] = "logged_in"
+                    return True
+                self.log_message("⚠️ جلسة البروفايل منتهية - سأحمّل الـ cookies")
             
             # تحميل الـ cookies
             if not self.load_cookies():
@@ -198,7 +1747,6 @@ class StudyInEgyptMonitor:
             # إعادة تحميل الصفحة بالـ cookies
             self.log_message("⏳ إعادة تحميل الصفحة بالـ cookies...")
             self.page.reload(wait_until="networkidle", timeout=60000)
-            time.sleep(3)
             
             # التحقق من نجاح تسجيل الدخول
             current_url = self.page.url
@@ -215,7 +1763,13 @@ class StudyInEgyptMonitor:
                 # محاولة الذهاب لصفحة محمية
                 test_url = f"{self.base_url}/dashboard"
                 self.page.goto(test_url, wait_until="domcontentloaded", timeout=30000)
-                time.sleep(2)
+                
+                # انتظار تطبيق React حتى يقرر: يعرض الصفحة أو يحوّل لـ login
+                self.wait_for(
+                    "dashboard_ready",
+                    lambda t: self.page.wait_for_load_state("networkidle", timeout=t),
+                    10000
+                )
                 
                 if "login" not in self.page.url.lower():
                     self.log_message("✅✅✅ تم تسجيل الدخول بنجاح بالـ Cookies! ✅✅✅")
@@ -236,101 +1790,356 @@ class StudyInEgyptMonitor:
             self.log_message(f"❌ خطأ في تسجيل الدخول بالـ cookies: {e}")
             self.log_message("سأحاول تسجيل دخول عادي...")
             return self.login()
-        """تسجيل رسالة مع الوقت"""
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        log = f"[{timestamp}] {message}"
-        print(log, flush=True)
+    
+    def timed_login(self):
+        """تسجيل الدخول (cookies ثم العادي) مع قياس الزمن
         
-        try:
-            with open("monitor_log.txt", "a", encoding="utf-8") as f:
-                f.write(log + "\n")
-        except:
-            pass
+        token واحد من bucket الـ login لكل محاولة، مهما كان عدد الصفحات اللي بتفتحها
+        (ومن ضمنها الرجوع لتسجيل الدخول العادي).
+        """
+        with self.metrics.span("login"):
+            try:
+                self.throttle("login")
+                logged_in = self.login_with_cookies()
+            except RateLimitExceeded as e:
+                self.log_message(f"⏳ تأجيل تسجيل الدخول: {e}", logging.WARNING)
+                self.status["state"] = "login_failed"
+                logged_in = False
+        if not logged_in:
+            self.metrics.error("login")
+        self.emit("login", ok=logged_in, state=self.status["state"])
+        return logged_in
     
     def init_browser(self):
         """تهيئة المتصفح"""
+        started_at = time.time()
+        # قفل البروفايل قبل تشغيل Playwright عشان الفشل هنا مايسيبش driver شغال
+        if self.profile_dir and not self.acquire_profile_lock():
+            return False
         try:
             self.log_message("تهيئة Playwright...")
             self.playwright = sync_playwright().start()
             
-            self.log_message("تشغيل المتصفح...")
-            self.browser = self.playwright.chromium.launch(
-                headless=True,
-                args=[
-                    '--no-sandbox',
-                    '--disable-setuid-sandbox',
-                    '--disable-dev-shm-usage',
-                    '--disable-gpu',
-                    '--disable-blink-features=AutomationControlled',  # إخفاء automation
-                    '--disable-features=IsolateOrigins,site-per-process',
-                ]
-            )
+            launch_args = list(BROWSER_ARGS)
+            context_options = BROWSER_CONTEXT_OPTIONS
+            
+            if self.profile_dir:
+                # بروفايل دائم: الـ cache والـ cookies تبقى بعد إعادة التشغيل
+                self.log_message(f"تشغيل المتصفح ببروفايل دائم: {self.profile_dir}")
+                launch_args.append(f'--disk-cache-size={self.cache_size_mb * 1024 * 1024}')
+                context = self.playwright.chromium.launch_persistent_context(
+                    self.profile_dir,
+                    headless=True,
+                    args=launch_args,
+                    **context_options
+                )
+                self.context = context
+            else:
+                self.log_message("تشغيل المتصفح...")
+                self.browser = self.playwright.chromium.launch(
+                    headless=True,
+                    args=launch_args
+                )
+                
+                self.log_message("إنشاء صفحة جديدة...")
+                context = self.browser.new_context(**context_options)
+                self.context = context
             
-            self.log_message("إنشاء صفحة جديدة...")
-            context = self.browser.new_context(
-                viewport={'width': 1920, 'height': 1080},
-                user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/131.0.0.0 Safari/537.36',
-                locale='ar-EG',
-                timezone_id='Africa/Cairo',
-                # إضافة permissions
-                permissions=['geolocation'],
-                geolocation={'latitude': 30.0444, 'longitude': 31.2357},  # Cairo
-                # إضافة extra headers
-                extra_http_headers={
-                    'Accept-Language': 'ar-EG,ar;q=0.9,en-US;q=0.8,en;q=0.7',
-                    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-                    'Accept-Encoding': 'gzip, deflate, br',
-                    'DNT': '1',
-                    'Connection': 'keep-alive',
-                    'Upgrade-Insecure-Requests': '1',
-                }
-            )
+            # إغلاق الـ context من غير ما نقفله إحنا = المتصفح وقع
+            context.on("close", lambda _: self.on_browser_crash("browser_closed"))
+            self.cycles_since_launch = 0
             
-            self.page = context.new_page()
+            # البروفايل الدائم يفتح صفحة تلقائياً
+            if context.pages:
+                self.page = context.pages[0]
+            else:
+                self.page = context.new_page()
             
-            # إخفاء webdriver و automation flags
-            self.page.add_init_script("""
-                // إخفاء webdriver
-                Object.defineProperty(navigator, 'webdriver', {
-                    get: () => false
-                });
-                
-                // إخفاء automation
-                delete navigator.__proto__.webdriver;
-                
-                // تعديل permissions
-                const originalQuery = window.navigator.permissions.query;
-                window.navigator.permissions.query = (parameters) => (
-                    parameters.name === 'notifications' ?
-                        Promise.resolve({ state: Notification.permission }) :
-                        originalQuery(parameters)
-                );
-                
-                // إضافة plugins
-                Object.defineProperty(navigator, 'plugins', {
-                    get: () => [1, 2, 3, 4, 5]
-                });
-                
-                // إضافة languages
-                Object.defineProperty(navigator, 'languages', {
-                    get: () => ['ar-EG', 'ar', 'en-US', 'en']
-                });
-                
-                // Chrome runtime
-                window.chrome = {
-                    runtime: {}
-                };
-            """)
+            # قياس حجم البيانات المنقولة عبر الشبكة (الـ cache لا يُحسب)
+            self.start_network_accounting(context)
+            
+            # فلتر الطلبات: حظر الموارد غير المطلوبة
+            if self.block_resources:
+                context.route("**/*", self.route_request)
+                self.log_message(f"🚫 حظر الموارد: {', '.join(sorted(self.block_resource_types))}")
             
-            # زيادة timeout للصفحات البطيئة
-            self.page.set_default_timeout(90000)  # 90 ثانية
+            self.setup_page(self.page)
             
-            self.log_message("✅ تم تهيئة المتصفح بنجاح")
+            self.status["browser_startup_seconds"] = round(time.time() - started_at, 2)
+            self.log_message(f"✅ تم تهيئة المتصفح بنجاح ({self.status['browser_startup_seconds']} ثانية)")
             return True
             
         except Exception as e:
             self.log_message(f"❌ خطأ في تهيئة المتصفح: {e}")
+            # اللي اتشغل قبل الخطأ (Playwright والمتصفح وقفل البروفايل) يتقفل
+            self.close_browser()
+            return False
+    
+    def setup_page(self, page):
+        """تجهيز صفحة جديدة: التقاط الردود، إخفاء automation، والـ timeout"""
+        # التقاط رد قائمة التخصصات من الـ API
+        page.on("response", self.on_response)
+        page.on("crash", lambda _: self.on_browser_crash("page_crash"))
+        
+        # إخفاء webdriver و automation flags
+        page.add_init_script(STEALTH_INIT_SCRIPT)
+        
+        # زيادة timeout للصفحات البطيئة
+        page.set_default_timeout(90000)  # 90 ثانية
+    
+    def should_block(self, request):
+        """هل نحظر هذا الطلب؟ (ALLOW_URL_PATTERNS لها الأولوية)"""
+        url = request.url.lower()
+        
+        for pattern in self.allow_url_patterns:
+            if pattern in url:
+                return False
+        
+        if request.resource_type in self.block_resource_types:
+            return True
+        
+        for pattern in self.block_url_patterns:
+            if pattern in url:
+                return True
+        
+        return False
+    
+    def route_request(self, route):
+        """فلتر الطلبات المُركّب على الـ context"""
+        request = route.request
+        
+        if self.route_bypass or not self.should_block(request):
+            route.continue_()
+            return
+        
+        self.record_blocked(request)
+        route.abort("blockedbyclient")
+    
+    def record_blocked(self, request):
+        """عدّ الطلب المحظور والبايتات اللي وفرناها بحظره
+        
+        الحجم من آخر مرة الرابط ده اتحمل (في لقطة شاشة)، وإلا متوسط نوعه، وإلا BLOCKED_SIZE_ESTIMATES.
+        """
+        resource_type = request.resource_type
+        self.status["blocked_requests"] += 1
+        by_type = self.status["blocked_by_type"]
+        by_type[resource_type] = by_type.get(resource_type, 0) + 1
+        
+        size = self.resource_sizes.get(request.url)
+        if size is None:
+            total, count = self.resource_type_sizes.get(resource_type, (0, 0))
+            size = total // count if count else BLOCKED_SIZE_ESTIMATES.get(resource_type, 0)
+        self.status["blocked_bytes_saved"] += size
+        self.metrics.inc("monitor_blocked_bytes_saved_total", size, type=resource_type)
+    
+    def remember_resource_size(self, response):
+        """تذكر أحجام الموارد اللي بنحظرها (تتحمل أثناء لقطات الشاشة) لحساب التوفير"""
+        try:
+            resource_type = response.request.resource_type
+            if resource_type not in self.block_resource_types:
+                return
+            size = response.headers.get("content-length")
+            if not size:
+                return
+            size = int(size)
+            if len(self.resource_sizes) < 5000:
+                self.resource_sizes[response.url] = size
+            total, count = self.resource_type_sizes.get(resource_type, (0, 0))
+            self.resource_type_sizes[resource_type] = (total + size, count + 1)
+        except Exception:
+            pass
+    
+    def take_screenshot(self, path=None, locator=None, **kwargs):
+        """لقطة شاشة (للصفحة أو لعنصر) مع تحميل الصور المحظورة مؤقتاً - ترجع bytes"""
+        target = locator or self.page
+        if not self.block_resources:
+            return target.screenshot(path=path, **kwargs)
+        
+        self.route_bypass = True
+        try:
+            # إعادة طلب الصور اللي اتحظرت وانتظار تحميلها فعلاً عشان تظهر في اللقطة
+            try:
+                if self.page.evaluate(RELOAD_IMAGES_SCRIPT, 5000) < 0:
+                    self.log_message("⚠️ الصور ما خلصتش تحميل قبل اللقطة", logging.DEBUG)
+            except Exception:
+                pass
+            return target.screenshot(path=path, **kwargs)
+        finally:
+            self.route_bypass = False
+    
+    def capture_screenshot(self, name, caption, kind="failure", state=None):
+        """لقطة شاشة حسب سياسة ArtifactManager: تُحفظ في الـ ring buffer وتُرسل من الذاكرة"""
+        if not self.artifacts.should_capture(kind, state, self.status["checks_count"]):
+            return None
+        
+        try:
+            locator = None
+            if kind == "routine" and self.artifacts.clip_selector:
+                candidate = self.page.locator(self.artifacts.clip_selector).first
+                if candidate.count() > 0:
+                    locator = candidate
+            
+            data = self.take_screenshot(locator=locator, **self.artifacts.screenshot_options())
+            return self.save_screenshot(name, caption, data)
+        except Exception as e:
+            self.log_message(f"خطأ في لقطة الشاشة: {e}")
+            return None
+    
+    def save_screenshot(self, name, caption, data):
+        """حفظ اللقطة في الـ ring buffer وإرسالها للتليجرام من الذاكرة"""
+        path = self.artifacts.save(name, data)
+        self.log_message(f"📸 لقطة شاشة: {path}")
+        self.send_telegram_photo(data, caption, filename=os.path.basename(path))
+        return path
+    
+    def wait_for(self, name, wait, timeout):
+        """انتظار شرط جاهزية بمهلة خاصة به مع قياس المدة الفعلية
+        
+        wait: دالة تستقبل المهلة (ms) وتنفذ انتظار Playwright
+        """
+        started_at = time.time()
+        try:
+            wait(timeout)
+            ok = True
+        except PlaywrightTimeout:
+            ok = False
+        return self.record_wait(name, started_at, ok, timeout)
+    
+    def record_wait(self, name, started_at, ok, timeout):
+        """تسجيل مدة الانتظار في /status واللوج (مشترك بين المحركين)"""
+        elapsed_ms = int((time.time() - started_at) * 1000)
+        self.status.setdefault("waits", {})[name] = {"ms": elapsed_ms, "ok": ok, "timeout_ms": timeout}
+        if ok:
+            self.log_message(f"⏱️ {name}: {elapsed_ms}ms")
+        else:
+            self.log_message(f"⚠️ {name}: انتهت المهلة بعد {elapsed_ms}ms")
+        return ok
+    
+    def read_options(self, selector):
+        """كل خيارات القائمة في round trip واحد: [{index, text, value, disabled}]"""
+        return self.page.evaluate(READ_OPTIONS_SCRIPT, selector)
+    
+    def probe_selectors(self, selectors):
+        """عدد العناصر لكل selector في round trip واحد (None لصيغ Playwright الخاصة)"""
+        try:
+            return self.page.evaluate(PROBE_SELECTORS_SCRIPT, selectors)
+        except Exception:
+            return [None] * len(selectors)
+    
+    def find_selectors(self, group, candidates):
+        """المرشحين الموجودين في الصفحة بالترتيب المتعلَّم (generator)
+        
+        كل المرشحين بيتفحصوا في evaluate واحد، وصيغ Playwright الخاصة فقط بـ locator().count()
+        لحد ما نوصلها. النداء على selectors.hit() عند النجاح مسؤولية المستدعي.
+        """
+        ordered = self.selectors.order(group, candidates)
+        counts = self.probe_selectors(ordered)
+        self.selectors.miss(group, [s for s, c in zip(ordered, counts) if c == 0])
+        
+        for selector, count in zip(ordered, counts):
+            if count is None:
+                try:
+                    count = self.page.locator(selector).count()
+                except Exception:
+                    count = 0
+            if count:
+                yield selector
+    
+    def resolve_selector(self, group, candidates):
+        """أول selector موجود في الصفحة، أو None"""
+        selector = next(self.find_selectors(group, candidates), None)
+        if selector:
+            self.selectors.hit(group, selector)
+        return selector
+    
+    def harvest_args(self, target=None):
+        """معاملات HARVEST_OPTIONS_SCRIPT"""
+        return {
+            "selector": OPEN_DROPDOWN_OPTIONS,
+            "holder": OPEN_DROPDOWN_HOLDER,
+            "target": target,
+            "maxSteps": self.harvest_max_steps,
+        }
+    
+    def record_harvest(self, result):
+        """تسجيل عدد خطوات التمرير ومدتها"""
+        self.status["last_harvest_steps"] = result["steps"]
+        self.status["last_harvest_ms"] = result["elapsed_ms"]
+        self.metrics.observe("option_harvest", result["elapsed_ms"] / 1000)
+        self.metrics.inc("monitor_harvest_scroll_steps_total", result["steps"])
+        
+        self.log_message(
+            f"📜 جمعت {len(result['options'])} خيار في {result['steps']} خطوة تمرير ({result['elapsed_ms']}ms)"
+        )
+        if not result["complete"]:
+            self.log_message(f"⚠️ توقف التمرير بعد {result['steps']} خطوة قبل نهاية القائمة")
+        return result["options"]
+    
+    def harvest_options(self, target=None):
+        """كل خيارات القائمة المفتوحة حتى اللي خارج الجزء المرسوم من القائمة الافتراضية"""
+        return self.record_harvest(self.page.evaluate(HARVEST_OPTIONS_SCRIPT, self.harvest_args(target)))
+    
+    def wait_for_dropdown_closed(self):
+        """انتظار إغلاق القائمة المنسدلة بعد Escape"""
+        return self.wait_for(
+            "dropdown_closed",
+            lambda t: self.page.wait_for_selector(
+                '.ant-select-dropdown:not(.ant-select-dropdown-hidden)',
+                state='hidden', timeout=t
+            ),
+            2000
+        )
+    
+    def acquire_profile_lock(self):
+        """قفل البروفايل حتى لا تستخدمه عمليتان في نفس الوقت"""
+        try:
+            import fcntl
+        except ImportError:
+            # مافيش fcntl (Windows) - نكتفي بقفل Chromium نفسه
+            return True
+        
+        os.makedirs(self.profile_dir, exist_ok=True)
+        lock_path = os.path.join(self.profile_dir, "monitor.lock")
+        self.profile_lock = open(lock_path, "w")
+        try:
+            fcntl.flock(self.profile_lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            self.log_message(f"❌ البروفايل مستخدم من عملية أخرى: {self.profile_dir}")
+            self.profile_lock.close()
+            self.profile_lock = None
             return False
+        
+        self.profile_lock.write(str(os.getpid()))
+        self.profile_lock.flush()
+        return True
+    
+    def release_profile_lock(self):
+        """فك قفل البروفايل"""
+        if self.profile_lock:
+            try:
+                self.profile_lock.close()
+            except:
+                pass
+            self.profile_lock = None
+    
+    def start_network_accounting(self, context, page=None):
+        """عدّ البايتات المنقولة والطلبات المخدومة من الـ cache عبر CDP"""
+        try:
+            cdp = context.new_cdp_session(page or self.page)
+            cdp.send("Network.enable")
+            cdp.on("Network.loadingFinished", self.on_loading_finished)
+            cdp.on("Network.requestServedFromCache", self.on_served_from_cache)
+            self.cdp_session = cdp
+        except Exception as e:
+            self.log_message(f"⚠️ لا يمكن قياس البيانات المنقولة: {e}")
+    
+    def on_loading_finished(self, params):
+        """إضافة حجم الرد (كما نُقل عبر الشبكة) للعداد"""
+        self.network_bytes += params.get("encodedDataLength", 0)
+    
+    def on_served_from_cache(self, params):
+        """عدّ الطلبات المخدومة من الـ disk cache"""
+        self.network_cache_hits += 1
     
     def login(self):
         """تسجيل الدخول للمنصة"""
@@ -343,7 +2152,6 @@ class StudyInEgyptMonitor:
             self.log_message("⏳ زيارة الصفحة الرئيسية أولاً...")
             try:
                 self.page.goto(self.base_url, wait_until="networkidle", timeout=60000)
-                time.sleep(random.randint(2, 4))
             except:
                 pass
             
@@ -359,17 +2167,15 @@ class StudyInEgyptMonitor:
             except:
                 self.log_message("⚠️ مافيش loader أو خلص")
             
-            # انتظار إضافي للـ React
-            time.sleep(random.randint(5, 8))
+            # انتظار رسم نموذج تسجيل الدخول
+            self.wait_for(
+                "login_form",
+                lambda t: self.page.wait_for_selector('form input, input', state='visible', timeout=t),
+                15000
+            )
             
             # أخذ لقطة شاشة للتشخيص
-            try:
-                screenshot_path = "login_page.png"
-                self.page.screenshot(path=screenshot_path)
-                self.log_message("📸 تم حفظ لقطة شاشة للصفحة: login_page.png")
-                self.send_telegram_photo(screenshot_path, "📸 صفحة تسجيل الدخول")
-            except Exception as e:
-                self.log_message(f"خطأ في لقطة الشاشة: {e}")
+            self.capture_screenshot("login_page", "📸 صفحة تسجيل الدخول")
             
             # فحص وجود CAPTCHA
             self.log_message("🔍 فحص وجود CAPTCHA...")
@@ -382,8 +2188,8 @@ class StudyInEgyptMonitor:
                     '#recaptcha',
                     '[class*="captcha"]',
                 ]
-                for sel in captcha_selectors:
-                    if self.page.locator(sel).count() > 0:
+                for sel, count in zip(captcha_selectors, self.probe_selectors(captcha_selectors)):
+                    if count:
                         captcha_found = True
                         self.log_message(f"⚠️ وجدت CAPTCHA: {sel}")
                         break
@@ -436,19 +2242,12 @@ class StudyInEgyptMonitor:
                 self.log_message("انتظار ظهور حقول الإدخال...")
                 self.page.wait_for_selector('input', timeout=15000)
                 self.log_message("✅ ظهرت حقول الإدخال")
-                time.sleep(2)
             except Exception as e:
                 self.log_message(f"⚠️ خطأ في انتظار الحقول: {e}")
             
-            for selector in username_selectors:
-                try:
-                    self.log_message(f"  محاولة: {selector}")
-                    if self.page.locator(selector).count() > 0:
-                        username_field = selector
-                        self.log_message(f"  ✅ وجدت الحقل: {selector}")
-                        break
-                except:
-                    continue
+            username_field = self.resolve_selector("login_username", username_selectors)
+            if username_field:
+                self.log_message(f"  ✅ وجدت الحقل: {username_field}")
             
             if not username_field:
                 self.log_message("❌ لم أجد حقل اسم المستخدم!")
@@ -466,12 +2265,11 @@ class StudyInEgyptMonitor:
                             inp_class = inp.get_attribute('class') or 'none'
                             inp_placeholder = inp.get_attribute('placeholder') or 'none'
                             
-                            self.log_message(f"Input {i+1}:")
-                            self.log_message(f"  type={inp_type}")
-                            self.log_message(f"  name={inp_name}")
-                            self.log_message(f"  id={inp_id}")
-                            self.log_message(f"  class={inp_class}")
-                            self.log_message(f"  placeholder={inp_placeholder}")
+                            self.log_message(
+                                f"Input {i+1}: type={inp_type} name={inp_name} id={inp_id} "
+                                f"class={inp_class} placeholder={inp_placeholder}",
+                                logging.DEBUG
+                            )
                         except:
                             pass
                 except Exception as e:
@@ -480,27 +2278,19 @@ class StudyInEgyptMonitor:
                 # طباعة HTML للتشخيص
                 try:
                     content = self.page.content()
-                    self.log_message("=" * 60)
-                    self.log_message("محتوى صفحة تسجيل الدخول:")
-                    self.log_message("=" * 60)
-                    # طباعة أول 2000 حرف بدل 500
-                    self.log_message(content[:2000])
-                    self.log_message("=" * 60)
+                    # أول 2000 حرف - الصفحة كاملة بتتبعت على التليجرام تحت
+                    self.log_message(f"محتوى صفحة تسجيل الدخول:\n{content[:2000]}", logging.DEBUG)
                     
                     # إرسال HTML كملف نصي على Telegram
                     if self.telegram_token and self.telegram_chat_id:
                         try:
-                            with open("page_content.html", "w", encoding="utf-8") as f:
-                                f.write(content)
+                            self.artifacts.save_text("page_content", content)
                             
-                            url = f"https://api.telegram.org/bot{self.telegram_token}/sendDocument"
-                            with open("page_content.html", "rb") as doc:
-                                files = {'document': doc}
-                                data = {
-                                    'chat_id': self.telegram_chat_id,
-                                    'caption': '📄 محتوى صفحة تسجيل الدخول'
-                                }
-                                requests.post(url, data=data, files=files, timeout=30)
+                            self.notifier.send_document(
+                                content.encode("utf-8"),
+                                '📄 محتوى صفحة تسجيل الدخول',
+                                filename="page_content.html"
+                            )
                         except Exception as e:
                             self.log_message(f"خطأ في إرسال HTML: {e}")
                             
@@ -512,15 +2302,9 @@ class StudyInEgyptMonitor:
             
             # البحث عن حقل كلمة المرور
             self.log_message("البحث عن حقل كلمة المرور...")
-            for selector in password_selectors:
-                try:
-                    self.log_message(f"  محاولة: {selector}")
-                    if self.page.locator(selector).count() > 0:
-                        password_field = selector
-                        self.log_message(f"  ✅ وجدت الحقل: {selector}")
-                        break
-                except:
-                    continue
+            password_field = self.resolve_selector("login_password", password_selectors)
+            if password_field:
+                self.log_message(f"  ✅ وجدت الحقل: {password_field}")
             
             if not password_field:
                 self.log_message("❌ لم أجد حقل كلمة المرور!")
@@ -554,18 +2338,15 @@ class StudyInEgyptMonitor:
                 }
             """, username_field)
             
-            time.sleep(0.5)
-            
             # التأكد من إدخال البيانات
             current_value = self.page.input_value(username_field)
-            self.log_message(f"✅ القيمة المدخلة: {current_value[:3]}*** (طول: {len(current_value)})")
+            self.log_message(f"✅ القيمة المدخلة: {current_value[:3]}*** (طول: {len(current_value)})", logging.DEBUG)
             
             if len(current_value) == 0:
                 self.log_message("⚠️ تحذير: الحقل فارغ! محاولة إعادة الكتابة...")
                 self.page.fill(username_field, self.username)
-                time.sleep(1)
                 current_value = self.page.input_value(username_field)
-                self.log_message(f"بعد المحاولة الثانية: طول = {len(current_value)}")
+                self.log_message(f"بعد المحاولة الثانية: طول = {len(current_value)}", logging.DEBUG)
             
             # حركة ماوس عشوائية
             self.page.mouse.move(random.randint(100, 500), random.randint(100, 500))
@@ -597,16 +2378,13 @@ class StudyInEgyptMonitor:
                 }
             """, password_field)
             
-            time.sleep(0.5)
-            
             # التحقق من كلمة المرور
             password_value = self.page.input_value(password_field)
-            self.log_message(f"✅ كلمة المرور: طول = {len(password_value)}")
+            self.log_message(f"✅ كلمة المرور: طول = {len(password_value)}", logging.DEBUG)
             
             if len(password_value) == 0:
                 self.log_message("⚠️ تحذير: حقل كلمة المرور فارغ! محاولة إعادة الكتابة...")
                 self.page.fill(password_field, self.password)
-                time.sleep(1)
             
             self.log_message("✅ تم إدخال البيانات بنجاح")
             
@@ -628,31 +2406,31 @@ class StudyInEgyptMonitor:
             ]
             
             clicked = False
-            for selector in button_selectors:
+            for selector in self.find_selectors("login_button", button_selectors):
                 try:
-                    self.log_message(f"  محاولة: {selector}")
-                    if self.page.locator(selector).count() > 0:
-                        # التأكد من أن الزر مرئي وقابل للضغط
-                        self.page.wait_for_selector(selector, state='visible', timeout=5000)
-                        
-                        # تحريك الماوس للزر (simulate human)
-                        button = self.page.locator(selector).first
-                        box = button.bounding_box()
-                        if box:
-                            # تحريك الماوس لمنتصف الزر
-                            self.page.mouse.move(
-                                box['x'] + box['width'] / 2,
-                                box['y'] + box['height'] / 2
-                            )
-                            time.sleep(0.3)
-                        
-                        # الضغط
-                        self.page.click(selector, timeout=5000, force=False)
-                        clicked = True
-                        self.log_message(f"  ✅ تم الضغط على الزر")
-                        break
+                    self.log_message(f"  محاولة: {selector}", logging.DEBUG, selector=selector)
+                    # التأكد من أن الزر مرئي وقابل للضغط
+                    self.page.wait_for_selector(selector, state='visible', timeout=5000)
+                    
+                    # تحريك الماوس للزر (simulate human)
+                    button = self.page.locator(selector).first
+                    box = button.bounding_box()
+                    if box:
+                        # تحريك الماوس لمنتصف الزر
+                        self.page.mouse.move(
+                            box['x'] + box['width'] / 2,
+                            box['y'] + box['height'] / 2
+                        )
+                        time.sleep(0.3)
+                    
+                    # الضغط
+                    self.page.click(selector, timeout=5000, force=False)
+                    self.selectors.hit("login_button", selector)
+                    clicked = True
+                    self.log_message(f"  ✅ تم الضغط على الزر")
+                    break
                 except Exception as e:
-                    self.log_message(f"  ⚠️ فشلت: {e}")
+                    self.log_message(f"  ⚠️ فشلت: {e}", logging.DEBUG, selector=selector)
                     continue
             
             if not clicked:
@@ -668,7 +2446,14 @@ class StudyInEgyptMonitor:
             
             # انتظار اكتمال تسجيل الدخول
             self.log_message("⏳ انتظار اكتمال تسجيل الدخول...")
-            time.sleep(5)
+            self.wait_for(
+                "login_result",
+                lambda t: self.page.wait_for_function("""
+                    () => !location.pathname.toLowerCase().includes('login') ||
+                          !!document.querySelector('.ant-form-item-explain-error, .ant-alert-error, .ant-message-error, .alert-danger')
+                """, timeout=t),
+                20000
+            )
             
             # التحقق من وجود رسائل خطأ أولاً
             error_messages = []
@@ -685,18 +2470,11 @@ class StudyInEgyptMonitor:
                     '[class*="Error"]',
                 ]
                 
-                for sel in error_selectors:
-                    if self.page.locator(sel).count() > 0:
-                        messages = self.page.locator(sel).all()
-                        for msg in messages:
-                            try:
-                                text = msg.inner_text().strip()
-                                if text and len(text) > 2:
-                                    error_messages.append(text)
-                                    if 'validation' in text.lower() or 'البريد' in text or 'email' in text.lower():
-                                        validation_failed = True
-                            except:
-                                pass
+                for text in self.page.evaluate(ERROR_TEXTS_SCRIPT, error_selectors):
+                    if text and len(text) > 2:
+                        error_messages.append(text)
+                        if 'validation' in text.lower() or 'البريد' in text or 'email' in text.lower():
+                            validation_failed = True
             except:
                 pass
             
@@ -719,21 +2497,19 @@ class StudyInEgyptMonitor:
                     self.log_message("   2. كلمة المرور صحيحة")
                     self.log_message("   3. الحساب مُفعّل")
             
-            # انتظار إضافي
-            time.sleep(3)
+            # انتظار اكتمال التحويل بعد تسجيل الدخول
+            self.wait_for(
+                "login_redirect",
+                lambda t: self.page.wait_for_load_state("networkidle", timeout=t),
+                10000
+            )
             
             # التحقق من نجاح تسجيل الدخول
             current_url = self.page.url
             self.log_message(f"الصفحة الحالية: {current_url}")
             
             # أخذ لقطة شاشة بعد المحاولة
-            try:
-                screenshot_path = "after_login.png"
-                self.page.screenshot(path=screenshot_path)
-                self.log_message("📸 لقطة شاشة بعد تسجيل الدخول: after_login.png")
-                self.send_telegram_photo(screenshot_path, "📸 بعد محاولة تسجيل الدخول")
-            except Exception as e:
-                self.log_message(f"خطأ في لقطة الشاشة: {e}")
+            self.capture_screenshot("after_login", "📸 بعد محاولة تسجيل الدخول")
             
             if "login" not in current_url.lower():
                 self.log_message("✅✅✅ تم تسجيل الدخول بنجاح! ✅✅✅")
@@ -773,931 +2549,1925 @@ class StudyInEgyptMonitor:
         except Exception as e:
             self.log_message(f"❌ خطأ في تسجيل الدخول: {e}")
             
-            try:
-                screenshot_path = "login_error.png"
-                self.page.screenshot(path=screenshot_path)
-                self.log_message("📸 تم حفظ لقطة شاشة: login_error.png")
-                self.send_telegram_photo(screenshot_path, f"❌ خطأ في تسجيل الدخول: {e}")
-            except Exception as screenshot_error:
-                self.log_message(f"خطأ في لقطة الشاشة: {screenshot_error}")
+            self.capture_screenshot("login_error", f"❌ خطأ في تسجيل الدخول: {e}")
             
             self.status["state"] = "login_failed"
             return False
-        """تسجيل الدخول للمنصة"""
+    
+    def is_programs_response(self, response):
+        """هل هذا الرد هو رد قائمة التخصصات؟"""
         try:
-            self.log_message("=" * 50)
-            self.log_message("بدء عملية تسجيل الدخول...")
-            self.log_message("=" * 50)
-            
-            self.log_message(f"فتح صفحة تسجيل الدخول: {self.base_url}/login")
-            
-            # زيارة الصفحة الرئيسية أولاً (simulate real user)
-            self.log_message("⏳ زيارة الصفحة الرئيسية أولاً...")
+            if response.request.resource_type not in ("xhr", "fetch"):
+                return False
+            if self.programs_api_pattern not in response.url.lower():
+                return False
+            content_type = response.headers.get("content-type", "")
+            return response.ok and "json" in content_type
+        except Exception:
+            return False
+    
+    def on_response(self, response):
+        """حفظ آخر رد لقائمة التخصصات (يتم تحليله لاحقاً في check_programs)"""
+        if self.programs_source != "dom" and self.is_programs_response(response):
+            self.programs_response = response
+        
+        self.remember_resource_size(response)
+    
+    def parse_programs_payload(self, payload):
+        """استخراج أسماء التخصصات من JSON - نختار أكبر قائمة فيها أسماء"""
+        best = []
+        stack = [payload]
+        
+        while stack:
+            node = stack.pop()
+            if isinstance(node, dict):
+                stack.extend(node.values())
+            elif isinstance(node, list):
+                names = []
+                for item in node:
+                    if isinstance(item, dict):
+                        for key in self.programs_name_keys:
+                            value = item.get(key)
+                            if isinstance(value, str) and value.strip():
+                                names.append(value.strip())
+                                break
+                    stack.append(item)
+                if len(names) > len(best):
+                    best = names
+        
+        # بترتيب الرد (الـ snapshot بيلاحظ إعادة الترتيب)
+        return list(dict.fromkeys(name for name in best if len(name) > 3))
+    
+    def wait_for_programs_response(self):
+        """انتظار رد قائمة التخصصات وتحليله - None لو ما وصلش رد"""
+        response = self.programs_response
+        
+        if response is None:
+            if self.programs_response_missed:
+                return None
             try:
-                self.page.goto(self.base_url, wait_until="networkidle", timeout=60000)
-                time.sleep(random.randint(2, 4))
-            except:
-                pass
+                response = self.page.wait_for_event(
+                    "response",
+                    predicate=self.is_programs_response,
+                    timeout=self.programs_response_timeout
+                )
+            except PlaywrightTimeout:
+                self.note_programs_response_missed()
+                return None
+        self.programs_response_missed = False
+        
+        try:
+            with self.metrics.span("programs_response"):
+                programs = self.parse_programs_payload(response.json())
+        except Exception as e:
+            self.log_message(f"⚠️ خطأ في تحليل رد التخصصات: {e}")
+            return None
+        
+        if not programs:
+            self.log_message(f"⚠️ رد التخصصات فارغ: {response.url}")
+            return None
+        
+        self.log_message(f"✅ قرأت {len(programs)} تخصص من رد الـ API: {response.url}")
+        self.remember_programs_request(response)
+        return programs
+    
+    def note_programs_response_missed(self):
+        """تسجيل إن رد التخصصات ماوصلش عشان الفحوصات الجاية ماتستناهوش"""
+        self.programs_response_missed = True
+        self.log_message(
+            "⚠️ لم يصل رد قائمة التخصصات - سأقرأ من القائمة المنسدلة على طول لحد ما يظهر الرد تاني"
+        )
+    
+    def remember_programs_request(self, response):
+        """حفظ طلب قائمة التخصصات لإعادة استخدامه في محرك HTTP وفحص الجلسة"""
+        request = response.request
+        self.programs_api_url = response.url
+        self.programs_api_method = request.method
+        self.programs_api_post_data = request.post_data
+        self.programs_api_headers = {
+            k: v for k, v in request.headers.items()
+            if not k.startswith(":") and k.lower() not in ("cookie", "content-length", "host")
+        }
+    
+    def extract_programs_from_dom(self, request_url=None):
+        """قراءة التخصصات من القائمة المنسدلة (ant-select)"""
+        self.log_message("🔍 البحث عن قائمة التخصصات...")
+        discovery_started_at = time.time()
+        
+        try:
+            current_programs = self.open_programs_dropdown()
             
-            # الآن ندخل على صفحة login
-            self.log_message("⏳ الانتقال لصفحة تسجيل الدخول...")
-            self.page.goto(f"{self.base_url}/login", wait_until="networkidle", timeout=90000)
+            if current_programs is None:
+                self.log_message("⚠️ لم أجد قائمة التخصصات!")
+                self.metrics.error("dropdown_discovery")
+                
+                # أخذ screenshot للتشخيص
+                self.capture_screenshot("no_programs_dropdown", "⚠️ لم أجد قائمة التخصصات")
+                
+                return None
             
-            self.log_message("⏳ انتظار تحميل React App...")
-            # انتظار اختفاء شاشة التحميل إن وجدت
-            try:
-                self.page.wait_for_selector('.ant-spin', state='hidden', timeout=10000)
-                self.log_message("✅ اختفى loader")
-            except:
-                self.log_message("⚠️ مافيش loader أو خلص")
+            self.metrics.observe("dropdown_discovery", time.time() - discovery_started_at)
+            for text in current_programs:
+                self.log_message(f"  📋 {text}", logging.DEBUG)
             
-            # انتظار إضافي للـ React
-            time.sleep(random.randint(5, 8))
+            # لو ظهر تخصص مستهدف نسيب القائمة مفتوحة لـ select_program (المسار السريع)
+            if self.pending_targets(current_programs, request_url):
+                self.dropdown_open = True
+            else:
+                try:
+                    self.page.keyboard.press("Escape")
+                    self.wait_for_dropdown_closed()
+                except:
+                    pass
+        
+        except Exception as e:
+            self.log_message(f"⚠️ خطأ في البحث عن القوائم: {e}")
+            self.metrics.error("dropdown_discovery")
             
-            # أخذ لقطة شاشة للتشخيص
-            try:
-                screenshot_path = "login_page.png"
-                self.page.screenshot(path=screenshot_path)
-                self.log_message("📸 تم حفظ لقطة شاشة للصفحة: login_page.png")
-                self.send_telegram_photo(screenshot_path, "📸 صفحة تسجيل الدخول")
-            except Exception as e:
-                self.log_message(f"خطأ في لقطة الشاشة: {e}")
+            # أخذ screenshot للتشخيص
+            self.capture_screenshot("dropdown_error", f"❌ خطأ: {e}")
             
-            # فحص وجود CAPTCHA
-            self.log_message("🔍 فحص وجود CAPTCHA...")
-            captcha_found = False
+            return None
+        
+        return current_programs
+    
+    def programs_dropdown_order(self, count):
+        """ترتيب تجربة القوائم: اللي طلعت قائمة التخصصات آخر مرة الأول"""
+        return sorted(range(count), key=lambda idx: idx != self.programs_select_index)
+    
+    def open_programs_dropdown(self):
+        """فتح قائمة التخصصات (antd) وقراءة خياراتها - القائمة بتفضل مفتوحة، None لو مالقيناهاش
+        
+        بيستخدمها الاستخراج من الـ DOM، و select_program لما التخصصات تكون اتقرت من رد الـ API
+        أو عبر HTTP والقائمة لسه مقفولة.
+        """
+        controls = self.page.locator(ANT_SELECT_CONTROLS).all()
+        self.log_message(f"وجدت {len(controls)} قائمة منسدلة", logging.DEBUG)
+        
+        for idx in self.programs_dropdown_order(len(controls)):
             try:
-                captcha_selectors = [
-                    'iframe[src*="recaptcha"]',
-                    'iframe[src*="captcha"]',
-                    '.g-recaptcha',
-                    '#recaptcha',
-                    '[class*="captcha"]',
-                ]
-                for sel in captcha_selectors:
-                    if self.page.locator(sel).count() > 0:
-                        captcha_found = True
-                        self.log_message(f"⚠️ وجدت CAPTCHA: {sel}")
-                        break
+                self.log_message(f"📋 فحص القائمة رقم {idx + 1}...", logging.DEBUG)
                 
-                if not captcha_found:
-                    self.log_message("✅ لا يوجد CAPTCHA")
-            except:
-                pass
+                # الضغط لفتح القائمة
+                controls[idx].click(timeout=3000)
+                self.wait_for(
+                    "dropdown_open",
+                    lambda t: self.page.wait_for_selector(OPEN_DROPDOWN_OPTIONS, state='visible', timeout=t),
+                    3000
+                )
+                
+                # الحصول على كل الخيارات (مع التمرير في القائمة الافتراضية)
+                with self.metrics.span("option_extraction"):
+                    options = self.harvest_options()
+                
+                # قائمة فاضية أو قائمة اللغات: نقفلها ونجرب اللي بعدها
+                programs = self.programs_from_options(options) if options else None
+                if programs is None:
+                    self.log_message(f"  ⏭️ تخطي القائمة رقم {idx + 1}", logging.DEBUG)
+                    self.page.keyboard.press("Escape")
+                    self.wait_for_dropdown_closed()
+                    continue
+                
+                self.programs_select_index = idx
+                self.log_message(f"✅ وجدت قائمة التخصصات! ({len(options)} خيار)")
+                return programs
             
-            # محاولات متعددة للعثور على حقول الإدخال
-            username_selectors = [
-                'input[name="username"]',
-                'input[name="email"]',
-                'input[type="text"]',
-                'input[type="email"]',
-                'input[placeholder*="اسم"]',
-                'input[placeholder*="username"]',
-                'input[placeholder*="email"]',
-                'input[placeholder*="البريد"]',
-                'input[id*="username"]',
-                'input[id*="email"]',
-                '#username',
-                '#email',
-                'input.ant-input:first-of-type',
-                'input.form-control:first-of-type',
-                '.ant-form-item:first-child input',
-            ]
+            except Exception as e:
+                self.log_message(f"  ⚠️ خطأ في القائمة {idx + 1}: {e}")
+                continue
+        
+        return None
+    
+    def programs_from_options(self, options):
+        """أسماء التخصصات من خيارات القائمة - None لو دي قائمة اللغات"""
+        if options[0]["text"] in LANGUAGE_OPTIONS:
+            return None
+        return list(dict.fromkeys(option["text"] for option in options if option["text"] and len(option["text"]) > 3))
+    
+    def open_request_form(self, request_url):
+        """فتح صفحة التقديم والضغط على زر 'إضافة الرغبات'"""
+        self.log_message(f"🔍 فتح صفحة التقديم...")
+        self.programs_response = None
+        self.dropdown_open = False
+        self.throttle("poll")
+        with self.metrics.span("goto"):
+            self.page.goto(request_url, wait_until="domcontentloaded", timeout=60000)
+            self.wait_for(
+                "request_page",
+                lambda t: self.page.wait_for_selector(
+                    'button:has-text("إضافة الرغبات"), div[class*="ant-select"]',
+                    state='visible', timeout=t
+                ),
+                15000
+            )
+        
+        # البحث عن زر "إضافة الرغبات"
+        self.log_message("🔍 البحث عن زر 'إضافة الرغبات'...")
+        
+        button_started_at = time.time()
+        add_button_found = False
+        for selector in self.find_selectors("add_wishes", ADD_WISHES_SELECTORS):
+            try:
+                self.log_message(f"محاولة زر 'إضافة الرغبات': {selector}", logging.DEBUG, selector=selector)
+                selects_before = self.page.locator('div[class*="ant-select"]').count()
+                self.page.click(selector, timeout=5000)
+                self.selectors.hit("add_wishes", selector)
+                add_button_found = True
+                self.log_message("✅ تم الضغط على زر 'إضافة الرغبات'")
+                
+                # انتظار ظهور قائمة جديدة (قائمة الرغبات) في النموذج
+                self.wait_for(
+                    "wishes_form",
+                    lambda t: self.page.wait_for_function(
+                        "(n) => document.querySelectorAll('div[class*=\"ant-select\"]').length > n",
+                        arg=selects_before, timeout=t
+                    ),
+                    10000
+                )
+                break
+            except Exception as e:
+                self.log_message(f"⚠️ فشل مع {selector}: {e}", logging.DEBUG, selector=selector)
+                continue
+        
+        self.metrics.observe("add_wishes_button", time.time() - button_started_at)
+        
+        if not add_button_found:
+            self.log_message("⚠️ لم أجد زر 'إضافة الرغبات' - ربما الرغبات مفتوحة بالفعل")
+        
+        return add_button_found
+    
+    def check_programs(self, request_url):
+        """فحص التخصصات المتاحة"""
+        try:
+            self.dropdown_open = False
+            self.open_request_form(request_url)
             
-            password_selectors = [
-                'input[name="password"]',
-                'input[type="password"]',
-                'input[placeholder*="كلمة"]',
-                'input[placeholder*="password"]',
-                'input[placeholder*="Password"]',
-                'input[placeholder*="المرور"]',
-                'input[id*="password"]',
-                '#password',
-                '.ant-form-item:nth-child(2) input',
-                'input[type="password"].ant-input',
-            ]
+            # الآن قراءة التخصصات: من رد الـ API أولاً ثم من القائمة المنسدلة
+            current_programs = None
             
-            username_field = None
-            password_field = None
+            if self.programs_source != "dom":
+                current_programs = self.wait_for_programs_response()
             
-            # البحث عن حقل اسم المستخدم
-            self.log_message("البحث عن حقل اسم المستخدم...")
+            if current_programs is None:
+                current_programs = self.extract_programs_from_dom(request_url)
+                if current_programs is None:
+                    return False
+                self.status["programs_source"] = "dom"
+            else:
+                self.status["programs_source"] = "response"
+            detected_at = time.time()
             
-            # أولاً: انتظار ظهور أي input
-            try:
-                self.log_message("انتظار ظهور حقول الإدخال...")
-                self.page.wait_for_selector('input', timeout=15000)
-                self.log_message("✅ ظهرت حقول الإدخال")
-                time.sleep(2)
-            except Exception as e:
-                self.log_message(f"⚠️ خطأ في انتظار الحقول: {e}")
+            found = self.process_programs(current_programs, request_url, detected_at=detected_at)
             
-            for selector in username_selectors:
-                try:
-                    self.log_message(f"  محاولة: {selector}")
-                    if self.page.locator(selector).count() > 0:
-                        username_field = selector
-                        self.log_message(f"  ✅ وجدت الحقل: {selector}")
-                        break
-                except:
-                    continue
+            # لقطة روتينية بعد المطابقة (مش بين قراءة التخصصات والضغط) وفقط لو تغيرت القائمة
+            if not found:
+                self.capture_screenshot(
+                    "request_page", "📋 صفحة التقديم",
+                    kind="routine", state=hash(frozenset(current_programs))
+                )
+            return found
             
-            if not username_field:
-                self.log_message("❌ لم أجد حقل اسم المستخدم!")
-                
-                # طباعة جميع الـ inputs الموجودة
-                try:
-                    all_inputs = self.page.locator('input').all()
-                    self.log_message(f"عدد الـ inputs الموجودة: {len(all_inputs)}")
-                    
-                    for i, inp in enumerate(all_inputs[:5]):  # أول 5 فقط
-                        try:
-                            inp_type = inp.get_attribute('type') or 'none'
-                            inp_name = inp.get_attribute('name') or 'none'
-                            inp_id = inp.get_attribute('id') or 'none'
-                            inp_class = inp.get_attribute('class') or 'none'
-                            inp_placeholder = inp.get_attribute('placeholder') or 'none'
-                            
-                            self.log_message(f"Input {i+1}:")
-                            self.log_message(f"  type={inp_type}")
-                            self.log_message(f"  name={inp_name}")
-                            self.log_message(f"  id={inp_id}")
-                            self.log_message(f"  class={inp_class}")
-                            self.log_message(f"  placeholder={inp_placeholder}")
-                        except:
-                            pass
-                except Exception as e:
-                    self.log_message(f"خطأ في قراءة الـ inputs: {e}")
-                
-                # طباعة HTML للتشخيص
-                try:
-                    content = self.page.content()
-                    self.log_message("=" * 60)
-                    self.log_message("محتوى صفحة تسجيل الدخول:")
-                    self.log_message("=" * 60)
-                    # طباعة أول 2000 حرف بدل 500
-                    self.log_message(content[:2000])
-                    self.log_message("=" * 60)
-                    
-                    # إرسال HTML كملف نصي على Telegram
-                    if self.telegram_token and self.telegram_chat_id:
-                        try:
-                            with open("page_content.html", "w", encoding="utf-8") as f:
-                                f.write(content)
-                            
-                            url = f"https://api.telegram.org/bot{self.telegram_token}/sendDocument"
-                            with open("page_content.html", "rb") as doc:
-                                files = {'document': doc}
-                                data = {
-                                    'chat_id': self.telegram_chat_id,
-                                    'caption': '📄 محتوى صفحة تسجيل الدخول'
-                                }
-                                requests.post(url, data=data, files=files, timeout=30)
-                        except Exception as e:
-                            self.log_message(f"خطأ في إرسال HTML: {e}")
-                            
-                except Exception as e:
-                    self.log_message(f"خطأ في قراءة المحتوى: {e}")
-                
-                self.status["state"] = "login_failed"
+        except Exception as e:
+            self.log_message(f"❌ خطأ في الفحص: {e}")
+            self.metrics.error("check")
+            self.set_state("check_error")
+            self.note_browser_error(e)
+            return False
+    
+    def process_programs(self, current_programs, request_url, form_open=True, detected_at=None):
+        """مقارنة التخصصات بالفحص السابق واختيار التخصص المستهدف لو ظهر
+        
+        form_open: هل صفحة التقديم مفتوحة في المتصفح؟ (False في محرك HTTP)
+        detected_at: وقت قراءة التخصصات (لقياس detect_to_click و detect_to_continue)
+        """
+        candidates = self.target_candidates(current_programs, request_url)
+        
+        for program in self.match_targets(candidates, request_url):
+            self.announce_target(request_url, program)
+            
+            # إيقاظ المتصفح وفتح صفحة التقديم لو كنا نفحص عبر HTTP
+            if not form_open:
+                self.open_request_form(request_url)
+                form_open = True
+            
+            # اختيار التخصص
+            with self.metrics.span("select_program"):
+                selected = self.select_program(program, detected_at)
+            if not selected:
+                self.metrics.error("select_program")
+                self.retry_target(request_url, program)
+                continue
+            
+            # الضغط على استمرار
+            with self.metrics.span("click_continue_button"):
+                continued = self.click_continue_button(detected_at)
+            if not continued:
+                self.metrics.error("click_continue_button")
+                self.retry_target(request_url, program)
+                continue
+            self.record_success(request_url, program)
+            
+            # لقطة شاشة
+            self.capture_screenshot("success", f"🎉 نجح! تم اختيار {program}", kind="success")
+            
+            self.complete_url(request_url)
+            return True
+        
+        return False
+    
+    def announce_target(self, request_url, program):
+        """تخصص مستهدف ظهر - بيتسجل كـ found بعد الضغط على استمرار بس (record_success)"""
+        self.emit("target_found", url=request_url, program=program)
+        
+        self.log_message("=" * 60)
+        self.log_message(f"🎯🎯🎯 وجدت التخصص: {program} 🎯🎯🎯")
+        self.log_message("=" * 60)
+    
+    def record_success(self, request_url, program):
+        """بعد الضغط على استمرار: نسجل التخصص كـ found، والـ event وتنبيه النجاح والحالة"""
+        self.mark_found(request_url, program)
+        self.emit("continue_clicked", url=request_url, program=program)
+        self.send_telegram_alert(self.success_alert(program, request_url))
+        self.set_state("success")
+    
+    def set_state(self, state):
+        """حالة الفحص الحالي (في المحرك غير المتزامن لكل task حالته)"""
+        self.status["state"] = state
+    
+    def record_programs(self, current_programs, key="default"):
+        """تسجيل نتيجة الفحص ومقارنتها بالـ snapshot السابق
+        
+        ترجع التخصصات اللي محتاجة مطابقة: الكل في أول فحص، المضاف فقط بعد كده
+        """
+        self.log_message(f"📊 إجمالي التخصصات: {len(current_programs)}")
+        
+        self.last_programs = current_programs
+        self.status["last_check"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        self.status.setdefault("urls", {})[key] = {
+            "last_check": self.status["last_check"],
+            "programs": len(current_programs),
+        }
+        self.status["checks_count"] += 1
+        self.metrics.inc("monitor_checks_total")
+        
+        with self.metrics.span("snapshot_diff"):
+            delta = self.snapshots.update(key, current_programs)
+        
+        if not delta["changed"]:
+            self.metrics.inc("monitor_snapshot_unchanged_total")
+            if not delta["first"]:
+                self.log_message("⏭️ قائمة التخصصات لم تتغير")
+                return []
+        
+        self.emit(
+            "programs_changed",
+            url=key,
+            count=len(current_programs),
+            first=delta["first"],
+            # أول فحص: القائمة كلها "جديدة" - العدد كفاية
+            added=[] if delta["first"] else sorted(delta["added"]),
+            removed=sorted(delta["removed"]),
+            reordered=delta["reordered"],
+        )
+        
+        # تخصصات جديدة ومحذوفة
+        if delta["added"]:
+            self.log_message(f"🆕 تخصصات جديدة: {len(delta['added'])}")
+            for prog in delta["added"]:
+                self.log_message(f"  ➕ {prog}")
+        if delta["removed"]:
+            self.log_message(f"🗑️ تخصصات اختفت: {len(delta['removed'])}")
+            for prog in delta["removed"]:
+                self.log_message(f"  ➖ {prog}")
+        if delta["reordered"]:
+            self.log_message("🔀 ترتيب التخصصات اتغير (من غير إضافة أو حذف)")
+        
+        return current_programs if delta["first"] else delta["added"]
+    
+    def found_for(self, request_url):
+        """التخصصات اللي اتعاملنا معها في الرابط ده (في الذاكرة + المحفوظة)"""
+        if request_url not in self.found_programs:
+            self.found_programs[request_url] = self.snapshots.found_for(request_url)
+        return self.found_programs[request_url]
+    
+    def mark_found(self, request_url, program):
+        """التخصص اتختار فعلاً: مانرجعش له تاني في الرابط ده"""
+        self.found_for(request_url).add(program)
+        self.snapshots.mark_found(request_url, program)
+        self.retry_targets.get(request_url, set()).discard(program)
+    
+    def retry_target(self, request_url, program):
+        """فشل الاختيار أو الاستمرار: نجرب التخصص تاني في الفحص الجاي حتى لو القائمة ماتغيرتش"""
+        self.retry_targets.setdefault(request_url, set()).add(program)
+        self.log_message(f"🔁 هجرب {program} تاني في الفحص الجاي")
+    
+    def target_candidates(self, current_programs, request_url):
+        """التخصصات اللي محتاجة مطابقة: نتيجة record_programs + اللي فشل اختيارها ولسه ظاهرة"""
+        candidates = self.record_programs(current_programs, request_url)
+        retry = self.retry_targets.get(request_url)
+        if not retry:
+            return candidates
+        
+        retry &= set(current_programs)
+        return list(candidates) + [p for p in current_programs if p in retry and p not in candidates]
+    
+    def complete_url(self, request_url):
+        """تم اختيار تخصص في الرابط ده - نوقف فحصه، والمراقبة تقف لما كل الروابط تخلص"""
+        self.completed_urls.add(request_url)
+        self.status["completed_urls"] = sorted(self.completed_urls)
+        if all(url in self.completed_urls for url in self.request_urls):
+            self.log_message("✅ تم! كل الروابط خلصت - سأتوقف الآن...")
+            self.is_running = False
+        else:
+            remaining = len(self.request_urls) - len(self.completed_urls)
+            self.log_message(f"✅ تم الرابط: {request_url} - متبقي {remaining} رابط")
+    
+    def pending_targets(self, current_programs, request_url):
+        """هل فيه تخصص مستهدف لم نتعامل معه بعد؟ (بدون تسجيل في الـ metrics)"""
+        found = self.found_for(request_url)
+        return any(program not in found for program in self.matcher.match(current_programs))
+    
+    def record_latency(self, name, detected_at):
+        """الزمن من قراءة التخصصات لحد الخطوة دي"""
+        if detected_at is None:
+            return
+        seconds = time.time() - detected_at
+        self.metrics.observe(name, seconds)
+        self.status[f"last_{name}_ms"] = int(seconds * 1000)
+        self.log_message(f"⏱️ {name}: {int(seconds * 1000)}ms")
+    
+    def match_targets(self, current_programs, request_url):
+        """التخصصات المستهدفة اللي ظهرت ولم نتعامل معها بعد في الرابط ده"""
+        found = self.found_for(request_url)
+        with self.metrics.span("target_matching"):
+            matches = [
+                program for program in self.matcher.match(current_programs)
+                if program not in found
+            ]
+        
+        return matches
+    
+    def success_alert(self, program, request_url):
+        """نص تنبيه النجاح"""
+        return f"""
+🎉🎉🎉 <b>تم العثور على التخصص!</b> 🎉🎉🎉
+
+📚 <b>التخصص:</b>
+{program}
+
+✅ <b>تم:</b>
+• اختيار التخصص
+• الضغط على "استمرار"
+
+⏰ <b>الوقت:</b>
+{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
+
+🔗 <b>الرابط:</b>
+{request_url}
+
+⚡⚡⚡ <b>اذهب الآن وأكمل التقديم!</b> ⚡⚡⚡
+            """
+    
+    def build_http_session(self):
+        """بناء requests.Session من cookies وheaders المتصفح بعد تسجيل الدخول"""
+        session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=4)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        
+        # نفس الـ headers اللي استخدمها تطبيق React (فيها Authorization لو موجود)
+        session.headers.update(self.programs_api_headers)
+        
+        for cookie in self.page.context.cookies():
+            session.cookies.set(
+                cookie["name"],
+                cookie["value"],
+                domain=cookie.get("domain"),
+                path=cookie.get("path", "/")
+            )
+        
+        self.log_message(f"✅ تم تجهيز جلسة HTTP ({len(session.cookies)} cookie)")
+        return session
+    
+    def check_programs_http(self, request_url):
+        """فحص التخصصات عبر HTTP مباشرة بدون رسم الصفحة في المتصفح"""
+        # أول فحص (أو بعد انتهاء الجلسة) يتم عبر المتصفح لمعرفة الـ endpoint والـ headers
+        if self.http_session is None or not self.programs_api_url:
+            found = self.check_programs(request_url)
+            if found or not self.programs_api_url:
+                if not self.programs_api_url:
+                    self.log_message("⚠️ لم أتعرف على endpoint التخصصات - سأستمر بالمتصفح")
+                return found
+            
+            self.http_session = self.build_http_session()
+            
+            # ترك المتصفح خامل بين الفحوصات
+            try:
+                self.page.goto("about:blank")
+            except Exception:
+                pass
+            return False
+        
+        try:
+            self.log_message(f"🔍 فحص HTTP: {self.programs_api_url}")
+            self.throttle("poll")
+            with self.metrics.span("http_poll"):
+                response = self.http_session.request(
+                    self.programs_api_method,
+                    self.programs_api_url,
+                    data=self.programs_api_post_data,
+                    timeout=30,
+                    allow_redirects=False
+                )
+            
+            if response.status_code in (401, 403) or "login" in response.headers.get("location", "").lower():
+                self.log_message(f"⚠️ انتهت الجلسة ({response.status_code}) - إعادة تسجيل الدخول عبر المتصفح")
+                self.http_session = None
+                if not self.timed_login():
+                    self.set_state("check_error")
                 return False
             
-            # البحث عن حقل كلمة المرور
-            self.log_message("البحث عن حقل كلمة المرور...")
-            for selector in password_selectors:
-                try:
-                    self.log_message(f"  محاولة: {selector}")
-                    if self.page.locator(selector).count() > 0:
-                        password_field = selector
-                        self.log_message(f"  ✅ وجدت الحقل: {selector}")
-                        break
-                except:
-                    continue
+            response.raise_for_status()
+            current_programs = self.parse_programs_payload(response.json())
             
-            if not password_field:
-                self.log_message("❌ لم أجد حقل كلمة المرور!")
-                self.status["state"] = "login_failed"
+            if not current_programs:
+                self.log_message("⚠️ رد HTTP فارغ - سأفحص عبر المتصفح المرة القادمة")
+                self.http_session = None
                 return False
             
-            # إدخال البيانات
-            self.log_message("إدخال اسم المستخدم...")
+            self.status["programs_source"] = "http"
+            return self.process_programs(current_programs, request_url, form_open=False, detected_at=time.time())
             
-            # النقر على الحقل أولاً (simulate human behavior)
-            self.page.click(username_field)
-            time.sleep(random.uniform(0.5, 1.0))
-            
-            # مسح الحقل أولاً
-            self.page.fill(username_field, '')
-            time.sleep(0.3)
-            
-            # كتابة البيانات حرف حرف ببطء
-            for char in self.username:
-                self.page.type(username_field, char, delay=random.randint(50, 120))
-            
-            time.sleep(random.uniform(0.5, 1.0))
-            
-            # trigger React events
-            self.page.evaluate("""
-                (selector) => {
-                    const input = document.querySelector(selector);
-                    if (input) {
-                        input.dispatchEvent(new Event('blur', { bubbles: true }));
-                    }
-                }
-            """, username_field)
-            
-            time.sleep(0.5)
-            
-            # التأكد من إدخال البيانات
-            current_value = self.page.input_value(username_field)
-            self.log_message(f"✅ القيمة المدخلة: {current_value[:3]}*** (طول: {len(current_value)})")
-            
-            if len(current_value) == 0:
-                self.log_message("⚠️ تحذير: الحقل فارغ! محاولة إعادة الكتابة...")
-                self.page.fill(username_field, self.username)
-                time.sleep(1)
-                current_value = self.page.input_value(username_field)
-                self.log_message(f"بعد المحاولة الثانية: طول = {len(current_value)}")
-            
-            # حركة ماوس عشوائية
-            self.page.mouse.move(random.randint(100, 500), random.randint(100, 500))
-            time.sleep(random.uniform(0.3, 0.7))
-            
-            self.log_message("إدخال كلمة المرور...")
-            
-            # النقر على الحقل
-            self.page.click(password_field)
-            time.sleep(random.uniform(0.5, 1.0))
-            
-            # مسح الحقل
-            self.page.fill(password_field, '')
-            time.sleep(0.3)
-            
-            # كتابة كلمة المرور
-            for char in self.password:
-                self.page.type(password_field, char, delay=random.randint(50, 120))
-            
-            time.sleep(random.uniform(0.5, 1.0))
-            
-            # trigger React events
-            self.page.evaluate("""
-                (selector) => {
-                    const input = document.querySelector(selector);
-                    if (input) {
-                        input.dispatchEvent(new Event('blur', { bubbles: true }));
-                    }
-                }
-            """, password_field)
-            
-            time.sleep(0.5)
+        except Exception as e:
+            self.log_message(f"❌ خطأ في فحص HTTP: {e}")
+            self.metrics.error("http_poll")
+            self.set_state("check_error")
+            return False
+    
+    def click_open_option(self, program_name, detected_at=None):
+        """المسار السريع: الضغط على الخيار في القائمة اللي سابها الاستخراج مفتوحة"""
+        self.dropdown_open = False
+        option = self.page.locator(OPEN_DROPDOWN_OPTIONS).filter(has_text=exact_text(program_name))
+        try:
+            if option.count() == 0:
+                # الخيار خارج الجزء المرسوم من القائمة الافتراضية
+                self.harvest_options(target=program_name)
+            option.first.click(timeout=3000)
+            self.record_latency("detect_to_click", detected_at)
+            self.log_message("⚡ تم اختيار التخصص من القائمة المفتوحة")
+            return True
+        except Exception as e:
+            self.log_message(f"⚠️ فشل المسار السريع: {e}")
+            return False
+    
+    def select_program(self, program_name, detected_at=None):
+        """اختيار التخصص
+        
+        detected_at: وقت قراءة التخصصات (لقياس detect_to_click)
+        """
+        try:
+            self.log_message(f"اختيار: {program_name}")
             
-            # التحقق من كلمة المرور
-            password_value = self.page.input_value(password_field)
-            self.log_message(f"✅ كلمة المرور: طول = {len(password_value)}")
+            dropdown_open = self.dropdown_open
+            if dropdown_open and self.click_open_option(program_name, detected_at):
+                return True
             
-            if len(password_value) == 0:
-                self.log_message("⚠️ تحذير: حقل كلمة المرور فارغ! محاولة إعادة الكتابة...")
-                self.page.fill(password_field, self.password)
-                time.sleep(1)
+            # القائمة مقفولة (التخصصات اتقرت من رد الـ API أو عبر HTTP): نفتح قائمة التخصصات (antd)
+            if not dropdown_open and self.open_programs_dropdown() is not None:
+                if self.click_open_option(program_name, detected_at):
+                    return True
             
-            self.log_message("✅ تم إدخال البيانات بنجاح")
+            # احتياطي: react-select
+            for selector in self.find_selectors("select_control", SELECT_CONTROL_SELECTORS):
+                try:
+                    self.page.click(selector)
+                    self.selectors.hit("select_control", selector)
+                    self.wait_for(
+                        "select_open",
+                        lambda t: self.page.wait_for_selector(ANY_OPTION_SELECTOR, state='visible', timeout=t),
+                        3000
+                    )
+                    break
+                except:
+                    continue
             
-            # البحث عن زر تسجيل الدخول والضغط عليه
-            self.log_message("البحث عن زر تسجيل الدخول...")
+            # البحث عن الخيار في كل الخيارات المعروضة (طلب واحد) ثم الضغط عليه
+            for attempt in range(2):
+                option = self.matching_option(self.read_options(ANY_OPTION_SELECTOR), program_name)
+                if option:
+                    self.page.locator(ANY_OPTION_SELECTOR).nth(option["index"]).click()
+                    self.record_latency("detect_to_click", detected_at)
+                    
+                    # انتظار ظهور التخصص كقيمة مختارة
+                    self.wait_for(
+                        "select_applied",
+                        lambda t: self.page.wait_for_function(SELECTED_VALUE_SCRIPT, arg=program_name, timeout=t),
+                        3000
+                    )
+                    self.log_message("✅ تم اختيار التخصص")
+                    return True
+                
+                # الخيار مش مرسوم: التمرير في القائمة الافتراضية لحد ما يظهر
+                if attempt == 1:
+                    break
+                harvested = self.harvest_options(target=program_name)
+                if not any(self.matcher.contains(o["text"], program_name) for o in harvested):
+                    break
             
-            button_selectors = [
-                'button:has-text("تسجيل الدخول")',
-                'button:has-text("دخول")',
-                'button:has-text("Login")',
-                'button[type="submit"]',
-                'button:has(span:text("تسجيل الدخول"))',
-                'button:has(span:text("دخول"))',
-                'input[type="submit"]',
-                'button.btn-primary',
-                'button.submit',
-                'button.ant-btn-primary',
-                '.ant-btn-primary',
-            ]
+            self.log_message("❌ لم أجد الخيار")
+            return False
             
-            clicked = False
-            for selector in button_selectors:
-                try:
-                    self.log_message(f"  محاولة: {selector}")
-                    if self.page.locator(selector).count() > 0:
-                        # التأكد من أن الزر مرئي وقابل للضغط
-                        self.page.wait_for_selector(selector, state='visible', timeout=5000)
-                        
-                        # تحريك الماوس للزر (simulate human)
-                        button = self.page.locator(selector).first
-                        box = button.bounding_box()
-                        if box:
-                            # تحريك الماوس لمنتصف الزر
-                            self.page.mouse.move(
-                                box['x'] + box['width'] / 2,
-                                box['y'] + box['height'] / 2
-                            )
-                            time.sleep(0.3)
-                        
-                        # الضغط
-                        self.page.click(selector, timeout=5000, force=False)
-                        clicked = True
-                        self.log_message(f"  ✅ تم الضغط على الزر")
-                        break
-                except Exception as e:
-                    self.log_message(f"  ⚠️ فشلت: {e}")
-                    continue
+        except Exception as e:
+            self.log_message(f"❌ خطأ في الاختيار: {e}")
+            return False
+    
+    def matching_option(self, options, program_name):
+        """أقرب خيار متاح للتخصص (نفس ترتيب match)، مش أول خيار بيحتويه"""
+        return self.matcher.best_option(options, program_name)
+    
+    def click_continue_button(self, detected_at=None):
+        """الضغط على زر استمرار (click بينتظر لحد ما الزر يبقى enabled)"""
+        try:
+            self.log_message("البحث عن زر استمرار...")
             
-            if not clicked:
-                # محاولة أخيرة: الضغط على Enter
-                self.log_message("محاولة الضغط على Enter...")
+            for selector in self.find_selectors("continue_button", CONTINUE_BUTTON_SELECTORS):
                 try:
-                    self.page.keyboard.press("Enter")
-                    clicked = True
-                    self.log_message("✅ تم الضغط على Enter")
+                    self.page.click(selector, timeout=5000)
+                    self.record_latency("detect_to_continue", detected_at)
+                    self.selectors.hit("continue_button", selector)
+                    self.wait_for(
+                        "continue_done",
+                        lambda t: self.page.wait_for_load_state("networkidle", timeout=t),
+                        5000
+                    )
+                    self.log_message("✅ تم الضغط على استمرار")
+                    return True
                 except:
-                    self.log_message("❌ لم أجد زر تسجيل الدخول")
-                    return False
-            
-            # انتظار اكتمال تسجيل الدخول
-            self.log_message("⏳ انتظار اكتمال تسجيل الدخول...")
-            time.sleep(5)
+                    continue
             
-            # التحقق من وجود رسائل خطأ أولاً
-            error_messages = []
-            validation_failed = False
+            self.log_message("❌ لم أجد زر استمرار")
+            return False
             
-            try:
-                error_selectors = [
-                    '.ant-form-item-explain-error',
-                    '.ant-alert-error',
-                    '.alert-danger',
-                    '.error',
-                    '.text-danger',
-                    '[class*="error"]',
-                    '[class*="Error"]',
-                ]
+        except Exception as e:
+            self.log_message(f"❌ خطأ: {e}")
+            return False
+    
+    def start_monitoring(self, request_url, interval=30):
+        """بدء المراقبة - request_url رابط واحد أو قائمة روابط (تاب لكل رابط، الفحص بالتتابع)"""
+        self.request_urls = [request_url] if isinstance(request_url, str) else list(request_url)
+        if self.poll_engine == "http" and len(self.request_urls) > 1:
+            # محرك HTTP بيحفظ endpoint واحد للتخصصات
+            self.log_message("⚠️ محرك HTTP يدعم رابط واحد - سأفحص الروابط عبر المتصفح")
+            self.poll_engine = "browser"
+        
+        self.is_running = True
+        self.scheduler.interval = interval
+        self.log_message("=" * 60)
+        self.log_message("🚀 بدء نظام المراقبة")
+        self.log_message("=" * 60)
+        self.log_message(f"📚 التخصصات: {', '.join(self.target_programs)}")
+        self.log_message(f"⏱️ فترة الفحص: {interval} ثانية (الحد الأدنى {self.scheduler.min_interval})")
+        self.log_message(f"🔗 الروابط: {len(self.request_urls)}")
+        self.log_message(f"⚙️ محرك الفحص: {self.poll_engine}")
+        
+        started_at = time.time()
+        
+        if not self.init_browser():
+            self.log_message("❌ فشل تهيئة المتصفح")
+            return
+        
+        # محاولة تسجيل الدخول بالـ cookies أولاً
+        if not self.timed_login():
+            self.log_message("❌ فشل تسجيل الدخول")
+            self.log_message("💡 تحقق من بيانات الدخول والـ screenshots")
+            self.cleanup()
+            return
+        
+        self.status["startup_seconds"] = round(time.time() - started_at, 2)
+        self.log_message(f"⏱️ زمن البدء حتى تسجيل الدخول: {self.status['startup_seconds']} ثانية")
+        
+        self.send_telegram_alert("🚀 بدأ النظام!")
+        
+        check_count = 0
+        
+        try:
+            while self.is_running:
+                check_count += 1
+                self.log_message(f"\n{'='*60}")
+                self.log_message(f"🔍 الفحص رقم {check_count}")
+                self.log_message(f"{'='*60}")
                 
-                for sel in error_selectors:
-                    if self.page.locator(sel).count() > 0:
-                        messages = self.page.locator(sel).all()
-                        for msg in messages:
-                            try:
-                                text = msg.inner_text().strip()
-                                if text and len(text) > 2:
-                                    error_messages.append(text)
-                                    if 'validation' in text.lower() or 'البريد' in text or 'email' in text.lower():
-                                        validation_failed = True
-                            except:
-                                pass
-            except:
-                pass
-            
-            if error_messages:
-                self.log_message(f"⚠️ رسائل خطأ: {', '.join(error_messages)}")
+                self.status["state"] = "checking"
+                check_started_at = time.time()
+                self.publish_status()
                 
-                # إرسال على Telegram
-                error_text = "❌ فشل تسجيل الدخول\n\n"
-                error_text += "رسائل الخطأ:\n"
-                for err in error_messages:
-                    error_text += f"• {err}\n"
+                if self.watchdog():
+                    for url in self.request_urls:
+                        if url in self.completed_urls or not self.is_running:
+                            continue
+                        self.check_url(url)
+                else:
+                    self.status["state"] = "check_error"
                 
-                self.send_telegram_alert(error_text)
+                if not self.is_running:
+                    break
                 
-                # لو المشكلة في البريد الإلكتروني
-                if validation_failed:
-                    self.log_message("❌ بيانات الدخول غير صحيحة!")
-                    self.log_message("💡 تحقق من:")
-                    self.log_message("   1. البريد الإلكتروني صحيح")
-                    self.log_message("   2. كلمة المرور صحيحة")
-                    self.log_message("   3. الحساب مُفعّل")
-            
-            # انتظار إضافي
-            time.sleep(3)
-            
-            # التحقق من نجاح تسجيل الدخول
-            current_url = self.page.url
-            self.log_message(f"الصفحة الحالية: {current_url}")
-            
-            # أخذ لقطة شاشة بعد المحاولة
+                delay = self.schedule_next(time.time() - check_started_at)
+                session_started_at = time.time()
+                self.maintain_session(delay)
+                self.idle(max(0, delay - (time.time() - session_started_at)))
+                
+        except KeyboardInterrupt:
+            self.log_message("⛔ توقف يدوي")
+            self.send_telegram_alert("⛔ توقف النظام")
+        except Exception as e:
+            self.log_message(f"❌ خطأ: {e}")
+            self.send_telegram_alert(f"❌ خطأ: {e}")
+        finally:
+            self.cleanup()
+    
+    def cleanup(self):
+        """تنظيف الموارد"""
+        try:
+            # إرسال التنبيهات المعلقة قبل الإغلاق
+            self.notifier.close(timeout=30)
+            if self.http_session:
+                self.http_session.close()
+            self.selectors.flush()
+            self.close_browser()
+            self.log_message("✅ تم التنظيف")
+        except:
+            pass
+    
+    def close_browser(self):
+        """إغلاق الـ context والمتصفح و Playwright (الأخطاء متوقعة لو المتصفح واقع أصلاً)"""
+        self.closing_browser = True
+        try:
+            for resource in (self.context, self.browser):
+                try:
+                    if resource:
+                        resource.close()
+                except Exception:
+                    pass
+            if self.playwright:
+                self.playwright.stop()
+        except Exception:
+            pass
+        finally:
+            self.context = self.browser = self.playwright = None
+            self.release_profile_lock()
+            self.closing_browser = False
+    
+    def on_browser_crash(self, reason):
+        """event من Playwright: الصفحة أو المتصفح وقع - إعادة التشغيل في بداية الدورة الجاية"""
+        if not self.closing_browser and not self.browser_crashed:
+            self.browser_crashed = reason
+            self.log_message(f"💥 المتصفح وقع ({reason})", level=logging.WARNING)
+    
+    def note_browser_error(self, error):
+        """أخطاء Playwright اللي معناها إن الصفحة/المتصفح مات (لو الـ event ماوصلش)"""
+        text = str(error).lower()
+        if "target crashed" in text or "has been closed" in text or "browser closed" in text:
+            self.on_browser_crash(f"error: {str(error).splitlines()[0][:120]}")
+    
+    def resource_usage(self):
+        """استهلاك الصفحات من داخل Chromium عبر CDP: عدد الصفحات وJS heap وعناصر DOM والـ layouts"""
+        pages = list(self.context.pages) if self.context else []
+        heap = nodes = layouts = 0
+        for page in pages:
             try:
-                screenshot_path = "after_login.png"
-                self.page.screenshot(path=screenshot_path)
-                self.log_message("📸 لقطة شاشة بعد تسجيل الدخول: after_login.png")
-                self.send_telegram_photo(screenshot_path, "📸 بعد محاولة تسجيل الدخول")
+                cdp = self.context.new_cdp_session(page)
+                cdp.send("Performance.enable")
+                result = cdp.send("Performance.getMetrics")
+                cdp.detach()
+            except Exception:
+                continue
+            values = {m["name"]: m["value"] for m in result.get("metrics", [])}
+            heap += values.get("JSHeapUsedSize", 0)
+            nodes += values.get("Nodes", 0)
+            layouts += values.get("LayoutCount", 0)
+        
+        return {
+            "pages": len(pages),
+            "js_heap_mb": round(heap / 1048576, 1),
+            "dom_nodes": int(nodes),
+            "layout_count": int(layouts),
+        }
+    
+    def memory_due(self):
+        """قياس الذاكرة كل MEMORY_CHECK_EVERY دورة"""
+        self.cycles_since_launch += 1
+        return self.memory_check_every > 0 and self.cycles_since_launch % self.memory_check_every == 0
+    
+    def recycle_reason(self, usage):
+        """سبب تدوير المتصفح قبل الدورة دي أو None"""
+        if self.recycle_every_checks and self.cycles_since_launch > self.recycle_every_checks:
+            return f"تدوير دوري بعد {self.recycle_every_checks} دورة"
+        if not usage:
+            return None
+        
+        if self.recycle_rss_mb:
+            rss = process_tree_rss()
+            if rss is not None:
+                usage["rss_mb"] = round(rss / 1048576, 1)
+                if usage["rss_mb"] >= self.recycle_rss_mb:
+                    return f"RSS {usage['rss_mb']} MB"
+        if self.recycle_heap_mb and usage["js_heap_mb"] >= self.recycle_heap_mb:
+            return f"JS heap {usage['js_heap_mb']} MB"
+        return None
+    
+    def record_relaunch(self, reason, crashed):
+        stats = self.status["browser"]
+        stats["relaunches" if crashed else "recycles"] += 1
+        stats["last_reason"] = reason
+        stats["last_at"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        self.metrics.inc("monitor_browser_restarts_total", reason="crash" if crashed else "recycle")
+        self.emit("browser_restart", reason=reason, crashed=crashed)
+        self.log_message(f"♻️ إعادة تشغيل المتصفح: {reason}", level=logging.WARNING)
+    
+    def watchdog(self):
+        """قبل كل دورة: إعادة تشغيل المتصفح لو وقع، أو تدويره لو طوّل أو كبر في الذاكرة
+        
+        False = المتصفح مش شغال والدورة دي تتحسب فشل (backoff) وهنحاول تاني الدورة الجاية.
+        """
+        if self.browser_crashed:
+            return self.relaunch_browser(self.browser_crashed, crashed=True)
+        
+        usage = None
+        if self.memory_due():
+            try:
+                usage = self.status["resources"] = self.resource_usage()
             except Exception as e:
-                self.log_message(f"خطأ في لقطة الشاشة: {e}")
+                self.log_message(f"⚠️ خطأ في قياس الذاكرة: {e}")
+        
+        reason = self.recycle_reason(usage)
+        return self.relaunch_browser(reason) if reason else True
+    
+    def relaunch_browser(self, reason, crashed=False):
+        """إغلاق المتصفح وفتحه تاني عبر init_browser واسترجاع الجلسة من الـ cookies"""
+        self.record_relaunch(reason, crashed)
+        cookies = self.session_cookies
+        if not crashed:
+            try:
+                cookies = self.context.cookies()
+            except Exception:
+                pass
+        
+        with self.metrics.span("relaunch"):
+            self.close_browser()
+            self.browser_crashed = None
+            self.pages = {}
+            self.dropdown_open = False
             
-            if "login" not in current_url.lower():
-                self.log_message("✅✅✅ تم تسجيل الدخول بنجاح! ✅✅✅")
-                self.status["state"] = "logged_in"
-                self.send_telegram_alert("✅ تم تسجيل الدخول بنجاح!")
+            if self.init_browser() and self.restore_session(cookies):
                 return True
+        
+        self.metrics.error("relaunch")
+        self.browser_crashed = reason
+        return False
+    
+    def restore_session(self, cookies):
+        """إرجاع الجلسة في المتصفح الجديد: الـ cookies اللي في الذاكرة، وإلا تسجيل الدخول العادي"""
+        if cookies:
+            try:
+                self.context.add_cookies(cookies)
+                self.log_message(f"✅ تم استرجاع الجلسة ({len(cookies)} cookie) بدون تسجيل دخول")
+                return True
+            except Exception as e:
+                self.log_message(f"⚠️ فشل استرجاع الـ cookies: {e}")
+        return self.timed_login()
+    
+    def use_page(self, request_url):
+        """تبديل self.page لتاب الرابط (أول رابط يستخدم صفحة تسجيل الدخول، والباقي تابات جديدة)"""
+        page = self.pages.get(request_url)
+        if page is None:
+            if not self.pages:
+                page = self.page
             else:
-                # التحقق من وجود رسائل خطأ لم نكتشفها
-                if not error_messages:
-                    try:
-                        error_selectors = [
-                            '.ant-form-item-explain-error',
-                            '.ant-alert-danger',
-                            '.alert-danger',
-                            '.error-message',
-                        ]
-                        for sel in error_selectors:
-                            if self.page.locator(sel).count() > 0:
-                                msg = self.page.locator(sel).first.inner_text()
-                                if msg:
-                                    error_messages.append(msg)
-                    except:
-                        pass
-                
-                if error_messages:
-                    self.log_message(f"⚠️ رسائل خطأ: {', '.join(error_messages)}")
-                else:
-                    self.log_message("⚠️ ما زلنا في صفحة تسجيل الدخول")
+                page = self.page.context.new_page()
+                self.setup_page(page)
+                self.start_network_accounting(page.context, page)
+            self.pages[request_url] = page
+        self.page = page
+        return page
+    
+    def wait_check_spacing(self):
+        """CHECK_SPACING ثانية على الأقل بين بداية أي فحصين (حد مشترك لكل التابات)"""
+        wait = self.last_check_started_at + self.check_spacing - time.time()
+        if wait > 0:
+            time.sleep(wait)
+        self.last_check_started_at = time.time()
+    
+    def check_url(self, request_url):
+        """فحص رابط واحد في التاب بتاعه مع قياس البيانات المنقولة"""
+        if len(self.request_urls) > 1:
+            self.use_page(request_url)
+            self.log_message(f"🔗 {request_url}")
+        self.wait_check_spacing()
+        
+        bytes_before = self.network_bytes
+        cache_hits_before = self.network_cache_hits
+        
+        self.emit("check_started", url=request_url)
+        started_at = time.time()
+        with self.metrics.span("check"):
+            if self.poll_engine == "http":
+                found = self.check_programs_http(request_url)
+            else:
+                found = self.check_programs(request_url)
+        self.emit(
+            "check_finished", url=request_url, seconds=round(time.time() - started_at, 2),
+            state=self.status["state"], found=bool(found)
+        )
+        
+        if self.status["state"] != "check_error":
+            try:
+                self.session_cookies = self.context.cookies()
+            except Exception:
+                pass
+        
+        self.status["last_check_bytes"] = self.network_bytes - bytes_before
+        self.status["last_check_cache_hits"] = self.network_cache_hits - cache_hits_before
+        self.status["total_bytes"] = self.network_bytes
+        self.log_message(
+            f"📶 بيانات الفحص: {self.status['last_check_bytes'] / 1024:.1f} KB"
+            f" ({self.status['last_check_cache_hits']} من الـ cache)"
+        )
+        return found
+    
+    def schedule_next(self, check_seconds):
+        """الانتظار قبل الفحص الجاي حسب الـ scheduler (فشل الفحص = check_error)"""
+        failed = self.status["state"] == "check_error"
+        if not failed:
+            self.status["state"] = "waiting"
+        
+        delay = self.scheduler.next_delay(check_seconds, failed)
+        self.status["scheduler"] = self.scheduler.last_decision
+        self.log_message(f"⏳ انتظار {delay:.0f} ثانية ({self.scheduler.last_decision['mode']})...")
+        return delay
+    
+    def idle(self, seconds):
+        """الانتظار للدورة الجاية مع أخد عينات الاستهلاك ونشر الحالة في مواعيدها"""
+        end = time.time() + seconds
+        while self.is_running:
+            if self.sampler and self.sampler.due():
+                self.sample_resources()
+            self.publish_status()
+            remaining = end - time.time()
+            if remaining <= 0:
+                break
+            time.sleep(self.idle_step(remaining))
+    
+    def idle_step(self, remaining):
+        """أطول نومة ممكنة قبل النشر أو العينة الجاية"""
+        step = min(remaining, self.publish_interval)
+        if self.sampler:
+            step = min(step, self.sampler.seconds_until_due())
+        return step
+    
+    def publish_status(self):
+        """نشر snapshot الحالة والمقاييس للـ routes (من thread المراقب نفسه)"""
+        if not self.status_board:
+            return
+        self.status_board.publish(
+            self.get_status(),
+            Metrics.merge([self.metrics.render(), portal_limiter.metrics.render()]),
+            self.sampler.snapshot() if self.sampler else None
+        )
+    
+    def sample_resources(self):
+        """عينة لـ /debug/resources: عمليات المتصفح من /proc + مقاييس الصفحات من CDP"""
+        try:
+            page_metrics = self.resource_usage()
+        except Exception as e:
+            self.log_message(f"⚠️ خطأ في قياس الصفحات: {e}", level=logging.DEBUG)
+            page_metrics = None
+        return self.sampler.sample(page_metrics)
+    
+    def session_expiry(self, cookies):
+        """أقرب وقت انتهاء للجلسة من cookies الجلسة وأي JWT فيها أو في Authorization"""
+        expiries = []
+        for cookie in cookies:
+            name = cookie["name"].lower()
+            if not any(pattern in name for pattern in self.session_cookie_patterns):
+                continue
+            if cookie.get("expires", -1) > 0:
+                expiries.append(cookie["expires"])
+            expires = jwt_expiry(unquote(cookie["value"]))
+            if expires:
+                expiries.append(expires)
+        
+        for key, value in self.programs_api_headers.items():
+            if key.lower() == "authorization":
+                expires = jwt_expiry(value)
+                if expires:
+                    expiries.append(expires)
+        
+        return min(expiries) if expiries else None
+    
+    def session_probe_request(self):
+        """معاملات طلب فحص الجلسة: (url, method, data, headers) أو None"""
+        if self.session_probe_url:
+            return self.session_probe_url, "GET", None, {}
+        if self.programs_api_url:
+            return self.programs_api_url, self.programs_api_method, self.programs_api_post_data, self.programs_api_headers
+        return None
+    
+    def session_state(self, expires_at, next_delay):
+        """هل الجلسة محتاجة تجديد قبل الفحص الجاي؟ + تحديث /status"""
+        session = self.status["session"]
+        if expires_at:
+            session["expires_at"] = datetime.fromtimestamp(expires_at).strftime("%Y-%m-%d %H:%M:%S")
+            remaining = expires_at - time.time()
+            if remaining < next_delay + self.session_refresh_margin and time.time() >= self.session_refresh_retry_at:
+                self.log_message(f"🔑 الجلسة تنتهي خلال {remaining:.0f} ثانية - تجديد قبل الفحص الجاي")
+                return True
+        return False
+    
+    def record_session_probe(self, status_code, location=""):
+        """نتيجة فحص الجلسة: False لو اتحولنا لـ login أو 401/403"""
+        valid = status_code not in (401, 403) and "login" not in location.lower()
+        if self.status["session"]["valid"] != valid:
+            self.emit("session", valid=valid, status_code=status_code)
+        self.status["session"]["valid"] = valid
+        self.status["session"]["last_probe"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        if not valid:
+            self.log_message(f"🔑 فحص الجلسة: منتهية ({status_code})")
+        return valid
+    
+    def maintain_session(self, next_delay):
+        """بين الفحوصات: فحص صلاحية الجلسة وتجديدها قبل ما تنتهي
+        
+        انتهاء الـ cookies/JWT بيتحسب محلياً كل مرة، والطلب المحمي كل SESSION_PROBE_INTERVAL ثانية.
+        التجديد بيتم هنا في وقت الانتظار بدل ما يفاجئ الفحص الجاي.
+        """
+        try:
+            with self.metrics.span("session_probe"):
+                needs_refresh = self.session_state(self.session_expiry(self.page.context.cookies()), next_delay)
                 
-                self.status["state"] = "login_failed"
-                return False
-            
+                probe = self.session_probe_request()
+                if not needs_refresh and probe and time.time() - self.session_probed_at >= self.session_probe_interval:
+                    self.session_probed_at = time.time()
+                    url, method, data, headers = probe
+                    self.throttle("session")
+                    response = self.page.context.request.fetch(
+                        url, method=method, data=data, headers=headers, max_redirects=0, timeout=15000
+                    )
+                    needs_refresh = not self.record_session_probe(response.status, response.headers.get("location", ""))
         except Exception as e:
-            self.log_message(f"❌ خطأ في تسجيل الدخول: {e}")
+            self.log_message(f"⚠️ خطأ في فحص الجلسة: {e}")
+            self.metrics.error("session_probe")
+            return
+        
+        if needs_refresh:
+            self.refresh_session()
+    
+    def refresh_session(self):
+        """تسجيل دخول جديد بكلمة المرور قبل ما الجلسة تنتهي ثم حفظ الـ cookies الجديدة
+        
+        مش timed_login: ده بيرجّع الـ cookies المحفوظة (COOKIES_BASE64 / cookies.json) بنفس وقت
+        الانتهاء القديم، وممكن يكتب فوق cookies أحدث السيرفر بدّلها في الـ context.
+        """
+        context = self.page.context
+        old_cookies = context.cookies()
+        old_expiry = self.session_expiry(old_cookies)
+        was_valid = self.status["session"]["valid"] is not False
+        state = self.status["state"]
+        
+        refreshed = False
+        with self.metrics.span("session_refresh"):
+            if not (self.username and self.password):
+                self.log_message("⚠️ تجديد الجلسة محتاج STUDY_USERNAME و STUDY_PASSWORD", logging.WARNING)
+            else:
+                try:
+                    self.throttle("login")
+                    # من غير الجلسة الحالية: صفحة login مش هتحوّلنا للـ dashboard
+                    context.clear_cookies()
+                    refreshed = self.login()
+                except RateLimitExceeded as e:
+                    self.log_message(f"⏳ تأجيل تجديد الجلسة: {e}", logging.WARNING)
+                except Exception as e:
+                    self.log_message(f"❌ خطأ في تجديد الجلسة: {e}")
+                
+                if not refreshed and old_cookies:
+                    # الجلسة القديمة لسه شغالة لحد ما تنتهي
+                    context.clear_cookies()
+                    context.add_cookies(old_cookies)
+                    self.status["state"] = state
+        
+        if refreshed:
+            self.http_session = None
+            self.save_cookies()
+            refreshed = self.refresh_extended(old_expiry, self.session_expiry(context.cookies()), was_valid)
+        return self.record_refresh(refreshed)
+    
+    def refresh_extended(self, old_expiry, new_expiry, was_valid=True):
+        """هل التجديد مدّ الجلسة فعلاً؟ (نفس وقت الانتهاء = هنعيد المحاولة)"""
+        if was_valid and old_expiry and new_expiry and new_expiry <= old_expiry:
+            self.log_message("⚠️ التجديد ما مدّش وقت انتهاء الجلسة - محاولة تانية بعد شوية", logging.WARNING)
+            return False
+        return True
+    
+    def record_refresh(self, refreshed, alert="⚠️ فشل تجديد الجلسة - الفحص الجاي هيحاول تسجيل الدخول"):
+        """نتيجة التجديد في /status والـ metrics، وموعد المحاولة الجاية لو فشل"""
+        self.status["session"]["refreshes"] += 1
+        if refreshed:
+            self.session_probed_at = time.time()
+            self.session_refresh_retry_at = 0
+            self.status["session"]["valid"] = True
+        else:
+            # التنبيه مرة واحدة لكل سلسلة محاولات فاشلة
+            if not self.session_refresh_retry_at:
+                self.send_telegram_alert(alert)
+            self.session_refresh_retry_at = time.time() + self.session_probe_interval
+            self.metrics.error("session_refresh")
+        return refreshed
+    
+    def get_status(self):
+        """حالة النظام"""
+        self.status["notifications_pending"] = self.notifier.pending()
+        self.status["artifacts_bytes"] = self.artifacts.usage()
+        if self.sampler:
+            self.status["resources_summary"] = self.sampler.summary()
+        return self.status
+    
+    def stop(self):
+        """إيقاف"""
+        self.is_running = False
+        self.cleanup()
+
+# صفحة الرابط اللي الـ task الحالي بيفحصه في المحرك غير المتزامن: (monitor, page)
+# كل فحص task مستقل (asyncio.gather) فكل واحد بيشوف self.page بتاعته من غير ما تتمرر لكل دالة
+active_page = contextvars.ContextVar("active_page", default=None)
+# حالة فحص الـ task الحالي: (monitor, {"state": ...}) وبتتجمع في self.status بعد الـ gather
+check_state = contextvars.ContextVar("check_state", default=None)
+
+class AsyncStudyInEgyptMonitor(StudyInEgyptMonitor):
+    """نسخة asyncio من المراقب مبنية على async_playwright
+    
+    كل العمليات (المتصفح، التليجرام، مهلة الفحص، الصفحات المتعددة) على event loop واحد.
+    الدوال اللي بتكلم Playwright هنا coroutines بنفس معاملات النسخة المتزامنة، والمنطق
+    نفسه (المقارنة والمطابقة والـ artifacts والـ metrics) في helpers مشتركة مع StudyInEgyptMonitor.
+    """
+    
+    def __init__(self, *args, **kwargs):
+        self.main_page = None
+        self.select_indexes = {}
+        super().__init__(*args, **kwargs)
+        self.api = None
+        self.page_responses = {}
+        self.bypass_pages = set()
+        self.open_dropdowns = set()
+        self.notify_tasks = set()
+        self.check_timeout = int(os.environ.get("CHECK_TIMEOUT", "120"))
+    
+    @property
+    def page(self):
+        """صفحة الرابط اللي الـ task الحالي بيفحصه، وإلا الصفحة الرئيسية (تسجيل الدخول)"""
+        active = active_page.get()
+        if active is not None and active[0] is self:
+            return active[1]
+        return self.main_page
+    
+    @page.setter
+    def page(self, page):
+        self.main_page = page
+    
+    @property
+    def programs_select_index(self):
+        """ترتيب قائمة التخصصات في صفحة الـ task الحالي (الصفحات بتتفحص بالتوازي)"""
+        return self.select_indexes.get(self.page)
+    
+    @programs_select_index.setter
+    def programs_select_index(self, idx):
+        self.select_indexes[self.page] = idx
+    
+    def set_state(self, state):
+        """حالة الفحص للـ task الحالي بس، وإلا حالة المراقب كلها"""
+        current = check_state.get()
+        if current is not None and current[0] is self:
+            current[1]["state"] = state
+        else:
+            self.status["state"] = state
+    
+    async def init_browser(self):
+        """تهيئة المتصفح"""
+        started_at = time.time()
+        if self.profile_dir and not self.acquire_profile_lock():
+            return False
+        try:
+            self.log_message("تهيئة Playwright (async)...")
+            self.playwright = await async_playwright().start()
+            
+            launch_args = list(BROWSER_ARGS)
+            if self.profile_dir:
+                self.log_message(f"تشغيل المتصفح ببروفايل دائم: {self.profile_dir}")
+                launch_args.append(f'--disk-cache-size={self.cache_size_mb * 1024 * 1024}')
+                self.context = await self.playwright.chromium.launch_persistent_context(
+                    self.profile_dir,
+                    headless=True,
+                    args=launch_args,
+                    **BROWSER_CONTEXT_OPTIONS
+                )
+            else:
+                self.log_message("تشغيل المتصفح...")
+                self.browser = await self.playwright.chromium.launch(headless=True, args=launch_args)
+                self.context = await self.browser.new_context(**BROWSER_CONTEXT_OPTIONS)
             
-            try:
-                screenshot_path = "login_error.png"
-                self.page.screenshot(path=screenshot_path)
-                self.log_message("📸 تم حفظ لقطة شاشة: login_error.png")
-                self.send_telegram_photo(screenshot_path, f"❌ خطأ في تسجيل الدخول: {e}")
-            except Exception as screenshot_error:
-                self.log_message(f"خطأ في لقطة الشاشة: {screenshot_error}")
+            await self.setup_context()
             
-            self.status["state"] = "login_failed"
+            self.status["browser_startup_seconds"] = round(time.time() - started_at, 2)
+            self.log_message(f"✅ تم تهيئة المتصفح بنجاح ({self.status['browser_startup_seconds']} ثانية)")
+            return True
+        
+        except Exception as e:
+            self.log_message(f"❌ خطأ في تهيئة المتصفح: {e}")
+            await self.close_browser()
             return False
     
-    def check_programs(self, request_url):
-        """فحص التخصصات المتاحة"""
+    async def setup_context(self):
+        """تجهيز self.context بعد إنشائه: stealth وحظر الموارد والصفحة وطلبات التليجرام"""
+        await self.context.add_init_script(STEALTH_INIT_SCRIPT)
+        self.context.on("close", lambda _: self.on_browser_crash("browser_closed"))
+        self.cycles_since_launch = 0
+        
+        if self.block_resources:
+            await self.context.route("**/*", self.route_request)
+            self.log_message(f"🚫 حظر الموارد: {', '.join(sorted(self.block_resource_types))}")
+        
+        self.page = self.context.pages[0] if self.context.pages else await self.context.new_page()
+        self.page.set_default_timeout(90000)
+        self.page.on("crash", lambda _: self.on_browser_crash("page_crash"))
+        
+        # طلبات التليجرام عبر Playwright نفسه (بدون threads)
+        self.api = await self.playwright.request.new_context()
+    
+    async def route_request(self, route):
+        """فلتر الطلبات المُركّب على الـ context"""
+        request = route.request
+        
+        if not self.should_block(request) or self.bypassed(request):
+            await route.continue_()
+            return
+        
+        self.record_blocked(request)
+        await route.abort("blockedbyclient")
+    
+    def bypassed(self, request):
+        """الطلب من صفحة بتاخد لقطة شاشة دلوقتي (باقي الصفحات يفضل عندها الحظر)"""
+        if not self.bypass_pages:
+            return False
+        try:
+            return request.frame.page in self.bypass_pages
+        except Exception:
+            return False
+    
+    async def use_page(self, request_url):
+        """صفحة مستقلة لكل رابط تقديم (الأولى تستخدم الصفحة الرئيسية) تبقى self.page للـ task الحالي"""
+        page = self.pages.get(request_url)
+        if page is None:
+            page = self.main_page if not self.pages else await self.context.new_page()
+            page.set_default_timeout(90000)
+            if page is not self.main_page:
+                page.on("crash", lambda _: self.on_browser_crash("page_crash"))
+            page.on("response", lambda response: self.on_page_response(page, response))
+            self.pages[request_url] = page
+        active_page.set((self, page))
+        return page
+    
+    def on_page_response(self, page, response):
+        """حفظ رد قائمة التخصصات لكل صفحة على حدة"""
+        if self.programs_source != "dom" and self.is_programs_response(response):
+            self.page_responses[page] = response
+        self.remember_resource_size(response)
+    
+    async def throttle(self, endpoint):
+        """انتظار دور الطلب في portal_limiter بدون ما يوقف باقي الصفحات"""
+        wait = await portal_limiter.acquire_async(endpoint)
+        if wait >= 1:
+            self.log_message(f"⏳ انتظار {wait:.1f} ثانية (حد الطلبات: {endpoint})", level=logging.DEBUG)
+    
+    def notify(self, coro):
+        """تشغيل إرسال التليجرام في الخلفية بدون انتظار"""
+        task = asyncio.ensure_future(coro)
+        self.notify_tasks.add(task)
+        task.add_done_callback(self.notify_tasks.discard)
+        return task
+    
+    async def telegram_request(self, method, **kwargs):
+        """طلب Telegram Bot API عبر APIRequestContext"""
+        if not self.telegram_token or not self.telegram_chat_id or not self.api:
+            return
+        
+        try:
+            url = f"https://api.telegram.org/bot{self.telegram_token}/{method}"
+            with self.metrics.span("telegram"):
+                response = await self.api.post(url, timeout=30000, **kwargs)
+            return await response.json()
+        except Exception as e:
+            self.metrics.error("telegram")
+            self.log_message(f"خطأ في إرسال التنبيه: {e}")
+    
+    def send_telegram_alert(self, message):
+        """إرسال تنبيه عبر التليجرام (في الخلفية)"""
+        return self.notify(self.telegram_request("sendMessage", form={
+            "chat_id": self.telegram_chat_id,
+            "text": message,
+            "parse_mode": "HTML"
+        }))
+    
+    def send_telegram_photo(self, photo_path, caption="", filename="photo.png"):
+        """إرسال صورة عبر التليجرام (في الخلفية) - مسار ملف أو bytes"""
+        try:
+            photo = self.notifier.read_bytes(photo_path)
+        except OSError as e:
+            self.log_message(f"خطأ في إرسال الصورة: {e}")
+            return None
+        
+        return self.notify(self.telegram_request("sendPhoto", multipart={
+            "chat_id": str(self.telegram_chat_id),
+            "caption": caption,
+            "photo": {
+                "name": filename,
+                "mimeType": mimetypes.guess_type(filename)[0] or "image/png",
+                "buffer": photo,
+            },
+        }))
+    
+    async def take_screenshot(self, path=None, locator=None, **kwargs):
+        """لقطة شاشة (للصفحة أو لعنصر) مع تحميل الصور المحظورة مؤقتاً - ترجع bytes"""
+        target = locator or self.page
+        if not self.block_resources:
+            return await target.screenshot(path=path, **kwargs)
+        
+        page = self.page
+        self.bypass_pages.add(page)
         try:
-            self.log_message(f"🔍 فتح صفحة التقديم...")
-            self.page.goto(request_url, wait_until="domcontentloaded", timeout=60000)
-            time.sleep(5)
-            
-            # أخذ لقطة شاشة
             try:
-                screenshot_path = "request_page.png"
-                self.page.screenshot(path=screenshot_path)
-                self.log_message("📸 لقطة شاشة لصفحة التقديم: request_page.png")
-                self.send_telegram_photo(screenshot_path, "📋 صفحة التقديم")
-            except Exception as e:
-                self.log_message(f"خطأ في لقطة الشاشة: {e}")
-            
-            # البحث عن زر "إضافة الرغبات"
-            self.log_message("🔍 البحث عن زر 'إضافة الرغبات'...")
-            
-            button_selectors = [
-                'button:has-text("إضافة الرغبات")',
-                'button:has(text="إضافة الرغبات")',
-                'button[class*="button_custom-button"]',
-            ]
-            
-            add_button_found = False
-            for selector in button_selectors:
+                if await page.evaluate(RELOAD_IMAGES_SCRIPT, 5000) < 0:
+                    self.log_message("⚠️ الصور ما خلصتش تحميل قبل اللقطة", logging.DEBUG)
+            except Exception:
+                pass
+            return await target.screenshot(path=path, **kwargs)
+        finally:
+            self.bypass_pages.discard(page)
+    
+    async def capture_screenshot(self, name, caption, kind="failure", state=None):
+        """لقطة شاشة حسب سياسة ArtifactManager: تُحفظ في الـ ring buffer وتُرسل من الذاكرة"""
+        if not self.artifacts.should_capture(kind, state, self.status["checks_count"]):
+            return None
+        
+        try:
+            locator = None
+            if kind == "routine" and self.artifacts.clip_selector:
+                candidate = self.page.locator(self.artifacts.clip_selector).first
+                if await candidate.count() > 0:
+                    locator = candidate
+            
+            data = await self.take_screenshot(locator=locator, **self.artifacts.screenshot_options())
+            return self.save_screenshot(name, caption, data)
+        except Exception as e:
+            self.log_message(f"خطأ في لقطة الشاشة: {e}")
+            return None
+    
+    async def wait_for(self, name, wait, timeout):
+        """انتظار شرط جاهزية بمهلة خاصة به مع قياس المدة الفعلية"""
+        started_at = time.time()
+        try:
+            await wait(timeout)
+            ok = True
+        except PlaywrightTimeout:
+            ok = False
+        return self.record_wait(name, started_at, ok, timeout)
+    
+    async def read_options(self, selector):
+        """كل خيارات القائمة في round trip واحد: [{index, text, value, disabled}]"""
+        return await self.page.evaluate(READ_OPTIONS_SCRIPT, selector)
+    
+    async def probe_selectors(self, selectors):
+        """عدد العناصر لكل selector في round trip واحد (None لصيغ Playwright الخاصة)"""
+        try:
+            return await self.page.evaluate(PROBE_SELECTORS_SCRIPT, selectors)
+        except Exception:
+            return [None] * len(selectors)
+    
+    async def find_selectors(self, group, candidates):
+        """المرشحين الموجودين في الصفحة بالترتيب المتعلَّم (async generator)"""
+        ordered = self.selectors.order(group, candidates)
+        counts = await self.probe_selectors(ordered)
+        self.selectors.miss(group, [s for s, c in zip(ordered, counts) if c == 0])
+        
+        for selector, count in zip(ordered, counts):
+            if count is None:
                 try:
-                    if self.page.locator(selector).count() > 0:
-                        self.log_message(f"✅ وجدت زر 'إضافة الرغبات': {selector}")
-                        self.page.click(selector, timeout=5000)
-                        add_button_found = True
-                        self.log_message("✅ تم الضغط على زر 'إضافة الرغبات'")
-                        time.sleep(3)
-                        break
-                except Exception as e:
-                    self.log_message(f"⚠️ فشل مع {selector}: {e}")
-                    continue
-            
-            if not add_button_found:
-                self.log_message("⚠️ لم أجد زر 'إضافة الرغبات' - ربما الرغبات مفتوحة بالفعل")
-            
-            # الآن البحث عن القائمة المنسدلة
-            self.log_message("🔍 البحث عن قائمة التخصصات...")
-            
-            current_programs = set()
-            
+                    count = await self.page.locator(selector).count()
+                except Exception:
+                    count = 0
+            if count:
+                yield selector
+    
+    async def resolve_selector(self, group, candidates):
+        """أول selector موجود في الصفحة، أو None"""
+        selector = None
+        async for selector in self.find_selectors(group, candidates):
+            self.selectors.hit(group, selector)
+            break
+        return selector
+    
+    async def harvest_options(self, target=None):
+        """كل خيارات القائمة المفتوحة حتى اللي خارج الجزء المرسوم من القائمة الافتراضية"""
+        return self.record_harvest(await self.page.evaluate(HARVEST_OPTIONS_SCRIPT, self.harvest_args(target)))
+    
+    async def wait_for_dropdown_closed(self):
+        """انتظار إغلاق القائمة المنسدلة بعد Escape"""
+        return await self.wait_for(
+            "dropdown_closed",
+            lambda t: self.page.wait_for_selector(
+                '.ant-select-dropdown:not(.ant-select-dropdown-hidden)',
+                state='hidden', timeout=t
+            ),
+            2000
+        )
+    
+    async def timed_login(self):
+        """تسجيل الدخول بالـ cookies مع قياس الزمن (token login واحد لكل محاولة)"""
+        with self.metrics.span("login"):
             try:
-                # البحث عن كل القوائم المنسدلة
-                all_selects = self.page.locator('div[class*="ant-select"]').all()
-                self.log_message(f"وجدت {len(all_selects)} قائمة منسدلة")
-                
-                # نجرب كل قائمة لحد ما نلاقي التخصصات
-                found_programs_dropdown = False
-                
-                for idx, select_elem in enumerate(all_selects):
-                    try:
-                        self.log_message(f"📋 فحص القائمة رقم {idx + 1}...")
-                        
-                        # الضغط لفتح القائمة
-                        select_elem.click(timeout=3000)
-                        time.sleep(2)
-                        
-                        # الحصول على الخيارات
-                        options = self.page.locator('div[class*="ant-select-item"]').all()
-                        
-                        if len(options) > 0:
-                            first_option_text = options[0].inner_text().strip()
-                            self.log_message(f"  أول خيار: {first_option_text}")
-                            
-                            # فحص إذا كانت دي قائمة اللغات (نتجاهلها)
-                            if first_option_text in ['العربية', 'English', 'Français', 'عربي', 'إنجليزي']:
-                                self.log_message(f"  ⏭️ تخطي - دي قائمة اللغات")
-                                # إغلاق القائمة
-                                self.page.keyboard.press("Escape")
-                                time.sleep(1)
-                                continue
-                            
-                            # لو وصلنا هنا، يبقى دي قائمة التخصصات!
-                            self.log_message(f"✅ وجدت قائمة التخصصات! ({len(options)} خيار)")
-                            
-                            for option in options:
-                                try:
-                                    text = option.inner_text().strip()
-                                    if text and len(text) > 3:
-                                        current_programs.add(text)
-                                        self.log_message(f"  📋 {text}")
-                                except:
-                                    continue
-                            
-                            found_programs_dropdown = True
-                            
-                            # إغلاق القائمة
-                            try:
-                                self.page.keyboard.press("Escape")
-                                time.sleep(1)
-                            except:
-                                pass
-                            
-                            break  # وجدنا اللي عايزينه، نوقف
-                        
-                    except Exception as e:
-                        self.log_message(f"  ⚠️ خطأ في القائمة {idx + 1}: {e}")
-                        continue
-                
-                if not found_programs_dropdown:
-                    self.log_message("⚠️ لم أجد قائمة التخصصات!")
-                    
-                    # أخذ screenshot للتشخيص
-                    try:
-                        self.page.screenshot(path="no_programs_dropdown.png")
-                        self.send_telegram_photo("no_programs_dropdown.png", "⚠️ لم أجد قائمة التخصصات")
-                    except:
-                        pass
-                    
-                    return False
-                
-            except Exception as e:
-                self.log_message(f"⚠️ خطأ في البحث عن القوائم: {e}")
-                
-                # أخذ screenshot للتشخيص
-                try:
-                    self.page.screenshot(path="dropdown_error.png")
-                    self.send_telegram_photo("dropdown_error.png", f"❌ خطأ: {e}")
-                except:
-                    pass
-                
+                await self.throttle("login")
+                logged_in = await self.login_with_cookies()
+            except RateLimitExceeded as e:
+                self.log_message(f"⏳ تأجيل تسجيل الدخول: {e}", logging.WARNING)
+                self.status["state"] = "login_failed"
+                logged_in = False
+        if not logged_in:
+            self.metrics.error("login")
+        self.emit("login", ok=logged_in, state=self.status["state"])
+        return logged_in
+    
+    async def login_with_cookies(self):
+        """تسجيل دخول باستخدام cookies محفوظة"""
+        try:
+            self.log_message("محاولة تسجيل الدخول بالـ Cookies (async)...")
+            await self.page.goto(self.base_url, wait_until="networkidle", timeout=60000)
+            
+            cookies = self.read_cookies()
+            if cookies is None:
+                self.log_message("❌ لا توجد cookies - المحرك غير المتزامن يحتاج cookies صالحة")
+                self.status["state"] = "login_failed"
                 return False
             
-            self.log_message(f"📊 إجمالي التخصصات: {len(current_programs)}")
-            
-            # البحث عن تخصصات جديدة
-            new_programs = current_programs - self.last_programs
-            if new_programs:
-                self.log_message(f"🆕 تخصصات جديدة: {len(new_programs)}")
-                for prog in new_programs:
-                    self.log_message(f"  ➕ {prog}")
-            
-            self.last_programs = current_programs
-            self.status["last_check"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            self.status["checks_count"] += 1
-            
-            # التحقق من التخصصات المستهدفة
-            for program in current_programs:
-                for target in self.target_programs:
-                    if target.lower() in program.lower() and program not in self.found_programs:
-                        self.found_programs.add(program)
-                        
-                        self.log_message("=" * 60)
-                        self.log_message(f"🎯🎯🎯 وجدت التخصص: {program} 🎯🎯🎯")
-                        self.log_message("=" * 60)
-                        
-                        # اختيار التخصص
-                        if self.select_program(program):
-                            # الضغط على استمرار
-                            if self.click_continue_button():
-                                alert = f"""
-🎉🎉🎉 <b>تم العثور على التخصص!</b> 🎉🎉🎉
-
-📚 <b>التخصص:</b>
-{program}
-
-✅ <b>تم:</b>
-• اختيار التخصص
-• الضغط على "استمرار"
-
-⏰ <b>الوقت:</b>
-{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
-
-🔗 <b>الرابط:</b>
-{request_url}
-
-⚡⚡⚡ <b>اذهب الآن وأكمل التقديم!</b> ⚡⚡⚡
-                                """
-                                
-                                self.send_telegram_alert(alert)
-                                self.status["state"] = "success"
-                                
-                                # لقطة شاشة
-                                try:
-                                    filename = f"success_{datetime.now().strftime('%Y%m%d_%H%M%S')}.png"
-                                    self.page.screenshot(path=filename)
-                                    self.log_message(f"📸 لقطة الشاشة: {filename}")
-                                    self.send_telegram_photo(filename, f"🎉 نجح! تم اختيار {program}")
-                                except Exception as e:
-                                    self.log_message(f"خطأ في لقطة الشاشة: {e}")
-                                
-                                self.log_message("✅ تم! سأتوقف الآن...")
-                                self.is_running = False
-                                return True
+            await self.context.add_cookies(cookies)
+            await self.page.goto(f"{self.base_url}/dashboard", wait_until="domcontentloaded", timeout=30000)
+            await self.wait_for(
+                "dashboard_ready",
+                lambda t: self.page.wait_for_load_state("networkidle", timeout=t),
+                10000
+            )
             
-            return False
+            if "login" in self.page.url.lower():
+                self.log_message("❌ الـ cookies منتهية - استخدم المحرك العادي لتسجيل الدخول بكلمة المرور")
+                self.status["state"] = "login_failed"
+                return False
             
+            self.log_message("✅✅✅ تم تسجيل الدخول بنجاح بالـ Cookies! ✅✅✅")
+            self.status["state"] = "logged_in"
+            self.send_telegram_alert("✅ تم تسجيل الدخول بالـ Cookies!")
+            return True
+        
         except Exception as e:
-            self.log_message(f"❌ خطأ في الفحص: {e}")
-            self.status["state"] = "check_error"
+            self.log_message(f"❌ خطأ في تسجيل الدخول بالـ cookies: {e}")
+            self.status["state"] = "login_failed"
             return False
-        """فحص التخصصات المتاحة"""
+    
+    async def idle(self, seconds):
+        """الانتظار للدورة الجاية مع أخد عينات الاستهلاك ونشر الحالة في مواعيدها"""
+        end = time.time() + seconds
+        while self.is_running:
+            if self.sampler and self.sampler.due():
+                await self.sample_resources()
+            self.publish_status()
+            remaining = end - time.time()
+            if remaining <= 0:
+                break
+            await asyncio.sleep(self.idle_step(remaining))
+    
+    async def sample_resources(self):
         try:
-            self.log_message(f"🔍 فتح صفحة التقديم...")
-            self.page.goto(request_url, wait_until="domcontentloaded", timeout=60000)
-            time.sleep(5)
-            
-            # أخذ لقطة شاشة
+            page_metrics = await self.resource_usage()
+        except Exception as e:
+            self.log_message(f"⚠️ خطأ في قياس الصفحات: {e}", level=logging.DEBUG)
+            page_metrics = None
+        return self.sampler.sample(page_metrics)
+    
+    async def maintain_session(self, next_delay):
+        """بين الفحوصات: فحص صلاحية الجلسة وتجديدها قبل ما تنتهي (نفس منطق النسخة المتزامنة)"""
+        try:
+            with self.metrics.span("session_probe"):
+                needs_refresh = self.session_state(self.session_expiry(await self.context.cookies()), next_delay)
+                
+                probe = self.session_probe_request()
+                if not needs_refresh and probe and time.time() - self.session_probed_at >= self.session_probe_interval:
+                    self.session_probed_at = time.time()
+                    url, method, data, headers = probe
+                    await self.throttle("session")
+                    response = await self.context.request.fetch(
+                        url, method=method, data=data, headers=headers, max_redirects=0, timeout=15000
+                    )
+                    needs_refresh = not self.record_session_probe(response.status, response.headers.get("location", ""))
+        except Exception as e:
+            self.log_message(f"⚠️ خطأ في فحص الجلسة: {e}")
+            self.metrics.error("session_probe")
+            return
+        
+        if needs_refresh:
+            await self.refresh_session()
+    
+    async def refresh_session(self):
+        """تجديد الجلسة بطلب صفحة محمية بالـ cookies الحالية (السيرفر بيبدّلها لو بيعمل كده)
+        
+        المحرك غير المتزامن مايقدرش يسجل دخول بكلمة المرور، ومش بنرجّع الـ cookies المحفوظة
+        عشان ماتكتبش فوق cookies أحدث. لو الانتهاء ما اتمدّش: تنبيه لتحديث الـ cookies.
+        """
+        old_expiry = self.session_expiry(await self.context.cookies())
+        was_valid = self.status["session"]["valid"] is not False
+        refreshed = False
+        with self.metrics.span("session_refresh"):
             try:
-                screenshot_path = "request_page.png"
-                self.page.screenshot(path=screenshot_path)
-                self.log_message("📸 لقطة شاشة لصفحة التقديم: request_page.png")
-                self.send_telegram_photo(screenshot_path, "📋 صفحة التقديم")
+                await self.throttle("session")
+                await self.page.goto(f"{self.base_url}/dashboard", wait_until="domcontentloaded", timeout=30000)
+                refreshed = "login" not in self.page.url.lower()
             except Exception as e:
-                self.log_message(f"خطأ في لقطة الشاشة: {e}")
-            
-            self.log_message("البحث عن القائمة المنسدلة...")
-            
-            current_programs = set()
-            
+                self.log_message(f"❌ خطأ في تجديد الجلسة: {e}")
+        
+        if refreshed:
+            refreshed = self.refresh_extended(old_expiry, self.session_expiry(await self.context.cookies()), was_valid)
+        return self.record_refresh(
+            refreshed, "⚠️ الجلسة قربت تنتهي - حدّث الـ cookies (COOKIES_BASE64 أو cookies.json)"
+        )
+    
+    async def open_request_form(self, request_url):
+        """فتح صفحة التقديم والضغط على زر 'إضافة الرغبات'"""
+        page = self.page
+        self.page_responses[page] = None
+        self.open_dropdowns.discard(page)
+        await self.throttle("poll")
+        with self.metrics.span("goto"):
+            await page.goto(request_url, wait_until="domcontentloaded", timeout=60000)
+            await self.wait_for(
+                "request_page",
+                lambda t: page.wait_for_selector(
+                    'button:has-text("إضافة الرغبات"), div[class*="ant-select"]',
+                    state='visible', timeout=t
+                ),
+                15000
+            )
+        
+        button_started_at = time.time()
+        add_button_found = False
+        async for selector in self.find_selectors("add_wishes", ADD_WISHES_SELECTORS):
             try:
-                # البحث عن react-select control
-                select_selectors = [
-                    'div[class*="react-select__control"]',
-                    'div[class*="select__control"]',
-                    '[class*="select-control"]',
-                    'select',
-                    '[role="combobox"]',
-                ]
-                
-                select_found = None
-                for selector in select_selectors:
-                    try:
-                        if self.page.locator(selector).count() > 0:
-                            select_found = selector
-                            self.log_message(f"✅ وجدت القائمة: {selector}")
-                            break
-                    except:
-                        continue
-                
-                if not select_found:
-                    self.log_message("⚠️ لم أجد القائمة المنسدلة")
-                    return False
-                
-                self.log_message("محاولة فتح القائمة المنسدلة...")
-                self.page.click(select_found, timeout=10000)
-                time.sleep(3)
-                
-                # الحصول على جميع الخيارات
-                option_selectors = [
-                    'div[class*="react-select__option"]',
-                    'div[class*="select__option"]',
-                    '[role="option"]',
-                    'option',
-                ]
-                
-                options = None
-                for selector in option_selectors:
-                    try:
-                        if self.page.locator(selector).count() > 0:
-                            options = self.page.locator(selector).all()
-                            self.log_message(f"✅ وجدت الخيارات: {selector}")
-                            break
-                    except:
-                        continue
-                
-                if options and len(options) > 0:
-                    self.log_message(f"✅ وجدت {len(options)} خيار")
-                    
-                    for option in options:
-                        try:
-                            text = option.inner_text().strip()
-                            if text and len(text) > 3:
-                                current_programs.add(text)
-                                self.log_message(f"  📋 {text}")
-                        except:
-                            continue
-                    
-                    # إغلاق القائمة
-                    self.page.keyboard.press("Escape")
-                    time.sleep(1)
-                else:
-                    self.log_message("⚠️ لم أجد خيارات")
-                
+                selects_before = await page.locator('div[class*="ant-select"]').count()
+                await page.click(selector, timeout=5000)
+                self.selectors.hit("add_wishes", selector)
+                add_button_found = True
+                await self.wait_for(
+                    "wishes_form",
+                    lambda t: page.wait_for_function(
+                        "(n) => document.querySelectorAll('div[class*=\"ant-select\"]').length > n",
+                        arg=selects_before, timeout=t
+                    ),
+                    10000
+                )
+                break
             except Exception as e:
-                self.log_message(f"⚠️ خطأ في فتح القائمة: {e}")
-                
-                # محاولة الحصول على القيمة الحالية
-                try:
-                    value_selectors = [
-                        'div[class*="react-select__single-value"]',
-                        'div[class*="select__value"]',
-                        '[class*="selected-value"]',
-                    ]
-                    
-                    for selector in value_selectors:
-                        if self.page.locator(selector).count() > 0:
-                            text = self.page.locator(selector).first.inner_text().strip()
-                            if text:
-                                current_programs.add(text)
-                                self.log_message(f"القيمة الحالية: {text}")
-                                break
-                except:
-                    pass
-            
-            self.log_message(f"📊 إجمالي التخصصات: {len(current_programs)}")
-            
-            # البحث عن تخصصات جديدة
-            new_programs = current_programs - self.last_programs
-            if new_programs:
-                self.log_message(f"🆕 تخصصات جديدة: {len(new_programs)}")
-                for prog in new_programs:
-                    self.log_message(f"  ➕ {prog}")
-            
-            self.last_programs = current_programs
-            self.status["last_check"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            self.status["checks_count"] += 1
-            
-            # التحقق من التخصصات المستهدفة
-            for program in current_programs:
-                for target in self.target_programs:
-                    if target.lower() in program.lower() and program not in self.found_programs:
-                        self.found_programs.add(program)
-                        
-                        self.log_message("=" * 60)
-                        self.log_message(f"🎯🎯🎯 وجدت التخصص: {program} 🎯🎯🎯")
-                        self.log_message("=" * 60)
-                        
-                        # اختيار التخصص
-                        if self.select_program(program):
-                            # الضغط على استمرار
-                            if self.click_continue_button():
-                                alert = f"""
-🎉🎉🎉 <b>تم العثور على التخصص!</b> 🎉🎉🎉
-
-📚 <b>التخصص:</b>
-{program}
-
-✅ <b>تم:</b>
-• اختيار التخصص
-• الضغط على "استمرار"
-
-⏰ <b>الوقت:</b>
-{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
-
-🔗 <b>الرابط:</b>
-{request_url}
-
-⚡⚡⚡ <b>اذهب الآن وأكمل التقديم!</b> ⚡⚡⚡
-                                """
-                                
-                                self.send_telegram_alert(alert)
-                                self.status["state"] = "success"
-                                
-                                # لقطة شاشة
-                                try:
-                                    filename = f"success_{datetime.now().strftime('%Y%m%d_%H%M%S')}.png"
-                                    self.page.screenshot(path=filename)
-                                    self.log_message(f"📸 لقطة الشاشة: {filename}")
-                                    self.send_telegram_photo(filename, f"🎉 نجح! تم اختيار {program}")
-                                except Exception as e:
-                                    self.log_message(f"خطأ في لقطة الشاشة: {e}")
-                                
-                                self.log_message("✅ تم! سأتوقف الآن...")
-                                self.is_running = False
-                                return True
+                self.log_message(f"⚠️ فشل مع {selector}: {e}", logging.DEBUG, selector=selector)
+                continue
+        
+        self.metrics.observe("add_wishes_button", time.time() - button_started_at)
+        return add_button_found
+    
+    async def wait_for_programs_response(self):
+        """انتظار رد قائمة التخصصات وتحليله - None لو ما وصلش رد"""
+        response = self.page_responses.get(self.page)
+        
+        if response is None:
+            if self.programs_response_missed:
+                return None
+            try:
+                response = await self.page.wait_for_event(
+                    "response",
+                    predicate=self.is_programs_response,
+                    timeout=self.programs_response_timeout
+                )
+            except PlaywrightTimeout:
+                if not self.programs_response_missed:
+                    self.note_programs_response_missed()
+                return None
+        self.programs_response_missed = False
+        
+        try:
+            with self.metrics.span("programs_response"):
+                programs = self.parse_programs_payload(await response.json())
+        except Exception as e:
+            self.log_message(f"⚠️ خطأ في تحليل رد التخصصات: {e}")
+            return None
+        
+        if not programs:
+            return None
+        self.remember_programs_request(response)
+        return programs
+    
+    async def extract_programs_from_dom(self, request_url=None):
+        """قراءة التخصصات من القائمة المنسدلة (ant-select)"""
+        page = self.page
+        discovery_started_at = time.time()
+        
+        current_programs = await self.open_programs_dropdown()
+        if current_programs is None:
+            self.log_message("⚠️ لم أجد قائمة التخصصات!")
+            self.metrics.error("dropdown_discovery")
+            await self.capture_screenshot("no_programs_dropdown", "⚠️ لم أجد قائمة التخصصات")
+            return None
+        
+        self.metrics.observe("dropdown_discovery", time.time() - discovery_started_at)
+        
+        # لو ظهر تخصص مستهدف نسيب القائمة مفتوحة لـ select_program (المسار السريع)
+        if self.pending_targets(current_programs, request_url):
+            self.open_dropdowns.add(page)
+        else:
+            try:
+                await page.keyboard.press("Escape")
+                await self.wait_for_dropdown_closed()
+            except Exception:
+                pass
+        return current_programs
+    
+    async def open_programs_dropdown(self):
+        """فتح قائمة التخصصات (antd) وقراءة خياراتها - القائمة بتفضل مفتوحة، None لو مالقيناهاش"""
+        page = self.page
+        controls = await page.locator(ANT_SELECT_CONTROLS).all()
+        
+        for idx in self.programs_dropdown_order(len(controls)):
+            try:
+                await controls[idx].click(timeout=3000)
+                await self.wait_for(
+                    "dropdown_open",
+                    lambda t: page.wait_for_selector(OPEN_DROPDOWN_OPTIONS, state='visible', timeout=t),
+                    3000
+                )
+                
+                with self.metrics.span("option_extraction"):
+                    options = await self.harvest_options()
+                
+                programs = self.programs_from_options(options) if options else None
+                if programs is None:
+                    await page.keyboard.press("Escape")
+                    await self.wait_for_dropdown_closed()
+                    continue
+                
+                self.programs_select_index = idx
+                return programs
             
-            return False
+            except Exception as e:
+                self.log_message(f"  ⚠️ خطأ في القائمة {idx + 1}: {e}")
+                continue
+        
+        return None
+    
+    async def check_programs(self, request_url):
+        """فحص التخصصات المتاحة في صفحة الرابط (self.page للـ task الحالي)"""
+        try:
+            self.log_message(f"🔍 فحص: {request_url}")
+            self.open_dropdowns.discard(self.page)
+            await self.open_request_form(request_url)
+            
+            current_programs = None
+            if self.programs_source != "dom":
+                current_programs = await self.wait_for_programs_response()
             
+            if current_programs is None:
+                current_programs = await self.extract_programs_from_dom(request_url)
+                if current_programs is None:
+                    return False
+                self.status["programs_source"] = "dom"
+            else:
+                self.status["programs_source"] = "response"
+            detected_at = time.time()
+            
+            found = await self.process_programs(current_programs, request_url, detected_at=detected_at)
+            
+            # لقطة روتينية بعد المطابقة وفقط لو تغيرت قائمة التخصصات
+            if not found:
+                await self.capture_screenshot(
+                    "request_page", "📋 صفحة التقديم",
+                    kind="routine", state=hash(frozenset(current_programs))
+                )
+            return found
+        
         except Exception as e:
             self.log_message(f"❌ خطأ في الفحص: {e}")
-            self.status["state"] = "check_error"
+            self.metrics.error("check")
+            self.set_state("check_error")
+            self.note_browser_error(e)
+            return False
+    
+    async def process_programs(self, current_programs, request_url, form_open=True, detected_at=None):
+        """مقارنة التخصصات بالفحص السابق واختيار التخصص المستهدف لو ظهر (زي النسخة المتزامنة)"""
+        candidates = self.target_candidates(current_programs, request_url)
+        
+        for program in self.match_targets(candidates, request_url):
+            self.announce_target(request_url, program)
+            
+            if not form_open:
+                await self.open_request_form(request_url)
+                form_open = True
+            
+            with self.metrics.span("select_program"):
+                selected = await self.select_program(program, detected_at)
+            if not selected:
+                self.metrics.error("select_program")
+                self.retry_target(request_url, program)
+                continue
+            
+            with self.metrics.span("click_continue_button"):
+                continued = await self.click_continue_button(detected_at)
+            if not continued:
+                self.metrics.error("click_continue_button")
+                self.retry_target(request_url, program)
+                continue
+            self.record_success(request_url, program)
+            
+            await self.capture_screenshot("success", f"🎉 نجح! تم اختيار {program}", kind="success")
+            
+            self.complete_url(request_url)
+            return True
+        
+        return False
+    
+    async def click_open_option(self, program_name, detected_at=None):
+        """المسار السريع: الضغط على الخيار في القائمة اللي سابها الاستخراج مفتوحة"""
+        self.open_dropdowns.discard(self.page)
+        option = self.page.locator(OPEN_DROPDOWN_OPTIONS).filter(has_text=exact_text(program_name))
+        try:
+            if await option.count() == 0:
+                await self.harvest_options(target=program_name)
+            await option.first.click(timeout=3000)
+            self.record_latency("detect_to_click", detected_at)
+            self.log_message("⚡ تم اختيار التخصص من القائمة المفتوحة")
+            return True
+        except Exception as e:
+            self.log_message(f"⚠️ فشل المسار السريع: {e}")
             return False
     
-    def select_program(self, program_name):
-        """اختيار التخصص"""
+    async def select_program(self, program_name, detected_at=None):
+        """اختيار التخصص
+        
+        detected_at: وقت قراءة التخصصات (لقياس detect_to_click)
+        """
+        page = self.page
         try:
             self.log_message(f"اختيار: {program_name}")
             
-            # فتح القائمة
-            select_selectors = [
-                'div[class*="react-select__control"]',
-                'div[class*="select__control"]',
-            ]
-            
-            for selector in select_selectors:
-                try:
-                    if self.page.locator(selector).count() > 0:
-                        self.page.click(selector)
-                        time.sleep(2)
-                        break
-                except:
-                    continue
+            dropdown_open = page in self.open_dropdowns
+            if dropdown_open and await self.click_open_option(program_name, detected_at):
+                return True
             
-            # البحث والضغط على الخيار
-            option_selectors = [
-                'div[class*="react-select__option"]',
-                'div[class*="select__option"]',
-                '[role="option"]',
-            ]
+            # القائمة مقفولة (التخصصات اتقرت من رد الـ API): نفتح قائمة التخصصات (antd)
+            if not dropdown_open and await self.open_programs_dropdown() is not None:
+                if await self.click_open_option(program_name, detected_at):
+                    return True
             
-            for selector in option_selectors:
+            # احتياطي: react-select
+            async for selector in self.find_selectors("select_control", SELECT_CONTROL_SELECTORS):
                 try:
-                    options = self.page.locator(selector).all()
-                    for option in options:
-                        if program_name in option.inner_text():
-                            option.click()
-                            time.sleep(2)
-                            self.log_message("✅ تم اختيار التخصص")
-                            return True
-                except:
+                    await page.click(selector)
+                    self.selectors.hit("select_control", selector)
+                    await self.wait_for(
+                        "select_open",
+                        lambda t: page.wait_for_selector(ANY_OPTION_SELECTOR, state='visible', timeout=t),
+                        3000
+                    )
+                    break
+                except Exception:
                     continue
             
+            for attempt in range(2):
+                option = self.matching_option(await self.read_options(ANY_OPTION_SELECTOR), program_name)
+                if option:
+                    await page.locator(ANY_OPTION_SELECTOR).nth(option["index"]).click()
+                    self.record_latency("detect_to_click", detected_at)
+                    
+                    await self.wait_for(
+                        "select_applied",
+                        lambda t: page.wait_for_function(SELECTED_VALUE_SCRIPT, arg=program_name, timeout=t),
+                        3000
+                    )
+                    self.log_message("✅ تم اختيار التخصص")
+                    return True
+                
+                if attempt == 1:
+                    break
+                harvested = await self.harvest_options(target=program_name)
+                if not any(self.matcher.contains(o["text"], program_name) for o in harvested):
+                    break
+            
             self.log_message("❌ لم أجد الخيار")
             return False
-            
+        
         except Exception as e:
             self.log_message(f"❌ خطأ في الاختيار: {e}")
             return False
     
-    def click_continue_button(self):
-        """الضغط على زر استمرار"""
+    async def click_continue_button(self, detected_at=None):
+        """الضغط على زر استمرار (click بينتظر لحد ما الزر يبقى enabled)"""
+        page = self.page
         try:
-            self.log_message("البحث عن زر استمرار...")
-            
-            button_selectors = [
-                'button:has-text("إستمرار")',
-                'button:has-text("استمرار")',
-                'button:has-text("Continue")',
-                'button:has(span:text("إستمرار"))',
-                'button:has(span:text("استمرار"))',
-                'button.btn-primary',
-                'button[type="submit"]',
-            ]
-            
-            for selector in button_selectors:
+            async for selector in self.find_selectors("continue_button", CONTINUE_BUTTON_SELECTORS):
                 try:
-                    if self.page.locator(selector).count() > 0:
-                        self.page.click(selector, timeout=5000)
-                        time.sleep(2)
-                        self.log_message("✅ تم الضغط على استمرار")
-                        return True
-                except:
+                    await page.click(selector, timeout=5000)
+                    self.record_latency("detect_to_continue", detected_at)
+                    self.selectors.hit("continue_button", selector)
+                    await self.wait_for(
+                        "continue_done",
+                        lambda t: page.wait_for_load_state("networkidle", timeout=t),
+                        5000
+                    )
+                    self.log_message("✅ تم الضغط على استمرار")
+                    return True
+                except Exception:
                     continue
             
             self.log_message("❌ لم أجد زر استمرار")
             return False
-            
+        
         except Exception as e:
             self.log_message(f"❌ خطأ: {e}")
             return False
     
-    def start_monitoring(self, request_url, interval=30):
-        """بدء المراقبة"""
+    async def wait_check_spacing(self):
+        """CHECK_SPACING ثانية على الأقل بين بداية أي فحصين (حد مشترك لكل الصفحات)"""
+        async with self.spacing_lock:
+            wait = self.last_check_started_at + self.check_spacing - time.time()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            self.last_check_started_at = time.time()
+    
+    async def timed_check(self, request_url):
+        """فحص رابط واحد في صفحته بمهلة قصوى (بحد أقصى MAX_CONCURRENT_CHECKS فحص في نفس الوقت)
+        
+        بيشتغل كـ task مستقل من asyncio.gather فـ use_page بتغير self.page للـ task ده بس،
+        وحالته في check_state مش في self.status - ترجع الحالة عشان تتجمع بعد الـ gather.
+        """
+        found = False
+        started_at = None
+        state = {"state": "checking"}
+        check_state.set((self, state))
+        try:
+            async with self.check_slots:
+                await self.use_page(request_url)
+                await self.wait_check_spacing()
+                started_at = time.time()
+                self.emit("check_started", url=request_url)
+                with self.metrics.span("check"):
+                    found = await asyncio.wait_for(self.check_programs(request_url), self.check_timeout)
+            if state["state"] != "check_error":
+                try:
+                    self.session_cookies = await self.context.cookies()
+                except Exception:
+                    pass
+        except asyncio.TimeoutError:
+            self.log_message(f"❌ تجاوز الفحص المهلة ({self.check_timeout} ثانية): {request_url}")
+            state["state"] = "check_error"
+        finally:
+            if started_at:
+                self.emit(
+                    "check_finished", url=request_url, seconds=round(time.time() - started_at, 2),
+                    state=state["state"], found=bool(found)
+                )
+        return state["state"]
+    
+    async def start_monitoring(self, request_url, interval=30):
+        """بدء المراقبة - request_url رابط واحد أو قائمة روابط (صفحة لكل رابط)"""
+        self.request_urls = [request_url] if isinstance(request_url, str) else list(request_url)
+        self.check_slots = asyncio.Semaphore(max(1, self.max_concurrent_checks))
+        self.spacing_lock = asyncio.Lock()
+        
         self.is_running = True
+        self.scheduler.interval = interval
         self.log_message("=" * 60)
-        self.log_message("🚀 بدء نظام المراقبة")
+        self.log_message("🚀 بدء نظام المراقبة (async)")
         self.log_message("=" * 60)
         self.log_message(f"📚 التخصصات: {', '.join(self.target_programs)}")
-        self.log_message(f"⏱️ فترة الفحص: {interval} ثانية")
+        self.log_message(f"⏱️ فترة الفحص: {interval} ثانية (الحد الأدنى {self.scheduler.min_interval})")
+        self.log_message(f"🔗 الروابط: {len(self.request_urls)} (حتى {self.max_concurrent_checks} فحص متوازي)")
         
-        if not self.init_browser():
+        if not await self.init_browser():
             self.log_message("❌ فشل تهيئة المتصفح")
             return
         
-        # محاولة تسجيل الدخول بالـ cookies أولاً
-        if not self.login_with_cookies():
+        if not await self.timed_login():
             self.log_message("❌ فشل تسجيل الدخول")
-            self.log_message("💡 تحقق من بيانات الدخول والـ screenshots")
-            self.cleanup()
+            await self.cleanup()
             return
         
         self.send_telegram_alert("🚀 بدأ النظام!")
@@ -1707,59 +4477,740 @@ class StudyInEgyptMonitor:
         try:
             while self.is_running:
                 check_count += 1
-                self.log_message(f"\n{'='*60}")
                 self.log_message(f"🔍 الفحص رقم {check_count}")
-                self.log_message(f"{'='*60}")
                 
-                found = self.check_programs(request_url)
+                # الروابط المتبقية تُفحص بالتوازي في صفحات منفصلة
+                self.status["state"] = "checking"
+                check_started_at = time.time()
+                self.publish_status()
+                if await self.watchdog():
+                    states = await asyncio.gather(*(
+                        self.timed_check(url) for url in self.request_urls if url not in self.completed_urls
+                    ))
+                    # أي رابط فشل = الدورة فشلت (الـ scheduler يبطّأ)، وإلا نجاح لو أي رابط نجح
+                    if "check_error" in states:
+                        self.status["state"] = "check_error"
+                    elif "success" in states:
+                        self.status["state"] = "success"
+                else:
+                    self.status["state"] = "check_error"
                 
-                if found:
-                    self.log_message("✅ تم!")
+                if not self.is_running:
                     break
-                else:
-                    self.log_message(f"⏳ انتظار {interval} ثانية...")
-                    time.sleep(interval)
                 
-        except KeyboardInterrupt:
+                delay = self.schedule_next(time.time() - check_started_at)
+                session_started_at = time.time()
+                await self.maintain_session(delay)
+                await self.idle(max(0, delay - (time.time() - session_started_at)))
+        
+        except asyncio.CancelledError:
             self.log_message("⛔ توقف يدوي")
-            self.send_telegram_alert("⛔ توقف النظام")
         except Exception as e:
             self.log_message(f"❌ خطأ: {e}")
             self.send_telegram_alert(f"❌ خطأ: {e}")
         finally:
-            self.cleanup()
+            await self.cleanup()
     
-    def cleanup(self):
-        """تنظيف الموارد"""
+    async def cleanup(self):
+        """تنظيف الموارد - بعد إرسال التنبيهات المعلقة"""
         try:
-            if self.browser:
-                self.browser.close()
-            if self.playwright:
-                self.playwright.stop()
+            if self.notify_tasks:
+                await asyncio.wait(list(self.notify_tasks), timeout=30)
+            self.selectors.flush()
+            await self.close_browser()
             self.log_message("✅ تم التنظيف")
         except:
             pass
     
-    def get_status(self):
-        """حالة النظام"""
-        return self.status
+    async def close_browser(self):
+        """إغلاق طلبات التليجرام والـ context والمتصفح و Playwright"""
+        self.closing_browser = True
+        try:
+            for close in (self.api and self.api.dispose, self.context and self.context.close,
+                          self.browser and self.browser.close, self.playwright and self.playwright.stop):
+                try:
+                    if close:
+                        await close()
+                except Exception:
+                    pass
+        finally:
+            self.api = self.context = self.browser = self.playwright = None
+            self.release_profile_lock()
+            self.closing_browser = False
+    
+    async def resource_usage(self):
+        """استهلاك الصفحات من داخل Chromium عبر CDP: عدد الصفحات وJS heap وعناصر DOM والـ layouts"""
+        pages = list(self.context.pages) if self.context else []
+        heap = nodes = layouts = 0
+        for page in pages:
+            try:
+                cdp = await self.context.new_cdp_session(page)
+                await cdp.send("Performance.enable")
+                result = await cdp.send("Performance.getMetrics")
+                await cdp.detach()
+            except Exception:
+                continue
+            values = {m["name"]: m["value"] for m in result.get("metrics", [])}
+            heap += values.get("JSHeapUsedSize", 0)
+            nodes += values.get("Nodes", 0)
+            layouts += values.get("LayoutCount", 0)
+        
+        return {
+            "pages": len(pages),
+            "js_heap_mb": round(heap / 1048576, 1),
+            "dom_nodes": int(nodes),
+            "layout_count": int(layouts),
+        }
+    
+    async def watchdog(self):
+        """قبل كل دورة: إعادة التشغيل لو وقع أو التدوير (نفس منطق النسخة المتزامنة)"""
+        if self.browser_crashed:
+            return await self.relaunch_browser(self.browser_crashed, crashed=True)
+        
+        usage = None
+        if self.memory_due():
+            try:
+                usage = self.status["resources"] = await self.resource_usage()
+            except Exception as e:
+                self.log_message(f"⚠️ خطأ في قياس الذاكرة: {e}")
+        
+        reason = self.recycle_reason(usage)
+        return await self.relaunch_browser(reason) if reason else True
+    
+    async def relaunch_browser(self, reason, crashed=False):
+        """إغلاق المتصفح وفتحه تاني عبر init_browser واسترجاع الجلسة من الـ cookies"""
+        self.record_relaunch(reason, crashed)
+        cookies = self.session_cookies
+        if not crashed:
+            try:
+                cookies = await self.context.cookies()
+            except Exception:
+                pass
+        
+        with self.metrics.span("relaunch"):
+            await self.close_browser()
+            self.browser_crashed = None
+            self.pages = {}
+            self.page_responses = {}
+            self.open_dropdowns = set()
+            
+            if await self.init_browser() and await self.restore_session(cookies):
+                return True
+        
+        self.metrics.error("relaunch")
+        self.browser_crashed = reason
+        return False
+    
+    async def restore_session(self, cookies):
+        """إرجاع الجلسة في الـ context الجديد: الـ cookies اللي في الذاكرة، وإلا login_with_cookies"""
+        if cookies:
+            try:
+                await self.context.add_cookies(cookies)
+                self.log_message(f"✅ تم استرجاع الجلسة ({len(cookies)} cookie) بدون تسجيل دخول")
+                return True
+            except Exception as e:
+                self.log_message(f"⚠️ فشل استرجاع الـ cookies: {e}")
+        return await self.timed_login()
     
     def stop(self):
-        """إيقاف"""
+        """إيقاف (الحلقة تنتهي وتنظف الموارد بنفسها)"""
         self.is_running = False
-        self.cleanup()
+
+class TenantMonitor(AsyncStudyInEgyptMonitor):
+    """حساب (طالب) واحد في وضع multi-tenant: BrowserContext معزول على Chromium مشترك
+    
+    الـ cookies والتخصصات وشات التليجرام والحالة خاصة بالحساب، وملفاته في TENANTS_DIR/<id>.
+    المتصفح وكاش الـ selectors مشتركين من TenantRegistry.
+    """
+    
+    def __init__(self, tenant_id, registry, config):
+        targets = config.get("target_programs") or []
+        if isinstance(targets, str):
+            targets = [p for p in targets.split(",") if p.strip()]
+        # المحرك غير المتزامن بيدخل بالـ cookies بس - username/password مش بيتخزنوا
+        super().__init__(
+            username="",
+            password="",
+            target_programs=targets,
+            telegram_token=config.get("telegram_token") or os.environ.get("TELEGRAM_TOKEN"),
+            telegram_chat_id=config.get("telegram_chat_id"),
+            tenant_id=tenant_id,
+            data_dir=os.path.join(registry.data_dir, tenant_id),
+            selectors=registry.selectors
+        )
+        self.registry = registry
+        self.config = config
+        if config.get("username") or config.get("password"):
+            self.log_message("⚠️ username/password مش مستخدمين في وضع multi-tenant - الدخول بالـ cookies بس",
+                             logging.WARNING)
+        
+        urls = config.get("request_urls") or config.get("request_url") or []
+        self.request_urls = [u for u in re.split(r"[,\s]+", urls) if u] if isinstance(urls, str) else list(urls)
+        self.interval = int(config.get("interval") or os.environ.get("CHECK_INTERVAL", "30"))
+        
+        self.cookies_base64 = config.get("cookies_base64")
+        self.cookies_file = config.get("cookies_file") or self.cookies_file
+        self.profile_dir = None
+        # RSS للعملية كلها مشترك بين الحسابات - الـ registry هو اللي بيقيسه
+        self.recycle_rss_mb = 0
+    
+    async def init_browser(self):
+        """context جديد على المتصفح المشترك (بدل تشغيل Chromium خاص)"""
+        started_at = time.time()
+        try:
+            browser = await self.registry.ensure_browser()
+            self.playwright = self.registry.playwright
+            self.context = await browser.new_context(**BROWSER_CONTEXT_OPTIONS)
+            await self.setup_context()
+            
+            self.status["browser_startup_seconds"] = round(time.time() - started_at, 2)
+            self.log_message(f"✅ تم فتح context للحساب ({self.status['browser_startup_seconds']} ثانية)")
+            return True
+        
+        except Exception as e:
+            self.log_message(f"❌ خطأ في فتح الـ context: {e}")
+            return False
+    
+    async def close_browser(self):
+        """إغلاق الـ context بتاع الحساب بس - المتصفح المشترك يفضل شغال"""
+        self.closing_browser = True
+        try:
+            for close in (self.api and self.api.dispose, self.context and self.context.close):
+                try:
+                    if close:
+                        await close()
+                except Exception:
+                    pass
+        finally:
+            self.api = self.context = None
+            self.closing_browser = False
+
+class TenantRegistry:
+    """عدة حسابات في عملية واحدة: Chromium واحد و BrowserContext معزول لكل حساب
+    
+    كل حساب task على نفس الـ event loop. الإضافة والحذف من threads تانية (Flask)
+    عبر call() اللي بيبعت الـ coroutine للـ loop.
+    
+    القياس الأساسي: الذاكرة لكل حساب هنا مقابل حاوية كاملة (Python + driver + Chromium) لكل طالب.
+    
+    الحسابات اللي بتتضاف أو تتشال من /tenants بتتكتب في config_path (TENANTS_FILE)
+    عشان تفضل بعد إعادة التشغيل.
+    """
+    
+    def __init__(self, data_dir="tenants", sample_interval=30, config_path=None):
+        self.data_dir = data_dir
+        self.config_path = config_path
+        self.tenants = {}
+        self.tasks = {}
+        self.loop = None
+        self.playwright = None
+        self.browser = None
+        self.logger = setup_logging()
+        self.selectors = SelectorCache(
+            os.environ.get("SELECTOR_CACHE_FILE", "selector_cache.json"), log=self.logger.info
+        )
+        self.base_rss = None
+        self.resources = {}
+        self.sampler = ResourceSampler(
+            interval=sample_interval, size=int(os.environ.get("RESOURCE_SAMPLES", "240"))
+        )
+        self.browser_lock = None
+        self.browser_relaunches = 0
+        self.status_board = None
+        self.publish_interval = float(os.environ.get("STATUS_PUBLISH_INTERVAL", "5"))
+    
+    async def ensure_browser(self):
+        """المتصفح المشترك - لو وقع بيتشغل تاني مرة واحدة لكل الحسابات"""
+        async with self.browser_lock:
+            if not self.browser.is_connected():
+                self.browser_relaunches += 1
+                self.logger.warning(f"♻️ المتصفح المشترك وقع - إعادة تشغيل ({self.browser_relaunches})")
+                self.browser = await self.playwright.chromium.launch(headless=True, args=list(BROWSER_ARGS))
+            return self.browser
+    
+    async def run(self, configs):
+        """تشغيل المتصفح المشترك والحسابات، ثم قياس الاستهلاك دورياً"""
+        self.loop = asyncio.get_running_loop()
+        self.browser_lock = asyncio.Lock()
+        self.playwright = await async_playwright().start()
+        self.browser = await self.playwright.chromium.launch(headless=True, args=list(BROWSER_ARGS))
+        # خط الأساس: Python + driver + Chromium بدون أي context
+        self.base_rss = process_tree_rss()
+        
+        try:
+            for config in configs:
+                try:
+                    await self.add(config)
+                except (KeyError, ValueError) as e:
+                    self.logger.error(f"❌ حساب غير صالح في TENANTS_FILE: {e}")
+            
+            while True:
+                if self.sampler.due():
+                    await self.sample_resources()
+                self.publish_status()
+                await asyncio.sleep(min(self.publish_interval, self.sampler.seconds_until_due()))
+        finally:
+            for tenant_id in list(self.tenants):
+                await self.remove(tenant_id)
+            await self.browser.close()
+            await self.playwright.stop()
+    
+    async def add(self, config, persist=False):
+        """إضافة حساب وبدء مراقبته - ValueError لو الـ id مكرر أو ناقص بيانات
+        
+        persist: كتابة الحساب في config_path (الإضافة من /tenants)
+        """
+        tenant_id = str(config["id"])
+        if not re.fullmatch(r"[\w-]+", tenant_id):
+            raise ValueError(f"id غير صالح: {tenant_id!r} (حروف وأرقام و - و _ فقط)")
+        if tenant_id in self.tenants:
+            raise ValueError(f"الحساب {tenant_id} موجود بالفعل")
+        
+        monitor = TenantMonitor(tenant_id, self, config)
+        if not monitor.request_urls:
+            raise ValueError(f"الحساب {tenant_id}: request_urls مطلوب")
+        if not monitor.target_programs:
+            raise ValueError(f"الحساب {tenant_id}: target_programs مطلوب")
+        if monitor.read_cookies() is None:
+            # مفيش تسجيل دخول بكلمة المرور هنا: من غير cookies الحساب عمره ما هيشتغل
+            raise ValueError(f"الحساب {tenant_id}: cookies_base64 أو cookies_file مطلوب")
+        
+        if persist:
+            self.persist(tenant_id, config)
+        self.tenants[tenant_id] = monitor
+        self.tasks[tenant_id] = asyncio.ensure_future(
+            monitor.start_monitoring(request_url=monitor.request_urls, interval=monitor.interval)
+        )
+        return monitor
+    
+    async def remove(self, tenant_id, persist=False):
+        """إيقاف حساب وإغلاق الـ context بتاعه - KeyError لو مش موجود"""
+        monitor = self.tenants.pop(tenant_id)
+        task = self.tasks.pop(tenant_id)
+        if persist:
+            self.persist(tenant_id)
+        monitor.stop()
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+    
+    def persist(self, tenant_id, config=None):
+        """تحديث الحساب في config_path (config None = حذف) - الحسابات التانية في الملف زي ما هي"""
+        if not self.config_path:
+            return
+        try:
+            with open(self.config_path, encoding="utf-8") as f:
+                configs = json.load(f)
+        except (OSError, ValueError):
+            configs = []
+        
+        configs = [c for c in configs if str(c.get("id")) != tenant_id]
+        if config is not None:
+            configs.append(config)
+        try:
+            tmp_path = f"{self.config_path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(configs, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, self.config_path)
+        except OSError as e:
+            self.logger.warning(f"⚠️ خطأ في كتابة {self.config_path}: {e}")
+    
+    def call(self, coro, timeout=60):
+        """تشغيل coroutine على loop الـ registry من thread تاني وانتظار النتيجة"""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result(timeout)
+    
+    async def sample_resources(self):
+        """استهلاك كل حساب + الذاكرة الكلية مقابل تقدير حاوية لكل طالب"""
+        for monitor in list(self.tenants.values()):
+            try:
+                monitor.status["resources"] = await monitor.resource_usage()
+            except Exception as e:
+                monitor.log_message(f"⚠️ خطأ في قياس الاستهلاك: {e}")
+        
+        rss = process_tree_rss()
+        count = len(self.tenants)
+        self.sampler.sample()
+        if rss is None or self.base_rss is None or not count:
+            self.resources = {"tenants": count, "rss_mb": rss and round(rss / 1048576, 1)}
+            return
+        
+        per_tenant = max(0, rss - self.base_rss) / count
+        self.resources = {
+            "tenants": count,
+            "rss_mb": round(rss / 1048576, 1),
+            "base_rss_mb": round(self.base_rss / 1048576, 1),
+            "per_tenant_mb": round(per_tenant / 1048576, 1),
+            # حاوية لكل طالب = عملية كاملة بـ context واحد
+            "container_per_tenant_mb": round((self.base_rss + per_tenant) * count / 1048576, 1),
+        }
+    
+    def get_status(self):
+        return {
+            "tenants": {tenant_id: m.get_status() for tenant_id, m in list(self.tenants.items())},
+            "resources": self.resources,
+            "resources_summary": self.sampler.summary(),
+            "browser_relaunches": self.browser_relaunches,
+        }
+    
+    def publish_status(self):
+        if self.status_board:
+            self.status_board.publish(
+                self.get_status(),
+                Metrics.merge([self.render_metrics(), portal_limiter.metrics.render()]),
+                self.sampler.snapshot()
+            )
+    
+    def render_metrics(self):
+        """metrics كل الحسابات مع label tenant"""
+        return Metrics.merge(
+            m.metrics.render({"tenant": tenant_id}) for tenant_id, m in list(self.tenants.items())
+        )
+
+class StatusBoard:
+    """snapshot ثابت لـ /health و /status و /metrics بيتبدل كله مرة واحدة
+    
+    المراقب بيبني الـ snapshot في الـ thread بتاعه وينشره، والـ requests بتقرا آخر نسخة
+    منشورة بس - من غير ما تلمس self.status اللي حلقة الفحص بتعدّله. مع أكتر من
+    gunicorn worker الـ snapshot بيتكتب ذرياً في STATUS_FILE والـ workers التانية بتقراه منه.
+    """
+    
+    def __init__(self, path="status_snapshot.json"):
+        self.path = path
+        self.snapshot = None
+        self.file_snapshot = None
+        self.file_mtime = None
+    
+    def publish(self, status, metrics_text, resources=None):
+        # نسخة مستقلة عن الـ dicts الحية (json بيعمل deep copy ويحوّل أي قيمة غريبة لنص)
+        snapshot = {
+            "published_at": time.time(),
+            "pid": os.getpid(),
+            "status": json.loads(json.dumps(status, ensure_ascii=False, default=str)),
+            "metrics": metrics_text,
+            "resources": resources,
+        }
+        self.snapshot = snapshot
+        
+        if not self.path:
+            return
+        try:
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(snapshot, f, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            logging.getLogger("monitor").warning(f"⚠️ خطأ في كتابة {self.path}: {e}")
+    
+    def current(self):
+        """آخر snapshot: من الذاكرة لو المراقب في العملية دي، وإلا من الملف - None لو لسه مفيش"""
+        snapshot = self.snapshot
+        if snapshot and snapshot["pid"] == os.getpid():
+            return snapshot
+        if not self.path:
+            return None
+        
+        try:
+            mtime = os.path.getmtime(self.path)
+            if mtime != self.file_mtime:
+                with open(self.path, encoding="utf-8") as f:
+                    self.file_snapshot = json.load(f)
+                self.file_mtime = mtime
+        except (OSError, ValueError):
+            pass
+        return self.file_snapshot
+
+class EventBus:
+    """أحداث المراقب لحظة حدوثها لـ /events (Server-Sent Events)
+    
+    - كل event ليه id متزايد (ms من وقت النشر) ومحفوظ في history للـ resume بـ Last-Event-ID
+    - كل client ليه queue محدود: publish مابيستناش أبداً، والـ client اللي مش ملاحق
+      بيتفصل بعد ما ياخد اللي في الـ queue ويرجع يكمل من الـ history
+    - مع أكتر من gunicorn worker: العملية اللي بتنشر بتكتب في EVENTS_FILE والباقي بيتابعه
+    - كل stream ماسك thread من threads الـ worker، فعددهم محدود بـ max_clients
+      (subscribe بترجع None فوق الحد) عشان /status و /health يفضلوا يردوا
+    """
+    
+    def __init__(self, path="events.jsonl", history=500, client_buffer=100, max_clients=4):
+        self.path = path
+        self.history = deque(maxlen=history)
+        self.client_buffer = client_buffer
+        self.max_clients = max_clients
+        self.clients = set()
+        self.streams = 0
+        self.lock = threading.Lock()
+        self.last_id = 0
+        self.owner = False
+        self.written = 0
+        self.follower = None
+        self.file_lock = threading.Lock()
+        self.file_inode = None
+        self.file_offset = 0
+    
+    def publish(self, event_type, **data):
+        """نشر event (من thread المراقب) - مابيعملش block مهما كان عدد الـ clients"""
+        if not self.owner:
+            self.take_over()
+        with self.lock:
+            self.last_id = max(self.last_id + 1, int(time.time() * 1000))
+            event = {
+                "id": self.last_id,
+                "type": event_type,
+                "time": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                "data": data,
+            }
+            self.dispatch(event)
+            self.append(event)
+        return event
+    
+    def take_over(self):
+        """أول نشر في العملية دي: نكمّل على EVENTS_FILE الموجود بدل ما نمسحه
+        
+        الأحداث اللي في الملف (من مراقب قبل restart أو worker تاني) بتدخل الـ history
+        والـ ids بتكمل بعدها، فالـ clients يقدروا يعملوا resume. الملف بيتقص لآخر history بس.
+        """
+        if self.path:
+            self.read_file()
+        with self.lock:
+            if self.owner:
+                return
+            self.owner = True
+            self.written = len(self.history)
+            self.rewrite(self.history)
+    
+    def dispatch(self, event):
+        self.history.append(event)
+        for client in list(self.clients):
+            try:
+                client.put_nowait(event)
+            except queue.Full:
+                # client بطيء: نفصله بدل ما نستناه أو نكبّر الذاكرة
+                client.dropped = True
+                self.clients.discard(client)
+    
+    def append(self, event):
+        """سطر JSON في EVENTS_FILE - ولما يكبر بيتكتب تاني بآخر history بس"""
+        if not self.path:
+            return
+        try:
+            self.written += 1
+            if self.written > self.history.maxlen * 2:
+                self.written = len(self.history)
+                self.rewrite(self.history)
+            else:
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(event, ensure_ascii=False) + "\n")
+        except OSError as e:
+            logging.getLogger("monitor").warning(f"⚠️ خطأ في كتابة {self.path}: {e}")
+    
+    def rewrite(self, events):
+        if not self.path:
+            return
+        try:
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                for event in events:
+                    f.write(json.dumps(event, ensure_ascii=False) + "\n")
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logging.getLogger("monitor").warning(f"⚠️ خطأ في كتابة {self.path}: {e}")
+    
+    def subscribe(self, last_id=None):
+        """queue جديد للـ client، وفيه الأحداث اللي فاتته بعد last_id لو لسه في الـ history
+        
+        None لو عدد الـ streams المفتوحة وصل max_clients
+        """
+        if not self.owner and self.path:
+            # قبل التسجيل: الـ history تبقى محدثة عشان الـ client الجديد مايستلمش القديم كأنه جديد
+            self.read_file()
+            if self.follower is None:
+                self.follower = threading.Thread(target=self.follow, name="events-follower", daemon=True)
+                self.follower.start()
+        
+        client = queue.Queue(maxsize=self.client_buffer)
+        client.dropped = False
+        client.closed = False
+        with self.lock:
+            if self.max_clients and self.streams >= self.max_clients:
+                return None
+            self.streams += 1
+            if last_id is not None:
+                missed = [e for e in self.history if e["id"] > last_id]
+                for event in missed[-self.client_buffer:]:
+                    client.put_nowait(event)
+            self.clients.add(client)
+        return client
+    
+    def unsubscribe(self, client):
+        """تحرير مكان الـ client (مرة واحدة حتى لو اتنادت من الـ stream ومن إغلاق الرد)"""
+        with self.lock:
+            self.clients.discard(client)
+            if not client.closed:
+                client.closed = True
+                self.streams -= 1
+    
+    def follow(self, poll=0.5):
+        """متابعة EVENTS_FILE في worker مفيهوش المراقب (بيقف لو العملية دي بقت هي اللي بتنشر)"""
+        while not self.owner:
+            self.read_file()
+            time.sleep(poll)
+    
+    def read_file(self):
+        """قراءة الأسطر الجديدة من EVENTS_FILE وتوزيعها (ملف جديد بعد rewrite = من الأول)"""
+        with self.file_lock:
+            try:
+                stat = os.stat(self.path)
+                if stat.st_ino != self.file_inode or stat.st_size < self.file_offset:
+                    self.file_inode, self.file_offset = stat.st_ino, 0
+                if stat.st_size <= self.file_offset:
+                    return
+                
+                with open(self.path, "rb") as f:
+                    f.seek(self.file_offset)
+                    lines = f.readlines()
+                # سطر ناقص (لسه بيتكتب) نستناه المرة الجاية
+                if lines and not lines[-1].endswith(b"\n"):
+                    lines.pop()
+                self.file_offset += sum(len(line) for line in lines)
+                
+                for line in lines:
+                    event = json.loads(line)
+                    with self.lock:
+                        if event["id"] > self.last_id and not self.owner:
+                            self.last_id = event["id"]
+                            self.dispatch(event)
+            except (OSError, ValueError):
+                pass
+    
+    def stream(self, client, heartbeat=15):
+        """generator بصيغة text/event-stream لـ Flask لـ client راجع من subscribe"""
+        try:
+            yield "retry: 3000\n\n"
+            while True:
+                try:
+                    event = client.get(timeout=heartbeat)
+                except queue.Empty:
+                    if client.dropped:
+                        return
+                    # comment يمنع الـ proxies من قفل الاتصال الخامل
+                    yield ": keepalive\n\n"
+                    continue
+                yield (
+                    f"id: {event['id']}\n"
+                    f"event: {event['type']}\n"
+                    f"data: {json.dumps(event, ensure_ascii=False)}\n\n"
+                )
+                if client.dropped and client.empty():
+                    return
+        finally:
+            self.unsubscribe(client)
+
+class MonitorSupervisor:
+    """مراقب واحد بس لكل deployment مهما كان عدد الـ workers
+    
+    اللي ياخد MONITOR_LOCK_FILE (flock) هو اللي بيشغّل المراقب، والباقي بيحاول كل
+    retry ثانية - فلو الـ worker صاحب المراقب مات القفل بيتفك وworker تاني بيكمل.
+    لو المراقب وقف قبل ما يخلص بيتشغل تاني بعد restart_delay (بيتضاعف لحد max_delay).
+    """
+    
+    def __init__(self, lock_path, target, retry=30, restart_delay=60, max_delay=1800):
+        self.lock_path = lock_path
+        self.target = target
+        self.retry = retry
+        self.restart_delay = restart_delay
+        self.max_delay = max_delay
+        self.lock_file = None
+        self.thread = None
+    
+    def acquire(self):
+        try:
+            import fcntl
+        except ImportError:
+            # مافيش fcntl (Windows) - عملية واحدة بس متوقعة
+            return True
+        
+        lock_file = open(self.lock_path, "w")
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        
+        lock_file.write(str(os.getpid()))
+        lock_file.flush()
+        self.lock_file = lock_file
+        return True
+    
+    def start(self):
+        self.thread = threading.Thread(target=self.run, name="monitor-supervisor", daemon=True)
+        self.thread.start()
+        return self.thread
+    
+    def run(self):
+        while not self.acquire():
+            time.sleep(self.retry)
+        logger = setup_logging()
+        logger.info(f"👑 المراقب شغال في العملية {os.getpid()}")
+        
+        delay = self.restart_delay
+        while True:
+            started_at = time.time()
+            try:
+                restart = self.target()
+            except Exception as e:
+                logger.exception(f"❌ المراقب وقع: {e}")
+                restart = True
+            if not restart:
+                return
+            
+            # تشغيل طويل قبل الوقوع = مش restart loop، نرجع للتأخير الأساسي
+            if time.time() - started_at > self.max_delay:
+                delay = self.restart_delay
+            logger.warning(f"♻️ إعادة تشغيل المراقب بعد {delay} ثانية")
+            time.sleep(delay)
+            delay = min(delay * 2, self.max_delay)
 
 # المراقب العام
 monitor = None
+registry = None
+supervisor = None
+status_board = StatusBoard(os.environ.get("STATUS_FILE", "status_snapshot.json"))
+event_bus = EventBus(
+    os.environ.get("EVENTS_FILE", "events.jsonl"),
+    history=int(os.environ.get("EVENTS_HISTORY", "500")),
+    client_buffer=int(os.environ.get("EVENTS_CLIENT_BUFFER", "100")),
+    max_clients=int(os.environ.get("EVENTS_MAX_CLIENTS", "4"))
+)
 
 def start_monitor_thread():
     """بدء المراقبة في خيط منفصل"""
-    global monitor
+    global monitor, registry
     import os
+    logger = setup_logging()
+    
+    # TENANTS_FILE: ملف JSON بقائمة حسابات - كلهم على Chromium واحد (context لكل حساب)
+    tenants_file = os.environ.get("TENANTS_FILE")
+    if tenants_file:
+        with open(tenants_file, encoding="utf-8") as f:
+            configs = json.load(f)
+        registry = TenantRegistry(
+            data_dir=os.environ.get("TENANTS_DIR", "tenants"),
+            sample_interval=float(os.environ.get("RESOURCE_SAMPLE_INTERVAL", "30")),
+            config_path=tenants_file
+        )
+        registry.status_board = status_board
+        logger.info(f"👥 وضع multi-tenant: {len(configs)} حساب")
+        asyncio.run(registry.run(configs))
+        return
     
     USERNAME = os.environ.get("STUDY_USERNAME")
     PASSWORD = os.environ.get("STUDY_PASSWORD")
     REQUEST_URL = os.environ.get("REQUEST_URL")
+    # REQUEST_URLS (أو REQUEST_URL) ممكن تحتوي أكتر من رابط مفصولين بفاصلة أو مسافة
+    request_urls = [
+        u for u in re.split(r"[,\s]+", os.environ.get("REQUEST_URLS") or REQUEST_URL or "") if u
+    ]
     COOKIES_BASE64 = os.environ.get("COOKIES_BASE64")
     
     # التخصصات المطلوبة - يمكن تغييرها من متغيرات البيئة
@@ -1781,44 +5232,87 @@ def start_monitor_thread():
     telegram_chat_id = os.environ.get("TELEGRAM_CHAT_ID")
     
     # التحقق من المتغيرات المطلوبة
-    if not REQUEST_URL:
-        print("❌ خطأ: REQUEST_URL مطلوب!")
+    if not request_urls:
+        logger.error("❌ خطأ: REQUEST_URL مطلوب!")
         return
     
     # لو مافيش cookies، لازم يكون فيه username و password
     if not COOKIES_BASE64:
         if not os.path.exists("cookies.json"):
             if not all([USERNAME, PASSWORD]):
-                print("❌ خطأ: لازم COOKIES_BASE64 أو (USERNAME + PASSWORD)!")
-                print(f"USERNAME: {'✓' if USERNAME else '✗'}")
-                print(f"PASSWORD: {'✓' if PASSWORD else '✗'}")
-                print(f"REQUEST_URL: {'✓' if REQUEST_URL else '✗'}")
-                print(f"COOKIES_BASE64: ✗")
-                print(f"cookies.json: ✗")
+                logger.error("❌ خطأ: لازم COOKIES_BASE64 أو (USERNAME + PASSWORD)!")
+                logger.error(f"USERNAME: {'✓' if USERNAME else '✗'}")
+                logger.error(f"PASSWORD: {'✓' if PASSWORD else '✗'}")
+                logger.error(f"REQUEST_URL: {'✓' if request_urls else '✗'}")
+                logger.error(f"COOKIES_BASE64: ✗")
+                logger.error(f"cookies.json: ✗")
                 return
             else:
-                print("ℹ️ سيتم استخدام USERNAME + PASSWORD")
+                logger.info("ℹ️ سيتم استخدام USERNAME + PASSWORD")
         else:
-            print("ℹ️ سيتم استخدام cookies.json")
+            logger.info("ℹ️ سيتم استخدام cookies.json")
     else:
-        print("ℹ️ سيتم استخدام COOKIES_BASE64")
+        logger.info("ℹ️ سيتم استخدام COOKIES_BASE64")
     
     if not target_programs:
-        print("❌ خطأ: لا توجد تخصصات محددة!")
+        logger.error("❌ خطأ: لا توجد تخصصات محددة!")
         return
     
-    print(f"📚 التخصصات المستهدفة: {', '.join(target_programs)}")
+    logger.info(f"📚 التخصصات المستهدفة: {', '.join(target_programs)}")
+    
+    # POLL_ENGINE=async يشغّل النسخة المبنية على asyncio
+    if os.environ.get("POLL_ENGINE", "browser").lower() == "async":
+        monitor_class = AsyncStudyInEgyptMonitor
+    else:
+        monitor_class = StudyInEgyptMonitor
     
-    monitor = StudyInEgyptMonitor(
+    monitor = monitor_class(
         username=USERNAME or "",
         password=PASSWORD or "",
         target_programs=target_programs,
         telegram_token=telegram_token,
         telegram_chat_id=telegram_chat_id
     )
+    monitor.status_board = status_board
     
     interval = int(os.environ.get("CHECK_INTERVAL", "30"))
-    monitor.start_monitoring(request_url=REQUEST_URL, interval=interval)
+    if isinstance(monitor, AsyncStudyInEgyptMonitor):
+        asyncio.run(monitor.start_monitoring(request_url=request_urls, interval=interval))
+    else:
+        monitor.start_monitoring(request_url=request_urls, interval=interval)
+
+def run_monitor():
+    """تشغيل المراقب مرة (target الـ supervisor) - True لو وقف قبل ما يخلص ومحتاج يتشغل تاني
+    
+    وقوع حقيقي (المتصفح المشترك، ملف TENANTS_FILE، ...) بيوصل للـ supervisor كـ exception
+    وهو اللي بيقرر إعادة التشغيل.
+    """
+    start_monitor_thread()
+    if registry:
+        # registry.run رجعت من غير exception = اتقفلت بشكل طبيعي
+        return False
+    if monitor is None:
+        # إعدادات ناقصة - إعادة التشغيل مش هتفرق
+        return False
+    
+    monitor.publish_status()
+    return any(url not in monitor.completed_urls for url in monitor.request_urls)
+
+def create_app():
+    """app factory لـ gunicorn: gunicorn -w 2 'monitor:create_app()'
+    
+    كل worker بيستدعيها، و MonitorSupervisor بيضمن إن واحد بس فيهم بيشغّل المراقب.
+    """
+    global supervisor
+    if supervisor is None:
+        supervisor = MonitorSupervisor(
+            os.environ.get("MONITOR_LOCK_FILE", "monitor.lock"),
+            run_monitor,
+            retry=int(os.environ.get("MONITOR_LOCK_RETRY", "30")),
+            restart_delay=int(os.environ.get("MONITOR_RESTART_DELAY", "60")),
+        )
+        supervisor.start()
+    return app
 
 # Flask Routes
 @app.route('/')
@@ -1831,24 +5325,114 @@ def home():
 
 @app.route('/health')
 def health():
-    if monitor:
-        return jsonify({
-            "status": "healthy",
-            "monitor_status": monitor.get_status()
-        })
-    return jsonify({"status": "initializing"})
+    snapshot = status_board.current()
+    if not snapshot:
+        return jsonify({"status": "initializing"})
+    
+    age = time.time() - snapshot["published_at"]
+    body = {
+        "status": "healthy",
+        "snapshot_age_seconds": round(age, 1),
+        "monitor_pid": snapshot["pid"],
+        "monitor_status": snapshot["status"]
+    }
+    # المراقب بينشر كل STATUS_PUBLISH_INTERVAL ثانية - snapshot قديم = الحلقة واقفة
+    finished = snapshot["status"].get("state") == "success"
+    if not finished and age > float(os.environ.get("HEALTH_MAX_AGE", "900")):
+        body["status"] = "stale"
+        return jsonify(body), 503
+    return jsonify(body)
 
 @app.route('/status')
 def status():
-    if monitor:
-        return jsonify(monitor.get_status())
+    snapshot = status_board.current()
+    if snapshot:
+        return jsonify(snapshot["status"])
     return jsonify({"status": "not_started"})
 
-if __name__ == "__main__":
-    # بدء المراقبة
-    monitor_thread = threading.Thread(target=start_monitor_thread, daemon=True)
-    monitor_thread.start()
+@app.route('/metrics')
+def metrics():
+    snapshot = status_board.current()
+    body = snapshot["metrics"] if snapshot else ""
+    return Response(body, mimetype="text/plain; version=0.0.4")
+
+@app.route('/debug/resources')
+def debug_resources():
+    snapshot = status_board.current()
+    if not snapshot:
+        return jsonify({"status": "not_started"})
+    return jsonify({
+        "summary": snapshot["status"].get("resources_summary"),
+        "samples": snapshot["resources"] or []
+    })
+
+@app.route('/events')
+def events():
+    """SSE: الأحداث لحظة حدوثها - Last-Event-ID (أو ?last_event_id=) بيكمّل من اللي فات"""
+    last_id = request.headers.get("Last-Event-ID") or request.args.get("last_event_id")
+    try:
+        last_id = int(last_id) if last_id else None
+    except ValueError:
+        last_id = None
+    
+    client = event_bus.subscribe(last_id)
+    if client is None:
+        # كل thread ماسك stream مفتوح - نسيب الباقي لـ /status و /health
+        return jsonify({"error": "عدد متابعي /events وصل الحد (EVENTS_MAX_CLIENTS)"}), 503, {"Retry-After": "30"}
     
-    # بدء Flask
+    response = Response(
+        event_bus.stream(client),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+    # لو الاتصال اتقفل قبل ما الـ generator يبدأ
+    response.call_on_close(lambda: event_bus.unsubscribe(client))
+    return response
+
+def admin_authorized():
+    """إدارة الحسابات تتطلب ADMIN_TOKEN (Authorization: Bearer ...) - مقفولة لو مش متحدد"""
+    token = os.environ.get("ADMIN_TOKEN")
+    return bool(token) and request.headers.get("Authorization") == f"Bearer {token}"
+
+def tenants_unavailable():
+    """رد الخطأ لو الـ registry مش في العملية دي (وضع حساب واحد أو worker تاني)"""
+    snapshot = status_board.current()
+    if snapshot and "tenants" in snapshot["status"]:
+        return jsonify({"error": f"الحسابات بتتدار من العملية {snapshot['pid']}"}), 409
+    return jsonify({"error": "وضع multi-tenant غير مفعل (TENANTS_FILE)"}), 404
+
+@app.route('/tenants', methods=['GET', 'POST'])
+def tenants():
+    if request.method == 'GET':
+        snapshot = status_board.current()
+        if snapshot and "tenants" in snapshot["status"]:
+            return jsonify(snapshot["status"])
+        return tenants_unavailable()
+    
+    if not registry or not registry.loop:
+        return tenants_unavailable()
+    if not admin_authorized():
+        return jsonify({"error": "unauthorized"}), 401
+    config = request.get_json(silent=True) or {}
+    try:
+        tenant = registry.call(registry.add(config, persist=True))
+    except (KeyError, ValueError) as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify({"added": tenant.tenant_id}), 201
+
+@app.route('/tenants/<tenant_id>', methods=['DELETE'])
+def remove_tenant(tenant_id):
+    if not registry or not registry.loop:
+        return tenants_unavailable()
+    if not admin_authorized():
+        return jsonify({"error": "unauthorized"}), 401
+    try:
+        registry.call(registry.remove(tenant_id, persist=True))
+    except KeyError:
+        return jsonify({"error": f"الحساب {tenant_id} مش موجود"}), 404
+    return jsonify({"removed": tenant_id})
+
+if __name__ == "__main__":
+    # بدء المراقبة (نفس الـ supervisor اللي gunicorn بيستخدمه) ثم Flask للتطوير
     port = int(os.environ.get("PORT", 8080))
-    app.run(host='0.0.0.0', port=port)
+    create_app().run(host='0.0.0.0', port=port)
@@ -0,0 +1,15 @@
+import os
+import sys
+
+# بدون ملف لوج ولا رسائل على الشاشة أثناء الاختبارات (بعضها بيختبر مسارات الأخطاء)
+os.environ.setdefault("LOG_FILE", "")
+os.environ.setdefault("LOG_LEVEL", "CRITICAL")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def pytest_sessionfinish(session, exitstatus):
+    # كتابة اللوج المتأخر قبل ما pytest يقفل الـ stdout اللي الـ console handler ماسكه
+    import monitor
+    if monitor.log_writer is not None:
+        monitor.log_writer.close()
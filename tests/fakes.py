@@ -0,0 +1,124 @@
+"""صفحة Playwright (sync) وهمية فيها قائمتين antd: اللغات والتخصصات"""
+
+import types
+
+import monitor
+
+LANGUAGES = ["العربية", "English"]
+
+
+class FakeLocator:
+    def __init__(self, page, selector, index=None, text=None):
+        self.page = page
+        self.selector = selector
+        self.index = index
+        self.text = text
+
+    @property
+    def first(self):
+        return FakeLocator(self.page, self.selector, 0, self.text)
+
+    def nth(self, index):
+        return FakeLocator(self.page, self.selector, index, self.text)
+
+    def filter(self, has_text=None):
+        return FakeLocator(self.page, self.selector, self.index, has_text)
+
+    def options(self):
+        options = self.page.open_options()
+        if self.text is not None:
+            options = [o for o in options if self.text.search(o)]
+        return options
+
+    def count(self):
+        if self.selector == monitor.ANT_SELECT_CONTROLS:
+            return len(self.page.dropdowns)
+        if self.selector in (monitor.OPEN_DROPDOWN_OPTIONS, monitor.ANY_OPTION_SELECTOR):
+            return len(self.options())
+        return 0
+
+    def all(self):
+        return [self.nth(i) for i in range(self.count())]
+
+    def click(self, timeout=None):
+        if self.selector == monitor.ANT_SELECT_CONTROLS:
+            self.page.open = None if self.page.open == self.index else self.index
+        else:
+            self.page.selected.append(self.options()[self.index or 0])
+            self.page.open = None
+
+
+class FakePage:
+    def __init__(self, programs):
+        self.dropdowns = [LANGUAGES, list(programs)]
+        self.open = None
+        self.selected = []
+        self.clicked = []
+        self.url = "https://portal/request"
+        self.response = None
+        self.keyboard = types.SimpleNamespace(press=self.press)
+        self.context = types.SimpleNamespace(cookies=lambda *args: [])
+
+    def press(self, key):
+        if key == "Escape":
+            self.open = None
+
+    def open_options(self):
+        return self.dropdowns[self.open] if self.open is not None else []
+
+    def locator(self, selector):
+        return FakeLocator(self, selector)
+
+    def click(self, selector, **kwargs):
+        self.clicked.append(selector)
+
+    def evaluate(self, script, arg=None):
+        if script == monitor.PROBE_SELECTORS_SCRIPT:
+            return [1 if "استمرار" in selector else 0 for selector in arg]
+        if script == monitor.READ_OPTIONS_SCRIPT:
+            return [
+                {"index": i, "text": text, "value": text, "disabled": False}
+                for i, text in enumerate(self.open_options())
+            ]
+        if script == monitor.HARVEST_OPTIONS_SCRIPT:
+            options = [{"index": i, "text": text} for i, text in enumerate(self.open_options())]
+            return {"options": options, "steps": 1, "elapsed_ms": 1, "complete": True}
+        return None
+
+    def wait_for_event(self, event, predicate=None, timeout=None):
+        return self.response
+
+    def screenshot(self, **kwargs):
+        return b"image"
+
+    def goto(self, *args, **kwargs):
+        pass
+
+    def wait_for_selector(self, *args, **kwargs):
+        pass
+
+    def wait_for_function(self, *args, **kwargs):
+        pass
+
+    def wait_for_load_state(self, *args, **kwargs):
+        pass
+
+
+class FakeResponse:
+    """رد الـ API بالتخصصات (للـ XHR ولـ requests)"""
+
+    def __init__(self, programs, url="https://portal/api/programs"):
+        self.payload = {"data": [{"nameAr": name} for name in programs]}
+        self.url = url
+        self.status_code = 200
+        self.ok = True
+        self.headers = {"content-type": "application/json"}
+        self.request = types.SimpleNamespace(
+            method="GET", post_data=None, headers={"accept": "application/json"}, resource_type="xhr"
+        )
+
+    def json(self):
+        return self.payload
+
+    def raise_for_status(self):
+        pass
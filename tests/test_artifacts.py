@@ -0,0 +1,73 @@
+import os
+
+from monitor import ArtifactManager
+
+
+def make_manager(tmp_path, max_bytes, **kwargs):
+    manager = ArtifactManager(str(tmp_path / "artifacts"), log=lambda message: None, **kwargs)
+    manager.max_bytes = max_bytes
+    return manager
+
+
+def write_file(directory, name, size, mtime):
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, name)
+    with open(path, "wb") as f:
+        f.write(b"x" * size)
+    os.utime(path, (mtime, mtime))
+    return path
+
+
+def test_oldest_files_are_evicted_first(tmp_path):
+    manager = make_manager(tmp_path, max_bytes=250)
+    for n, mtime in enumerate([300, 100, 200]):
+        write_file(manager.directory, f"f{n}.jpg", 100, mtime)
+
+    manager.enforce_limit()
+    # f1 (الأقدم) اتحذف والباقي 200 بايت تحت الحد
+    assert sorted(os.listdir(manager.directory)) == ["f0.jpg", "f2.jpg"]
+    assert manager.usage() == 200
+
+
+def test_save_keeps_newest_file_within_limit(tmp_path):
+    manager = make_manager(tmp_path, max_bytes=150)
+    write_file(manager.directory, "old.jpg", 100, 100)
+
+    path = manager.save("success", b"y" * 100)
+    assert os.listdir(manager.directory) == [os.path.basename(path)]
+    assert path.endswith("_success.jpg")
+
+
+def test_under_limit_keeps_everything(tmp_path):
+    manager = make_manager(tmp_path, max_bytes=1000)
+    manager.save_text("page_content", "<html></html>")
+    manager.save("failure", b"z" * 10, extension="png")
+    assert len(os.listdir(manager.directory)) == 2
+
+
+def test_missing_directory_is_ignored(tmp_path):
+    manager = make_manager(tmp_path, max_bytes=10)
+    manager.enforce_limit()
+    assert manager.usage() == 0
+
+
+def test_routine_capture_only_on_state_change_and_every_n_checks(tmp_path):
+    manager = make_manager(tmp_path, max_bytes=1000, every_n_checks=3)
+    assert manager.should_capture("routine", state="closed", check_number=1)
+    # نفس الحالة
+    assert not manager.should_capture("routine", state="closed", check_number=5)
+    # حالة جديدة بس قبل 3 فحوصات
+    assert not manager.should_capture("routine", state="open", check_number=2)
+    assert manager.should_capture("routine", state="open", check_number=4)
+    # الأخطاء والنجاح دائماً
+    assert manager.should_capture("failure", state="open", check_number=4)
+    assert manager.should_capture("success", state="open", check_number=4)
+
+
+def test_jpeg_and_png_options(tmp_path):
+    jpeg = make_manager(tmp_path, max_bytes=1, quality=40)
+    assert jpeg.screenshot_options() == {"type": "jpeg", "quality": 40}
+    assert jpeg.extension == "jpg"
+    png = make_manager(tmp_path, max_bytes=1, image_type="png")
+    assert png.screenshot_options() == {"type": "png"}
+    assert png.extension == "png"
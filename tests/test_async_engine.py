@@ -0,0 +1,75 @@
+import asyncio
+import types
+
+import pytest
+
+import monitor
+from fakes import FakeResponse
+
+PROGRAMS = ["كلية الطب - جامعة القاهرة", "كلية الهندسة - جامعة القاهرة"]
+
+
+class Page:
+    """صفحة وهمية (المفتاح لازم يتعمله hash زي صفحة Playwright)"""
+
+
+class AsyncResponse(FakeResponse):
+    async def json(self):
+        return self.payload
+
+
+@pytest.fixture
+def async_monitor(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    m = monitor.AsyncStudyInEgyptMonitor("", "", ["طب"])
+    m.pages = {url: Page() for url in ("https://portal/a", "https://portal/b")}
+
+    async def use_page(request_url):
+        monitor.active_page.set((m, m.pages[request_url]))
+    monkeypatch.setattr(m, "use_page", use_page)
+    return m
+
+
+def test_programs_response_records_endpoint(async_monitor):
+    page = async_monitor.pages["https://portal/a"]
+    async_monitor.page_responses[page] = AsyncResponse(PROGRAMS)
+
+    async def scenario():
+        await async_monitor.use_page("https://portal/a")
+        return await async_monitor.wait_for_programs_response()
+
+    assert asyncio.run(scenario()) == PROGRAMS
+    # فحص الجلسة ومحرك HTTP محتاجين نفس الطلب
+    assert async_monitor.programs_api_url == "https://portal/api/programs"
+    assert async_monitor.programs_api_headers == {"accept": "application/json"}
+
+
+def test_concurrent_checks_keep_their_own_state_and_dropdown(async_monitor, monkeypatch):
+    m = async_monitor
+    m.check_slots = asyncio.Semaphore(2)
+    m.spacing_lock = asyncio.Lock()
+    m.check_spacing = 0
+
+    async def cookies():
+        return []
+    m.context = types.SimpleNamespace(cookies=cookies)
+
+    async def check_programs(request_url):
+        failed = request_url.endswith("a")
+        m.programs_select_index = 0 if failed else 1
+        await asyncio.sleep(0.01)
+        m.set_state("check_error" if failed else "success")
+        await asyncio.sleep(0.01)
+        # التاني ماغيّرش القائمة ولا الحالة بتاعة الـ task ده
+        assert m.programs_select_index == (0 if failed else 1)
+        return not failed
+
+    monkeypatch.setattr(m, "check_programs", check_programs)
+    m.status["state"] = "checking"
+
+    async def scenario():
+        return await asyncio.gather(m.timed_check("https://portal/a"), m.timed_check("https://portal/b"))
+
+    assert asyncio.run(scenario()) == ["check_error", "success"]
+    # الحالة المشتركة ماتغيرتش لحد ما الـ gather يجمعها
+    assert m.status["state"] == "checking"
@@ -0,0 +1,50 @@
+import asyncio
+import types
+
+import pytest
+
+import monitor
+
+
+@pytest.fixture
+def profile_monitor(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+
+    def make(cls=monitor.StudyInEgyptMonitor):
+        m = cls("", "", ["طب"])
+        m.profile_dir = str(tmp_path / "profile")
+        return m
+    return make
+
+
+def test_locked_profile_does_not_start_playwright(profile_monitor, monkeypatch):
+    holder = profile_monitor()
+    assert holder.acquire_profile_lock()
+    monkeypatch.setattr(monitor, "sync_playwright", lambda: pytest.fail("playwright started"))
+    monkeypatch.setattr(monitor, "async_playwright", lambda: pytest.fail("playwright started"))
+
+    assert not profile_monitor().init_browser()
+    assert not asyncio.run(profile_monitor(monitor.AsyncStudyInEgyptMonitor).init_browser())
+    holder.release_profile_lock()
+
+
+def test_launch_failure_stops_playwright_and_releases_lock(profile_monitor, monkeypatch):
+    stopped = []
+
+    def launch_persistent_context(*args, **kwargs):
+        raise RuntimeError("chromium missing")
+
+    playwright = types.SimpleNamespace(
+        chromium=types.SimpleNamespace(launch_persistent_context=launch_persistent_context),
+        stop=lambda: stopped.append(True),
+    )
+    monkeypatch.setattr(monitor, "sync_playwright", lambda: types.SimpleNamespace(start=lambda: playwright))
+
+    m = profile_monitor()
+    assert not m.init_browser()
+    assert stopped == [True]
+    assert m.playwright is None and m.profile_lock is None
+    # البروفايل اتحرر لعملية تانية
+    other = profile_monitor()
+    assert other.acquire_profile_lock()
+    other.release_profile_lock()
@@ -0,0 +1,116 @@
+import json
+
+import pytest
+
+import monitor
+from monitor import EventBus
+
+
+def drain(client):
+    events = []
+    while not client.empty():
+        events.append(client.get_nowait())
+    return events
+
+
+def test_resume_after_last_event_id(tmp_path):
+    bus = EventBus(str(tmp_path / "events.jsonl"))
+    first, second, third = (bus.publish("check", n=n) for n in range(3))
+    client = bus.subscribe(last_id=first["id"])
+    assert [e["id"] for e in drain(client)] == [second["id"], third["id"]]
+
+
+def test_subscriber_without_last_id_gets_only_new_events(tmp_path):
+    bus = EventBus(str(tmp_path / "events.jsonl"))
+    bus.publish("check")
+    client = bus.subscribe()
+    assert drain(client) == []
+    event = bus.publish("found")
+    assert drain(client) == [event]
+
+
+def test_new_owner_keeps_existing_file_and_continues_ids(tmp_path):
+    path = str(tmp_path / "events.jsonl")
+    old = EventBus(path)
+    old_events = [old.publish("check", n=n) for n in range(3)]
+
+    # مراقب جديد (restart أو worker تاني) على نفس الملف
+    bus = EventBus(path)
+    new_event = bus.publish("check", n=3)
+    assert new_event["id"] > old_events[-1]["id"]
+
+    with open(path, encoding="utf-8") as f:
+        ids = [json.loads(line)["id"] for line in f]
+    assert ids == [e["id"] for e in old_events] + [new_event["id"]]
+
+    client = bus.subscribe(last_id=old_events[0]["id"])
+    assert [e["id"] for e in drain(client)] == [e["id"] for e in old_events[1:]] + [new_event["id"]]
+
+
+def test_new_owner_trims_file_to_history(tmp_path):
+    path = str(tmp_path / "events.jsonl")
+    old = EventBus(path, history=100)
+    for n in range(20):
+        old.publish("check", n=n)
+
+    bus = EventBus(path, history=5)
+    bus.publish("check", n=20)
+    with open(path, encoding="utf-8") as f:
+        data = [json.loads(line)["data"]["n"] for line in f]
+    assert data == [15, 16, 17, 18, 19, 20]
+
+
+def test_follower_reads_owner_file(tmp_path):
+    path = str(tmp_path / "events.jsonl")
+    owner = EventBus(path)
+    follower = EventBus(path)
+    event = owner.publish("check")
+    follower.read_file()
+    assert list(follower.history) == [event]
+
+
+def test_subscriber_cap_and_release():
+    bus = EventBus("", max_clients=2)
+    first = bus.subscribe()
+    second = bus.subscribe()
+    assert first is not None and second is not None
+    assert bus.subscribe() is None
+
+    # unsubscribe من الـ stream ومن call_on_close بيحرر مكان واحد بس
+    bus.unsubscribe(first)
+    bus.unsubscribe(first)
+    assert bus.streams == 1
+    assert bus.subscribe() is not None
+    assert bus.subscribe() is None
+
+
+def test_dropped_client_keeps_its_slot_until_closed():
+    bus = EventBus("", client_buffer=1, max_clients=1)
+    client = bus.subscribe()
+    bus.publish("check")
+    bus.publish("check")
+    assert client.dropped
+    assert bus.subscribe() is None
+    bus.unsubscribe(client)
+    assert bus.subscribe() is not None
+
+
+@pytest.fixture
+def http(monkeypatch):
+    bus = EventBus("", max_clients=1)
+    monkeypatch.setattr(monitor, "event_bus", bus)
+    return bus, monitor.app.test_client()
+
+
+def test_events_route_returns_503_over_cap(http):
+    bus, client = http
+    held = bus.subscribe()
+    response = client.get("/events")
+    assert response.status_code == 503
+    assert response.headers["Retry-After"]
+
+    bus.unsubscribe(held)
+    response = client.get("/events")
+    assert response.status_code == 200
+    response.close()
+    assert bus.streams == 0
@@ -0,0 +1,91 @@
+import sys
+
+import bench_matcher
+from bench_matcher import make_programs, make_targets, naive_scores
+from monitor import ProgramMatcher, normalize_arabic, program_tokens
+
+
+def test_partial_word_target_matches_like_substring():
+    assert ProgramMatcher(['علوم الحاسب']).match(['كلية علوم الحاسبات والمعلومات']) == [
+        'كلية علوم الحاسبات والمعلومات'
+    ]
+
+
+def test_token_subset_ignores_order_and_articles():
+    matcher = ProgramMatcher(['طب القاهرة'])
+    assert matcher.match(['كلية الطب - جامعة القاهرة', 'كلية الهندسة - جامعة القاهرة']) == [
+        'كلية الطب - جامعة القاهرة'
+    ]
+
+
+def test_normalization_of_hamza_and_diacritics():
+    matcher = ProgramMatcher(['طب الاسكندرية'])
+    assert matcher.match(['كلية الطِّب - جامعة الإسكندرية'])
+
+
+def test_short_target_without_trigrams():
+    assert ProgramMatcher(['طب']).match(['كلية الطب']) == ['كلية الطب']
+
+
+def test_results_follow_target_order():
+    matcher = ProgramMatcher(['هندسة', 'طب'])
+    assert matcher.match(['كلية الطب', 'كلية الهندسة']) == ['كلية الهندسة', 'كلية الطب']
+
+
+def test_no_match():
+    assert ProgramMatcher(['صيدلة']).match(['كلية الطب', 'كلية الهندسة']) == []
+
+
+def test_index_is_only_a_prefilter():
+    """نفس درجات المرور على كل الـ targets، وكل اللي كانت المقارنة القديمة بتطابقه"""
+    normalize_arabic.cache_clear()
+    program_tokens.cache_clear()
+    programs = make_programs(2000)
+    targets = make_targets(30)
+    matcher = ProgramMatcher(targets)
+
+    brute_force = naive_scores(programs, targets)
+    assert {p: matcher.scores(p) for p in programs} == brute_force
+
+    baseline = bench_matcher.nested_loop(programs, targets)
+    assert {p for p in baseline if brute_force[p]} == set(baseline)
+    assert set(matcher.match(programs)) <= {p for p, scores in brute_force.items() if scores}
+
+
+CAIRO = ['كلية الطب البيطري - جامعة القاهرة', 'كلية طب الأسنان - جامعة القاهرة', 'كلية الطب - جامعة القاهرة']
+
+
+def test_superset_faculties_are_not_matched_while_the_faculty_exists():
+    assert ProgramMatcher(['طب القاهرة']).match(CAIRO) == ['كلية الطب - جامعة القاهرة']
+    assert ProgramMatcher(['طب عين شمس']).match([
+        'كلية طب الأسنان - جامعة عين شمس', 'كلية الطب - جامعة عين شمس'
+    ]) == ['كلية الطب - جامعة عين شمس']
+
+
+def test_contiguous_and_exact_beat_token_subset():
+    matcher = ProgramMatcher(['طب الأسنان'])
+    assert matcher.match(CAIRO) == ['كلية طب الأسنان - جامعة القاهرة']
+    assert ProgramMatcher.closeness('كلية الطب', 'كلية الطب') == (0, 0)
+    assert ProgramMatcher.closeness('كلية الطب - جامعة القاهرة', 'كلية الطب')[0] == 1
+    assert ProgramMatcher.closeness('كلية الطب - جامعة القاهرة', 'طب القاهرة')[0] == 2
+
+
+def test_each_target_keeps_its_own_closest_program():
+    matcher = ProgramMatcher(['طب القاهرة', 'بيطري القاهرة'])
+    assert matcher.match(CAIRO) == ['كلية الطب - جامعة القاهرة', 'كلية الطب البيطري - جامعة القاهرة']
+
+
+def test_best_option_skips_superset_and_disabled_options():
+    options = [
+        {"index": 0, "text": CAIRO[0], "disabled": False},
+        {"index": 1, "text": CAIRO[2], "disabled": True},
+        {"index": 2, "text": CAIRO[2] + " ", "disabled": False},
+    ]
+    assert ProgramMatcher.best_option(options, CAIRO[2])["index"] == 2
+    assert ProgramMatcher.best_option(options[:2], "صيدلة") is None
+
+
+def test_benchmark_runs(monkeypatch, capsys):
+    monkeypatch.setattr(sys, "argv", ["bench_matcher.py", "200", "5", "1"])
+    bench_matcher.main()
+    assert "ProgramMatcher" in capsys.readouterr().out
@@ -0,0 +1,110 @@
+import asyncio
+
+import pytest
+
+import monitor
+from monitor import RateLimiter, RateLimitExceeded, TokenBucket
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(monitor.time, "monotonic", fake)
+    return fake
+
+
+def test_bucket_refills_up_to_burst(clock):
+    bucket = TokenBucket(per_minute=60, burst=2)
+    bucket.tokens = -1
+    bucket.refill(clock.now + 2)
+    assert bucket.tokens == pytest.approx(1)
+    bucket.refill(clock.now + 100)
+    assert bucket.tokens == 2
+
+
+def test_bucket_delay_when_empty(clock):
+    bucket = TokenBucket(per_minute=30, burst=1)
+    assert bucket.delay() == 0
+    bucket.tokens = -1
+    assert bucket.delay() == pytest.approx(4)
+
+
+def test_burst_then_fifo_reservations(clock):
+    limiter = RateLimiter(total=(600, 100), classes={"login": (4, 2)})
+    assert limiter.reserve("login") == 0
+    assert limiter.reserve("login") == 0
+    # بعد الـ burst كل طلب بيستنى 15 ثانية زيادة عن اللي قبله
+    assert limiter.reserve("login") == pytest.approx(15)
+    assert limiter.reserve("login") == pytest.approx(30)
+
+
+def test_total_bucket_limits_every_class(clock):
+    limiter = RateLimiter(total=(60, 1), classes={"poll": (600, 10)})
+    assert limiter.reserve("poll") == 0
+    assert limiter.reserve("session") == pytest.approx(1)
+
+
+def test_reservation_past_deadline_is_rejected_without_taking_a_token(clock):
+    limiter = RateLimiter(total=(600, 100), classes={"login": (4, 1)}, deadline=10)
+    limiter.reserve("login")
+    with pytest.raises(RateLimitExceeded):
+        limiter.reserve("login")
+    assert limiter.classes["login"].tokens == pytest.approx(0)
+    assert 'portal_rate_limit_rejected_total{endpoint="login"} 1' in limiter.metrics.render()
+    # بعد دقيقة الـ token رجع
+    clock.now += 15
+    assert limiter.reserve("login") == 0
+
+
+def test_acquire_async_sleeps_for_its_turn(clock, monkeypatch):
+    slept = []
+
+    async def fake_sleep(seconds):
+        slept.append(seconds)
+
+    monkeypatch.setattr(monitor.asyncio, "sleep", fake_sleep)
+    limiter = RateLimiter(total=(600, 100), classes={"poll": (60, 1)})
+    asyncio.run(limiter.acquire_async("poll"))
+    asyncio.run(limiter.acquire_async("poll"))
+    assert slept == [pytest.approx(1)]
+
+
+def test_from_env_overrides_classes(monkeypatch):
+    monkeypatch.setenv("RATE_LIMITS", "login=2:1,custom=10")
+    monkeypatch.setenv("RATE_LIMIT_TOTAL", "120:20")
+    limiter = RateLimiter.from_env()
+    assert limiter.classes["login"].burst == 1
+    assert limiter.classes["custom"].rate == pytest.approx(10 / 60)
+    assert limiter.classes["poll"].burst == RateLimiter.DEFAULT_CLASSES["poll"][1]
+    assert limiter.total.burst == 20
+
+
+def test_timed_login_takes_one_token_per_attempt(tmp_path, monkeypatch, clock):
+    monkeypatch.chdir(tmp_path)
+    limiter = RateLimiter(total=(600, 100), classes={"login": (4, 1)}, deadline=0)
+    monkeypatch.setattr(monitor, "portal_limiter", limiter)
+    m = monitor.StudyInEgyptMonitor("user", "pass", ["طب"])
+    attempts = []
+
+    def login_with_cookies():
+        # الرجوع لـ login() العادي جوه نفس المحاولة مش بياخد token تاني
+        attempts.append("cookies")
+        return m.login()
+
+    monkeypatch.setattr(m, "login_with_cookies", login_with_cookies)
+    monkeypatch.setattr(m, "login", lambda: attempts.append("password") or True)
+
+    assert m.timed_login()
+    assert attempts == ["cookies", "password"]
+    # الـ bucket فاضي والـ deadline صفر: المحاولة التانية بتتأجل من غير exception
+    assert not m.timed_login()
+    assert m.status["state"] == "login_failed"
+    assert attempts == ["cookies", "password"]
@@ -0,0 +1,65 @@
+from datetime import datetime, timezone
+
+from monitor import PollScheduler
+
+
+def at_utc(hour, minute=0):
+    return datetime(2026, 7, 1, hour, minute, tzinfo=timezone.utc)
+
+
+def test_parse_windows_in_minutes():
+    assert PollScheduler.parse_windows("08:00-10:30, 20:00-02:00") == [(480, 630), (1200, 120)]
+    assert PollScheduler.parse_windows("") == []
+
+
+def test_overnight_window_wraps_midnight():
+    windows = PollScheduler.parse_windows("22:00-02:00")
+    assert PollScheduler.in_windows(windows, datetime(2026, 7, 1, 23, 30))
+    assert PollScheduler.in_windows(windows, datetime(2026, 7, 1, 1, 59))
+    assert not PollScheduler.in_windows(windows, datetime(2026, 7, 1, 2, 0))
+    assert not PollScheduler.in_windows(windows, datetime(2026, 7, 1, 12, 0))
+
+
+def test_windows_follow_configured_timezone_not_server_time():
+    scheduler = PollScheduler(interval=30, hot_windows="09:00-10:00", hot_interval=15,
+                              min_interval=5, timezone="Africa/Cairo")
+    # 06:30 UTC = 09:30 القاهرة (صيفي +3)
+    assert scheduler.next_delay(now=at_utc(6, 30)) == 15
+    assert scheduler.last_decision["mode"] == "hot"
+    # 09:30 UTC = 12:30 القاهرة
+    assert scheduler.next_delay(now=at_utc(9, 30)) == 30
+    assert scheduler.last_decision["mode"] == "normal"
+
+
+def test_quiet_hours_and_hot_takes_priority():
+    scheduler = PollScheduler(interval=30, hot_windows="01:00-02:00", hot_interval=10,
+                              quiet_hours="00:00-06:00", quiet_interval=300,
+                              min_interval=5, timezone="UTC")
+    assert scheduler.next_delay(now=at_utc(3)) == 300
+    assert scheduler.next_delay(now=at_utc(1, 15)) == 10
+
+
+def test_check_duration_is_subtracted_and_min_interval_enforced():
+    scheduler = PollScheduler(interval=30, min_interval=20, hot_windows="00:00-23:59",
+                              hot_interval=5, timezone="UTC")
+    assert scheduler.next_delay(check_seconds=8, now=at_utc(12)) == 12
+    assert scheduler.next_delay(check_seconds=40, now=at_utc(12)) == 0
+
+
+def test_backoff_grows_is_capped_and_resets():
+    scheduler = PollScheduler(interval=30, max_backoff=200, jitter=0, timezone="UTC")
+    assert scheduler.next_delay(failed=True, now=at_utc(12)) == 60
+    assert scheduler.next_delay(failed=True, now=at_utc(12)) == 120
+    assert scheduler.next_delay(failed=True, now=at_utc(12)) == 200
+    assert scheduler.last_decision["mode"] == "backoff_normal"
+    assert scheduler.last_decision["consecutive_failures"] == 3
+    assert scheduler.next_delay(now=at_utc(12)) == 30
+    assert scheduler.failures == 0
+
+
+def test_from_env_reads_schedule_timezone(monkeypatch):
+    monkeypatch.setenv("SCHEDULE_TZ", "UTC")
+    monkeypatch.setenv("QUIET_HOURS", "00:00-06:00")
+    scheduler = PollScheduler.from_env()
+    assert str(scheduler.tz) == "UTC"
+    assert scheduler.quiet_hours == [(0, 360)]
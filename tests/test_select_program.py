@@ -0,0 +1,119 @@
+import os
+import types
+
+import pytest
+
+import monitor
+from fakes import FakePage, FakeResponse
+
+PROGRAMS = ["كلية الطب - جامعة القاهرة", "كلية علوم الحاسبات والمعلومات - جامعة حلوان"]
+URL = "https://portal/request"
+
+
+@pytest.fixture
+def monitor_factory(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(monitor, "portal_limiter", monitor.RateLimiter(
+        total=(6000, 100), classes={"login": (6000, 100), "poll": (6000, 100), "session": (6000, 100)}
+    ))
+
+    def make(targets, page):
+        m = monitor.StudyInEgyptMonitor("user", "pass", targets)
+        m.page = page
+        m.block_resources = False
+        m.request_urls = [URL]
+        return m
+    return make
+
+
+def test_xhr_source_opens_antd_dropdown_to_select(monitor_factory):
+    page = FakePage(PROGRAMS)
+    page.response = FakeResponse(PROGRAMS)
+    m = monitor_factory(["علوم الحاسب"], page)
+
+    assert m.check_programs(URL)
+    assert m.status["programs_source"] == "response"
+    assert page.selected == [PROGRAMS[1]]
+    assert m.status["state"] == "success"
+    # القائمة الأولى (اللغات) اتقفلت والتانية هي اللي اتعلّمت
+    assert m.programs_select_index == 1
+
+
+def test_routine_screenshot_is_taken_after_matching(monitor_factory):
+    page = FakePage(PROGRAMS)
+    page.response = FakeResponse(PROGRAMS)
+    m = monitor_factory(["علوم الحاسب"], page)
+    m.check_programs(URL)
+    assert not [name for name in os.listdir("artifacts") if "request_page" in name]
+
+    other = FakePage(PROGRAMS)
+    other.response = FakeResponse(PROGRAMS)
+    idle = monitor_factory(["صيدلة"], other)
+    assert not idle.check_programs(URL)
+    assert [name for name in os.listdir("artifacts") if "request_page" in name]
+
+
+def test_http_engine_opens_form_and_antd_dropdown(monitor_factory):
+    page = FakePage(PROGRAMS)
+    m = monitor_factory(["طب القاهرة"], page)
+    m.poll_engine = "http"
+    m.programs_api_url = "https://portal/api/programs"
+    requests_sent = []
+    m.http_session = types.SimpleNamespace(
+        request=lambda *args, **kwargs: requests_sent.append(args) or FakeResponse(PROGRAMS)
+    )
+
+    assert m.check_programs_http(URL)
+    assert requests_sent
+    assert m.status["programs_source"] == "http"
+    assert page.selected == [PROGRAMS[0]]
+
+
+def test_fast_path_reuses_dropdown_left_open_by_dom_extraction(monitor_factory):
+    page = FakePage(PROGRAMS)
+    m = monitor_factory(["طب القاهرة"], page)
+    m.programs_source = "dom"
+
+    assert m.check_programs(URL)
+    assert m.status["programs_source"] == "dom"
+    assert page.selected == [PROGRAMS[0]]
+
+
+def test_missing_api_response_is_waited_for_only_once(monitor_factory, monkeypatch):
+    page = FakePage(PROGRAMS)
+    waits = []
+
+    def wait_for_event(event, predicate=None, timeout=None):
+        waits.append(timeout)
+        raise monitor.PlaywrightTimeout("no response")
+
+    monkeypatch.setattr(page, "wait_for_event", wait_for_event)
+    m = monitor_factory(["صيدلة"], page)
+
+    # الفحص الأول بيستنى المهلة وبعدها الـ DOM، والجاي يروح للـ DOM على طول
+    for _ in range(3):
+        assert not m.check_programs(URL)
+        assert m.status["programs_source"] == "dom"
+    assert len(waits) == 1
+
+    # لو الرد اتلقط أثناء تحميل الصفحة يرجع يتستخدم
+    monkeypatch.setattr(m, "open_request_form", lambda url: setattr(m, "programs_response", FakeResponse(PROGRAMS)))
+    m.check_programs(URL)
+    assert m.status["programs_source"] == "response"
+    assert not m.programs_response_missed
+
+
+def test_failed_continue_is_retried_on_next_check(monitor_factory, monkeypatch):
+    page = FakePage(PROGRAMS)
+    page.response = FakeResponse(PROGRAMS)
+    m = monitor_factory(["طب القاهرة"], page)
+    results = [False, True]
+    monkeypatch.setattr(m, "click_continue_button", lambda detected_at=None: results.pop(0))
+
+    assert not m.check_programs(URL)
+    # ماتسجلش كـ found فالفحص الجاي (نفس القائمة) يجربه تاني
+    assert m.snapshots.found_for(URL) == set()
+    assert m.check_programs(URL)
+    assert page.selected == [PROGRAMS[0], PROGRAMS[0]]
+    assert m.snapshots.found_for(URL) == {PROGRAMS[0]}
+    assert not m.retry_targets[URL]
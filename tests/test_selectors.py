@@ -0,0 +1,56 @@
+import json
+
+from monitor import CONTINUE_BUTTON_SELECTORS, SelectorCache
+
+
+def make_cache(tmp_path, save_interval=300):
+    cache = SelectorCache(str(tmp_path / "selector_cache.json"), log=lambda message: None)
+    cache.save_interval = save_interval
+    return cache
+
+
+def saved(cache):
+    with open(cache.path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def test_generic_continue_selectors_stay_after_specific_ones(tmp_path):
+    cache = make_cache(tmp_path)
+    for _ in range(5):
+        cache.hit("continue_button", 'button[type="submit"]')
+    cache.miss("continue_button", ['button:has-text("إستمرار")'])
+
+    order = cache.order("continue_button", CONTINUE_BUTTON_SELECTORS)
+    assert order[-2:] == ['button[type="submit"]', 'button.btn-primary']
+    # اللي ماكانش موجود بينزل بين الخاصة بس
+    assert order[:5] == CONTINUE_BUTTON_SELECTORS[1:5] + CONTINUE_BUTTON_SELECTORS[:1]
+
+
+def test_learned_order_among_specific_selectors(tmp_path):
+    cache = make_cache(tmp_path)
+    cache.hit("continue_button", 'button:has-text("Continue")')
+    assert cache.order("continue_button", CONTINUE_BUTTON_SELECTORS)[0] == 'button:has-text("Continue")'
+
+
+def test_file_is_written_only_when_last_selector_changes(tmp_path):
+    cache = make_cache(tmp_path)
+    cache.hit("continue_button", "a")
+    assert saved(cache)["continue_button"]["selectors"]["a"] == [1, 0]
+
+    # نفس الـ selector: العدادات في الذاكرة بس لحد الـ flush
+    cache.hit("continue_button", "a")
+    cache.hit("continue_button", "a")
+    assert saved(cache)["continue_button"]["selectors"]["a"] == [1, 0]
+    cache.flush()
+    assert saved(cache)["continue_button"]["selectors"]["a"] == [3, 0]
+
+    cache.hit("continue_button", "b")
+    assert saved(cache)["continue_button"]["last"] == "b"
+
+
+def test_counts_are_saved_after_interval(tmp_path):
+    cache = make_cache(tmp_path, save_interval=0)
+    cache.hit("add_wishes", "a")
+    cache.hit("add_wishes", "a")
+    assert saved(cache)["add_wishes"]["selectors"]["a"] == [2, 0]
+    assert not cache.dirty
@@ -0,0 +1,101 @@
+import time
+import types
+
+import pytest
+
+import monitor
+
+
+class FakeContext:
+    def __init__(self, cookies):
+        self.jar = list(cookies)
+
+    def cookies(self, *args):
+        return list(self.jar)
+
+    def clear_cookies(self):
+        self.jar = []
+
+    def add_cookies(self, cookies):
+        self.jar.extend(cookies)
+
+
+def session_cookie(expires, value="v"):
+    return {"name": "session_token", "value": value, "domain": "portal", "path": "/", "expires": expires}
+
+
+@pytest.fixture
+def session_monitor(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(monitor, "portal_limiter", monitor.RateLimiter(
+        total=(6000, 100), classes={"login": (6000, 100), "session": (6000, 100)}
+    ))
+
+    def make(expires, username="user"):
+        m = monitor.StudyInEgyptMonitor(username, "pass" if username else "", ["طب"])
+        m.page = types.SimpleNamespace(context=FakeContext([session_cookie(expires, "old")]))
+        m.alerts = []
+        m.send_telegram_alert = m.alerts.append
+        return m
+    return make
+
+
+def test_refresh_logs_in_with_credentials_instead_of_stored_cookies(session_monitor, monkeypatch):
+    old_expiry = time.time() + 60
+    m = session_monitor(old_expiry)
+    monkeypatch.setattr(m, "login_with_cookies", lambda: pytest.fail("stored cookies reloaded"))
+
+    def login():
+        # لازم يبدأ من context فاضي عشان صفحة login ماتحوّلش للـ dashboard
+        assert m.page.context.jar == []
+        m.page.context.add_cookies([session_cookie(old_expiry + 3600, "new")])
+        return True
+
+    monkeypatch.setattr(m, "login", login)
+    assert m.refresh_session()
+    assert [c["value"] for c in m.page.context.jar] == ["new"]
+    assert m.session_refresh_retry_at == 0
+    assert m.alerts == []
+
+
+def test_failed_login_restores_the_current_session(session_monitor, monkeypatch):
+    m = session_monitor(time.time() + 60)
+    m.status["state"] = "monitoring"
+
+    def login():
+        m.status["state"] = "login_failed"
+        return False
+
+    monkeypatch.setattr(m, "login", login)
+    assert not m.refresh_session()
+    assert [c["value"] for c in m.page.context.jar] == ["old"]
+    assert m.status["state"] == "monitoring"
+    assert m.session_refresh_retry_at > time.time()
+    assert len(m.alerts) == 1
+
+
+def test_unchanged_expiry_counts_as_failure_and_is_retried(session_monitor, monkeypatch):
+    expiry = time.time() + 60
+    m = session_monitor(expiry)
+
+    def login():
+        m.page.context.add_cookies([session_cookie(expiry, "same")])
+        return True
+
+    monkeypatch.setattr(m, "login", login)
+    assert not m.refresh_session()
+    # المحاولة الجاية بعد SESSION_PROBE_INTERVAL مش أبداً
+    assert not m.session_state(expiry, next_delay=30)
+    m.session_refresh_retry_at = time.time() - 1
+    assert m.session_state(expiry, next_delay=30)
+
+    # فشل تاني في نفس السلسلة: من غير تنبيه جديد
+    assert not m.refresh_session()
+    assert len(m.alerts) == 1
+
+
+def test_refresh_without_credentials_does_not_touch_cookies(session_monitor, monkeypatch):
+    m = session_monitor(time.time() + 60, username=None)
+    monkeypatch.setattr(m, "login", lambda: pytest.fail("no credentials"))
+    assert not m.refresh_session()
+    assert [c["value"] for c in m.page.context.jar] == ["old"]
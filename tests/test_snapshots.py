@@ -0,0 +1,57 @@
+import json
+
+from monitor import ProgramSnapshotStore
+
+
+def make_store(tmp_path):
+    return ProgramSnapshotStore(str(tmp_path / "snapshot.json"), log=lambda message: None)
+
+
+def test_first_update_returns_all_programs_in_page_order(tmp_path):
+    store = make_store(tmp_path)
+    delta = store.update("url", ["طب القاهرة", "هندسة", "طب القاهرة"])
+    assert delta["changed"] and delta["first"]
+    assert delta["added"] == ["طب القاهرة", "هندسة"]
+
+
+def test_unchanged_list_is_skipped(tmp_path):
+    store = make_store(tmp_path)
+    store.update("url", ["أ", "ب"])
+    delta = store.update("url", ["أ", "ب"])
+    assert not delta["changed"]
+    assert not delta["first"]
+
+
+def test_reorder_changes_digest_without_additions(tmp_path):
+    store = make_store(tmp_path)
+    store.update("url", ["أ", "ب"])
+    delta = store.update("url", ["ب", "أ"])
+    assert delta["changed"] and delta["reordered"]
+    assert delta["added"] == [] and delta["removed"] == []
+
+
+def test_added_and_removed(tmp_path):
+    store = make_store(tmp_path)
+    store.update("url", ["أ", "ب"])
+    delta = store.update("url", ["ب", "ج"])
+    assert delta["added"] == ["ج"]
+    assert delta["removed"] == ["أ"]
+    assert not delta["reordered"]
+
+
+def test_snapshot_survives_restart(tmp_path):
+    store = make_store(tmp_path)
+    store.update("url", ["أ", "ب"])
+    store.mark_found("url", "أ")
+
+    restarted = make_store(tmp_path)
+    delta = restarted.update("url", ["أ", "ب"])
+    assert delta["first"] and not delta["changed"]
+    assert restarted.found_for("url") == {"أ"}
+
+
+def test_legacy_found_list_applies_to_every_url(tmp_path):
+    path = tmp_path / "snapshot.json"
+    path.write_text(json.dumps({"snapshots": {}, "found": ["أ"]}), encoding="utf-8")
+    store = ProgramSnapshotStore(str(path), log=lambda message: None)
+    assert store.found_for("any-url") == {"أ"}
@@ -0,0 +1,56 @@
+import json
+
+import pytest
+
+import monitor
+
+
+@pytest.fixture
+def tenants_env(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    tenants_file = tmp_path / "tenants.json"
+    tenants_file.write_text(json.dumps([]), encoding="utf-8")
+    monkeypatch.setenv("TENANTS_FILE", str(tenants_file))
+    monkeypatch.setenv("TENANTS_DIR", str(tmp_path / "tenants"))
+    monkeypatch.setattr(monitor, "registry", None)
+    monkeypatch.setattr(monitor, "monitor", None)
+
+
+def test_clean_tenant_shutdown_does_not_restart(tenants_env, monkeypatch):
+    async def run(self, configs):
+        return None
+
+    monkeypatch.setattr(monitor.TenantRegistry, "run", run)
+    assert monitor.run_monitor() is False
+
+
+def test_tenant_crash_restarts_with_backoff(tenants_env, monkeypatch):
+    calls = []
+
+    async def run(self, configs):
+        calls.append(configs)
+        if len(calls) < 3:
+            raise RuntimeError("browser closed")
+
+    sleeps = []
+    monkeypatch.setattr(monitor.TenantRegistry, "run", run)
+    monkeypatch.setattr(monitor.time, "sleep", sleeps.append)
+
+    supervisor = monitor.MonitorSupervisor(
+        str(monitor.os.path.join(monitor.os.getcwd(), "monitor.lock")), monitor.run_monitor,
+        restart_delay=5, max_delay=60
+    )
+    supervisor.run()
+    supervisor.lock_file.close()
+
+    assert len(calls) == 3
+    assert sleeps == [5, 10]
+
+
+def test_missing_settings_do_not_restart(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    for name in ("TENANTS_FILE", "REQUEST_URL", "REQUEST_URLS"):
+        monkeypatch.delenv(name, raising=False)
+    monkeypatch.setattr(monitor, "registry", None)
+    monkeypatch.setattr(monitor, "monitor", None)
+    assert monitor.run_monitor() is False
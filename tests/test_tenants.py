@@ -0,0 +1,168 @@
+import asyncio
+import base64
+import json
+import threading
+
+import pytest
+
+import monitor
+from monitor import TenantMonitor, TenantRegistry
+
+COOKIES = base64.b64encode(json.dumps([
+    {"name": "session_token", "value": "v", "domain": "portal", "path": "/"}
+]).encode()).decode()
+VALID = {
+    "id": "student-1",
+    "request_urls": "https://portal/a, https://portal/b",
+    "target_programs": "طب,هندسة",
+    "cookies_base64": COOKIES,
+}
+
+
+@pytest.fixture
+def registry(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    started = []
+
+    async def start_monitoring(self, request_url=None, interval=30):
+        # بدل المتصفح: task بيستنى لحد ما يتلغي
+        started.append((self.tenant_id, request_url, interval))
+        await asyncio.Event().wait()
+
+    monkeypatch.setattr(TenantMonitor, "start_monitoring", start_monitoring)
+    registry = TenantRegistry(data_dir=str(tmp_path / "tenants"))
+    registry.started = started
+    return registry
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_add_parses_config_and_starts_task(registry):
+    async def scenario():
+        tenant = await registry.add(dict(VALID, interval=45))
+        await asyncio.sleep(0)
+        assert tenant.request_urls == ["https://portal/a", "https://portal/b"]
+        assert tenant.target_programs == ["طب", "هندسة"]
+        assert tenant.data_dir.endswith("student-1")
+        # ملفات الحساب في مجلده والـ selectors مشتركة من الـ registry
+        assert tenant.snapshots.path.startswith(tenant.data_dir)
+        assert tenant.artifacts.directory.startswith(tenant.data_dir)
+        assert tenant.selectors is registry.selectors
+        assert tenant.sampler is None
+        assert registry.started == [("student-1", tenant.request_urls, 45)]
+        await registry.remove("student-1")
+        assert not registry.tenants and not registry.tasks
+
+    run(scenario())
+
+
+@pytest.mark.parametrize("tenant_id", ["../etc", "a b", "", "x/y"])
+def test_invalid_id_is_rejected(registry, tenant_id):
+    with pytest.raises(ValueError):
+        run(registry.add(dict(VALID, id=tenant_id)))
+    assert not registry.tenants
+
+
+def test_missing_id_raises_key_error(registry):
+    config = dict(VALID)
+    del config["id"]
+    with pytest.raises(KeyError):
+        run(registry.add(config))
+
+
+def test_duplicate_id_is_rejected(registry):
+    async def scenario():
+        await registry.add(VALID)
+        with pytest.raises(ValueError, match="موجود"):
+            await registry.add(VALID)
+        assert len(registry.tenants) == 1
+        await registry.remove("student-1")
+
+    run(scenario())
+
+
+@pytest.mark.parametrize("field", ["request_urls", "target_programs"])
+def test_missing_urls_or_targets_are_rejected(registry, field):
+    config = dict(VALID)
+    config[field] = ""
+    with pytest.raises(ValueError, match=field):
+        run(registry.add(config))
+    assert not registry.tasks
+
+
+def test_tenant_without_cookies_is_rejected(registry, monkeypatch):
+    monkeypatch.setenv("COOKIES_BASE64", COOKIES)
+    config = dict(VALID, username="student", password="secret")
+    del config["cookies_base64"]
+    # الـ COOKIES_BASE64 العامة مش بتاعة الحساب، وكلمة المرور مش بتعوّض الـ cookies
+    with pytest.raises(ValueError, match="cookies"):
+        run(registry.add(config))
+    assert not registry.tenants
+
+
+def test_credentials_are_not_kept(registry):
+    async def scenario():
+        tenant = await registry.add(dict(VALID, username="student", password="secret"))
+        assert tenant.username == "" and tenant.password == ""
+        await registry.remove("student-1")
+
+    run(scenario())
+
+
+def test_remove_unknown_tenant_raises_key_error(registry):
+    with pytest.raises(KeyError):
+        run(registry.remove("nobody"))
+
+
+@pytest.fixture
+def admin_client(registry, monkeypatch, tmp_path):
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    registry.loop = loop
+    registry.config_path = str(tmp_path / "tenants.json")
+    with open(registry.config_path, "w", encoding="utf-8") as f:
+        json.dump([{"id": "from-file"}], f)
+    monkeypatch.setattr(monitor, "registry", registry)
+    monkeypatch.setenv("ADMIN_TOKEN", "secret")
+    yield monitor.app.test_client()
+    for tenant_id in list(registry.tenants):
+        registry.call(registry.remove(tenant_id))
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join(5)
+    loop.close()
+
+
+def test_admin_routes_validate_and_authorize(admin_client):
+    auth = {"Authorization": "Bearer secret"}
+    assert admin_client.post("/tenants", json=VALID).status_code == 401
+
+    response = admin_client.post("/tenants", json=dict(VALID, id="a b"), headers=auth)
+    assert response.status_code == 400
+
+    response = admin_client.post("/tenants", json=VALID, headers=auth)
+    assert response.status_code == 201
+    assert response.get_json() == {"added": "student-1"}
+    assert admin_client.post("/tenants", json=VALID, headers=auth).status_code == 400
+
+    assert admin_client.delete("/tenants/student-1", headers=auth).status_code == 200
+    assert admin_client.delete("/tenants/student-1", headers=auth).status_code == 404
+
+
+def test_admin_changes_are_written_to_tenants_file(admin_client, registry):
+    auth = {"Authorization": "Bearer secret"}
+
+    def saved_ids():
+        with open(registry.config_path, encoding="utf-8") as f:
+            return [c["id"] for c in json.load(f)]
+
+    assert admin_client.post("/tenants", json=VALID, headers=auth).status_code == 201
+    assert saved_ids() == ["from-file", "student-1"]
+    # الرفض مش بيغيّر الملف
+    admin_client.post("/tenants", json=dict(VALID, id="x", request_urls=""), headers=auth)
+    assert saved_ids() == ["from-file", "student-1"]
+
+    assert admin_client.delete("/tenants/student-1", headers=auth).status_code == 200
+    assert saved_ids() == ["from-file"]